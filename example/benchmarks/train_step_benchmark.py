@@ -0,0 +1,74 @@
+"""
+CPU micro-benchmark of the train step of `TrainComponent`. Compares the current `_train_batch` against the previous
+train step, which moved the model to the device and reset the gradients to zero for every batch and always ran
+the autocast context and the loss scaling indirection.
+
+Usage: python train_step_benchmark.py [--num_steps 2000] [--batch_size 8]
+"""
+import argparse
+import time
+from typing import Callable, Dict
+import torch
+from torch.optim.sgd import SGD
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.gym.trainers.standard_trainer import TrainComponent
+from ml_gym.optimizers.optimizer import OptimizerAdapter
+
+
+class SquaredOutputTrainComponent(TrainComponent):
+
+    def calc_loss(self, model: torch.nn.Module, batch: DatasetBatch) -> torch.Tensor:
+        return model(batch.samples).pow(2).mean()
+
+
+def previous_train_batch(train_component: TrainComponent, batch: DatasetBatch, model: torch.nn.Module,
+                         optimizer: OptimizerAdapter, device: torch.device):
+    model = model.to(device)
+    batch.to(device)
+    model.zero_grad(set_to_none=False)
+    with train_component.mixed_precision_component.autocast(device):
+        loss = train_component.calc_loss(model, batch)
+    train_component.mixed_precision_component.backward(loss.sum(), device)
+    train_component.mixed_precision_component.step(optimizer, device)
+
+
+def get_model(depth: int, width: int) -> torch.nn.Module:
+    layers = []
+    for _ in range(depth):
+        layers += [torch.nn.Linear(width, width), torch.nn.BatchNorm1d(width), torch.nn.ReLU()]
+    return torch.nn.Sequential(*layers)
+
+
+def time_train_step(train_step: Callable, num_steps: int, num_warmup_steps: int = 50) -> float:
+    # returns the mean duration of a train step in microseconds
+    for _ in range(num_warmup_steps):
+        train_step()
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        train_step()
+    return (time.perf_counter() - start) / num_steps * 1e6
+
+
+def run_benchmark(depth: int, width: int, batch_size: int, num_steps: int) -> Dict[str, float]:
+    device = torch.device("cpu")
+    model = get_model(depth, width)
+    optimizer = OptimizerAdapter(SGD, {"lr": 0.01})
+    optimizer.register_model_params(dict(model.named_parameters()))
+    train_component = SquaredOutputTrainComponent(None, [], None)
+    batch = DatasetBatch(samples=torch.randn(batch_size, width), targets={}, tags=torch.arange(batch_size))
+    train_steps = {"previous": lambda: previous_train_batch(train_component, batch, model, optimizer, device),
+                   "current": lambda: train_component._train_batch(batch, model, optimizer, device)}
+    return {name: time_train_step(train_step, num_steps) for name, train_step in train_steps.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CPU micro-benchmark of the train step")
+    parser.add_argument("--num_steps", type=int, default=2000)
+    parser.add_argument("--batch_size", type=int, default=8)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    for depth, width in [(2, 16), (8, 64), (32, 32)]:
+        durations = run_benchmark(depth, width, args.batch_size, args.num_steps)
+        print(f"depth {depth}, width {width}: {durations['previous']:.0f} -> {durations['current']:.0f} us/step "
+              f"({(1 - durations['current'] / durations['previous']) * 100:.0f}% less)")
@@ -1,8 +1,11 @@
 from typing import List, Union
+import pickle
 
 import pytest
 import torch
-from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch
+from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch, InferenceResultBatchAccumulator, InferenceResultBatchOffloader, \
+    InferenceResultBatchSelector, TorchDeviceMixin, BatchSerializer
+from ml_gym.error_handling.exception import BatchStateError
 
 
 class TestInferenceResultBatch:
@@ -48,6 +51,97 @@ class TestInferenceResultBatch:
         assert len(filtered_inference_batch_result.targets.keys()) == target_num
         assert len(filtered_inference_batch_result.predictions.keys()) == predictions_num
 
+    @pytest.mark.parametrize("initial_capacity", [0, 5, 100])
+    def test_accumulator(self, inference_batch_result, initial_capacity):
+        batches = [inference_batch_result.split_results(["target_key"], ["a", ["b", "b_1"]], torch.device("cpu"))
+                   for _ in range(7)]
+        accumulator = InferenceResultBatchAccumulator(initial_capacity=initial_capacity)
+        for batch in batches:
+            accumulator.append(batch)
+        accumulated_batch = accumulator.combine()
+        combined_batch = InferenceResultBatch.combine(batches)
+        assert len(accumulator) == len(accumulated_batch) == 42
+        assert torch.equal(accumulated_batch.tags, combined_batch.tags)
+        assert accumulated_batch.tags.dtype == combined_batch.tags.dtype
+        assert torch.equal(accumulated_batch.get_targets("target_key"), combined_batch.get_targets("target_key"))
+        assert torch.equal(accumulated_batch.get_predictions("a"), combined_batch.get_predictions("a"))
+        assert torch.equal(accumulated_batch.predictions["b"]["b_1"], combined_batch.predictions["b"]["b_1"])
+
+    @pytest.mark.parametrize("device", [torch.device("cpu"),
+                                        pytest.param(torch.device("cuda"), marks=pytest.mark.skipif(not torch.cuda.is_available(),
+                                                                                                    reason="requires CUDA"))])
+    def test_split_results_non_blocking(self, inference_batch_result, device):
+        inference_batch_result.to(device)
+        filtered_batch = inference_batch_result.split_results(["target_key"], ["a", "b"], torch.device("cpu"))
+        async_filtered_batch = inference_batch_result.split_results(["target_key"], ["a", "b"], torch.device("cpu"),
+                                                                    non_blocking=True).await_ready()
+        assert async_filtered_batch.device == torch.device("cpu")
+        assert torch.equal(async_filtered_batch.tags, filtered_batch.tags)
+        assert torch.equal(async_filtered_batch.get_targets("target_key"), filtered_batch.get_targets("target_key"))
+        assert torch.equal(async_filtered_batch.predictions["b"]["b_2"], filtered_batch.predictions["b"]["b_2"])
+
+    @pytest.mark.parametrize("predictions_keys, prediction_paths",
+                             [
+                                 (["a", ["b", "b_1"]], [("a",), ("b", "b_1")]),
+                                 (["*"], [("a",), ("b",)]),
+                                 ([["b", "*"], ["b", "b_2"]], [("b", "b_1"), ("b", "b_2")]),
+                             ])
+    def test_selector(self, inference_batch_result, predictions_keys, prediction_paths):
+        selector = InferenceResultBatchSelector(["target_key"], predictions_keys)
+        assert selector.get_prediction_paths(inference_batch_result.predictions) == prediction_paths
+        selected_batch = selector.select(inference_batch_result)
+        filtered_batch = inference_batch_result.split_results(["target_key"], predictions_keys, torch.device("cpu"))
+        assert selected_batch.predictions.keys() == filtered_batch.predictions.keys()
+        # the selection shares the tensors of the batch
+        assert selected_batch.get_targets("target_key") is inference_batch_result.get_targets("target_key")
+
+    def test_pack_tensors(self):
+        tensors = [torch.arange(5, dtype=torch.int64), torch.BoolTensor([True, False, True]), torch.rand(2, 3), torch.zeros(0, 2)]
+        buffer, offsets = TorchDeviceMixin._pack_tensors(tensors)
+        assert buffer.dtype == torch.uint8 and buffer.dim() == 1
+        assert all(offset % TorchDeviceMixin._fused_transfer_alignment == 0 for offset in offsets)
+        unpacked_tensors = TorchDeviceMixin._unpack_tensors(buffer, tensors, offsets)
+        for tensor, unpacked_tensor in zip(tensors, unpacked_tensors):
+            assert unpacked_tensor.dtype == tensor.dtype and torch.equal(unpacked_tensor, tensor)
+
+    @pytest.mark.parametrize("bulk_size", [1, 3])
+    @pytest.mark.parametrize("device", [torch.device("cpu"),
+                                        pytest.param(torch.device("cuda"), marks=pytest.mark.skipif(not torch.cuda.is_available(),
+                                                                                                    reason="requires CUDA"))])
+    def test_offloader(self, inference_batch_result, bulk_size, device):
+        inference_batch_result.to(device)
+        predictions_keys = ["a", ["b", "b_1"]]
+        offloader = InferenceResultBatchOffloader(selector=InferenceResultBatchSelector(["target_key"], predictions_keys),
+                                                  accumulator=InferenceResultBatchAccumulator(), bulk_size=bulk_size)
+        for _ in range(7):
+            offloader.append(inference_batch_result)
+        offloaded_batch = offloader.combine()
+        combined_batch = InferenceResultBatch.combine([inference_batch_result.split_results(["target_key"], predictions_keys,
+                                                                                            torch.device("cpu"))] * 7)
+        assert torch.equal(offloaded_batch.tags, combined_batch.tags)
+        assert torch.equal(offloaded_batch.predictions["b"]["b_1"], combined_batch.predictions["b"]["b_1"])
+        assert offloaded_batch.device == torch.device("cpu") and "b_2" not in offloaded_batch.predictions["b"]
+
+    def test_combine_pair(self, inference_batch_result):
+        combined_batch = InferenceResultBatch.combine_pair(inference_batch_result, inference_batch_result)
+        assert torch.equal(combined_batch.tags, torch.cat([inference_batch_result.tags, inference_batch_result.tags]))
+        assert torch.equal(combined_batch.predictions["b"]["b_1"], torch.cat([inference_batch_result.predictions["b"]["b_1"]] * 2))
+
+    def test_own_tensors(self, inference_batch_result):
+        dataset_batch = DatasetBatch(samples=torch.zeros(6), targets=inference_batch_result.targets, tags=inference_batch_result.tags)
+        shared_batch = InferenceResultBatch(targets=dataset_batch.targets, tags=dataset_batch.tags, predictions={})
+        assert shared_batch.tags.data_ptr() == dataset_batch.tags.data_ptr()
+        owning_batch = InferenceResultBatch(targets=dataset_batch.targets, tags=dataset_batch.tags, predictions={}).own_tensors(dataset_batch)
+        assert owning_batch.tags.data_ptr() != dataset_batch.tags.data_ptr()
+        assert owning_batch.get_targets("target_key").data_ptr() != dataset_batch.targets["target_key"].data_ptr()
+        assert torch.equal(owning_batch.tags, dataset_batch.tags)
+
+    def test_accumulator_mismatch(self, inference_batch_result):
+        accumulator = InferenceResultBatchAccumulator()
+        accumulator.append(inference_batch_result.split_results(["target_key"], ["a"], torch.device("cpu")))
+        with pytest.raises(BatchStateError):
+            accumulator.append(inference_batch_result.split_results(["target_key"], ["b"], torch.device("cpu")))
+
 
 class TestDatasetBatch:
     target_key = "target_key"
@@ -72,3 +166,94 @@ class TestDatasetBatch:
 
     def test_detach(self, dataset_batch: DatasetBatch):
         dataset_batch.detach()
+
+    @pytest.mark.parametrize("device", [torch.device("cpu"),
+                                        pytest.param(torch.device("cuda"), marks=pytest.mark.skipif(not torch.cuda.is_available(),
+                                                                                                    reason="requires CUDA"))])
+    def test_to_async(self, dataset_batch: DatasetBatch, device: torch.device):
+        expected_samples = dataset_batch.samples.clone()
+        dataset_batch.to_async(device).await_ready()
+        assert dataset_batch.device.type == device.type
+        assert dataset_batch.tags.device.type == device.type
+        assert torch.equal(dataset_batch.samples.cpu(), expected_samples)
+        dataset_batch.to_async(torch.device("cpu")).await_ready()
+        assert torch.equal(dataset_batch.samples, expected_samples)
+
+    def test_combine_pair(self, dataset_batch: DatasetBatch):
+        other_batch = DatasetBatch(targets={TestDatasetBatch.target_key: torch.IntTensor([2, 2])},
+                                   samples=torch.IntTensor([2, 2]), tags=torch.IntTensor([2, 2]))
+        combined_batch = DatasetBatch.combine_pair(dataset_batch, other_batch)
+        assert torch.equal(combined_batch.samples, torch.IntTensor([0, 0, 0, 1, 1, 1, 2, 2]))
+        assert torch.equal(combined_batch.targets[TestDatasetBatch.target_key], combined_batch.samples)
+        assert torch.equal(combined_batch.tags, combined_batch.samples)
+        # the combined batch does not share memory with the source batches
+        combined_batch.samples[0] = 5
+        assert dataset_batch.samples[0] == 0
+
+
+class TestBatchSerializer:
+
+    @pytest.fixture
+    def inference_batch_result(self) -> InferenceResultBatch:
+        predictions = {"a": torch.rand(6, 3),
+                       "b": {"b_1": torch.rand(6) > 0.5, "b_2": torch.zeros(0, 2)}}
+        return InferenceResultBatch(targets={"target_key": torch.arange(6)}, predictions=predictions,
+                                    tags=torch.arange(6, dtype=torch.int32))
+
+    @pytest.fixture
+    def dataset_batch(self) -> DatasetBatch:
+        return DatasetBatch(samples=torch.rand(6, 2), targets={"target_key": torch.arange(6)}, tags=torch.arange(6),
+                            samples_require_grad=True)
+
+    @staticmethod
+    def assert_equal(batch: InferenceResultBatch, other_batch: InferenceResultBatch):
+        assert torch.equal(batch.tags, other_batch.tags) and batch.tags.dtype == other_batch.tags.dtype
+        assert torch.equal(batch.get_targets("target_key"), other_batch.get_targets("target_key"))
+        assert torch.equal(batch.predictions["a"], other_batch.predictions["a"])
+        assert torch.equal(batch.predictions["b"]["b_1"], other_batch.predictions["b"]["b_1"])
+        assert batch.predictions["b"]["b_2"].shape == other_batch.predictions["b"]["b_2"].shape
+
+    @pytest.mark.parametrize("to_buffer", [bytes, bytearray, memoryview])
+    def test_serialize(self, inference_batch_result, to_buffer):
+        serialized_batch = BatchSerializer.serialize(inference_batch_result)
+        assert len(serialized_batch) == BatchSerializer.get_serialized_size(inference_batch_result)
+        TestBatchSerializer.assert_equal(BatchSerializer.deserialize(to_buffer(serialized_batch)), inference_batch_result)
+
+    def test_deserialize_zero_copy(self, inference_batch_result):
+        serialized_batch = BatchSerializer.serialize(inference_batch_result)
+        deserialized_batch = BatchSerializer.deserialize(serialized_batch)
+        deserialized_batch.get_targets("target_key")[0] = 42
+        assert BatchSerializer.deserialize(serialized_batch).get_targets("target_key")[0] == 42
+
+    def test_serialize_into(self, inference_batch_result):
+        with pytest.raises(BatchStateError):
+            BatchSerializer.serialize_into(inference_batch_result, bytearray(16))
+        with pytest.raises(BatchStateError):
+            BatchSerializer.deserialize(bytearray(64))
+
+    def test_save_and_load(self, tmp_path, dataset_batch):
+        path = str(tmp_path / "batch.mlgb")
+        BatchSerializer.save(dataset_batch, path)
+        loaded_batch = BatchSerializer.load(path)
+        assert isinstance(loaded_batch, DatasetBatch) and loaded_batch.samples_require_grad
+        assert torch.equal(loaded_batch.samples, dataset_batch.samples)
+        assert torch.equal(loaded_batch.targets["target_key"], dataset_batch.targets["target_key"])
+
+    def test_shared_memory(self, inference_batch_result):
+        shared_memory = BatchSerializer.to_shared_memory(inference_batch_result)
+        shared_batch = BatchSerializer.from_shared_memory(shared_memory.name)
+        shared_memory.close()
+        TestBatchSerializer.assert_equal(shared_batch, inference_batch_result)
+
+    def test_pickle(self, inference_batch_result, dataset_batch):
+        TestBatchSerializer.assert_equal(pickle.loads(pickle.dumps(inference_batch_result)), inference_batch_result)
+        unpickled_dataset_batch = pickle.loads(pickle.dumps(dataset_batch))
+        assert unpickled_dataset_batch.samples_require_grad and torch.equal(unpickled_dataset_batch.samples, dataset_batch.samples)
+
+    def test_pickle_retains_requires_grad(self, inference_batch_result):
+        # batches with tensors requiring gradients fall back to the default pickling
+        inference_batch_result.predictions["a"].requires_grad_(True)
+        assert BatchSerializer.reduce(inference_batch_result) is None
+        unpickled_batch = pickle.loads(pickle.dumps(inference_batch_result))
+        assert unpickled_batch.predictions["a"].requires_grad
+        TestBatchSerializer.assert_equal(unpickled_batch, inference_batch_result)
@@ -0,0 +1,46 @@
+import pytest
+import torch
+from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.batching.batch_filters import BatchFilter
+from ml_gym.error_handling.exception import ClassRegistryKeyNotFoundError
+
+
+class TestBatchFilter:
+    target_key = "target_key"
+    prediction_key = "prediction_key"
+
+    @pytest.fixture
+    def inference_batch_result(self) -> InferenceResultBatch:
+        targets = torch.IntTensor([0, 1, 0, 1, 2, 2])
+        tags = torch.arange(6)
+        predictions = torch.FloatTensor([[0.9, 0.1], [0.4, 0.6], [0.5, 0.5], [0.2, 0.8], [0.7, 0.3], [0.55, 0.45]])
+        return InferenceResultBatch(targets={TestBatchFilter.target_key: targets},
+                                    predictions={TestBatchFilter.prediction_key: predictions},
+                                    tags=tags)
+
+    def test_class_selection_fun(self, inference_batch_result):
+        mask = BatchFilter.get_class_selection_fun(TestBatchFilter.target_key, selected_class=1)(inference_batch_result)
+        assert isinstance(mask, torch.Tensor) and mask.dtype == torch.bool
+        assert mask.tolist() == [False, True, False, True, False, False]
+
+    @pytest.mark.parametrize("min_tag, max_tag, expected_tags", [(2, 4, [2, 3]), (None, 2, [0, 1]), (4, None, [4, 5])])
+    def test_tag_range_selection_fun(self, inference_batch_result, min_tag, max_tag, expected_tags):
+        mask = BatchFilter.get_tag_range_selection_fun(min_tag=min_tag, max_tag=max_tag)(inference_batch_result)
+        assert inference_batch_result.tags[mask].tolist() == expected_tags
+
+    @pytest.mark.parametrize("above, expected_tags", [(True, [0, 3, 4]), (False, [1, 2, 5])])
+    def test_prediction_threshold_selection_fun(self, inference_batch_result, above, expected_tags):
+        selection_fun = BatchFilter.get_prediction_threshold_selection_fun(TestBatchFilter.prediction_key, threshold=0.7, above=above)
+        assert inference_batch_result.tags[selection_fun(inference_batch_result)].tolist() == expected_tags
+
+    def test_composite_selection_fun(self, inference_batch_result):
+        class_config = {"key": "CLASS", "params": {"target_subscription_key": TestBatchFilter.target_key, "selected_class": 0}}
+        tag_range_config = {"key": "TAG_RANGE", "params": {"min_tag": 1}}
+        and_selection_fun = BatchFilter.get_selection_fun({"key": "AND", "params": {"selection_fun_configs": [class_config, tag_range_config]}})
+        assert inference_batch_result.tags[and_selection_fun(inference_batch_result)].tolist() == [2]
+        or_selection_fun = BatchFilter.get_selection_fun({"key": "OR", "params": {"selection_fun_configs": [class_config, tag_range_config]}})
+        assert inference_batch_result.tags[or_selection_fun(inference_batch_result)].tolist() == [0, 1, 2, 3, 4, 5]
+
+    def test_unknown_selection_fun(self):
+        with pytest.raises(ClassRegistryKeyNotFoundError):
+            BatchFilter.get_selection_fun({"key": "UNKNOWN"})
@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List
+import os
+import numpy as np
+import pytest
+from ml_gym.blueprints.component_cache import ComponentCache
+from ml_gym.blueprints.component_factory import ComponentFactory
+from ml_gym.blueprints.constructables import ComponentConstructable
+from ml_gym.error_handling.exception import ComponentConstructionError
+
+
+# counts the number of constructions per component name
+construction_counts: Dict[str, int] = {}
+
+
+@dataclass
+class DataConstructable(ComponentConstructable):
+    memoizable: ClassVar[bool] = True
+    values: List[int] = None
+
+    def _construct_impl(self) -> Dict[str, Any]:
+        construction_counts[self.component_identifier] = construction_counts.get(self.component_identifier, 0) + 1
+        requirement_values = [value for name in sorted(self.requirements.keys()) for value in self.get_requirement(name)["values"]]
+        return {"values": requirement_values + self.values}
+
+
+@dataclass
+class StatefulConstructable(ComponentConstructable):
+
+    def _construct_impl(self) -> Dict[str, Any]:
+        construction_counts[self.component_identifier] = construction_counts.get(self.component_identifier, 0) + 1
+        return {"requirements": self.get_requirements()}
+
+
+class TestComponentFactory:
+
+    @pytest.fixture
+    def component_config(self) -> Dict[str, Any]:
+        # both consumers depend on the same data pipeline and the same stateful component
+        return {
+            "data": {"component_type_key": "DATA", "variant_key": "DEFAULT", "config": {"values": [1, 2]}},
+            "mapped_data": {"component_type_key": "DATA", "variant_key": "DEFAULT", "config": {"values": [3]},
+                            "requirements": [{"name": "data", "component_name": "data"}]},
+            "state": {"component_type_key": "STATE", "variant_key": "DEFAULT"},
+            "consumer_1": {"component_type_key": "STATE", "variant_key": "DEFAULT",
+                           "requirements": [{"name": "data", "component_name": "mapped_data"},
+                                            {"name": "state", "component_name": "state"}]},
+            "consumer_2": {"component_type_key": "STATE", "variant_key": "DEFAULT",
+                           "requirements": [{"name": "data", "component_name": "mapped_data"},
+                                            {"name": "state", "component_name": "state"}]},
+        }
+
+    @staticmethod
+    def get_component_factory(component_cache_path: str = None) -> ComponentFactory:
+        construction_counts.clear()
+        component_factory = ComponentFactory(component_cache_path=component_cache_path)
+        component_factory.register_component_type("DATA", "DEFAULT", DataConstructable)
+        component_factory.register_component_type("STATE", "DEFAULT", StatefulConstructable)
+        return component_factory
+
+    def test_memoization_within_build(self, component_config):
+        component_factory = TestComponentFactory.get_component_factory()
+        components = component_factory.build_components_from_config(component_config, ["consumer_1", "consumer_2"])
+        consumer_1_requirements = components["consumer_1"]["requirements"]
+        consumer_2_requirements = components["consumer_2"]["requirements"]
+        # the data components are built once and shared, stateful components are rebuilt for each dependent
+        assert consumer_1_requirements["data"] is consumer_2_requirements["data"]
+        assert consumer_1_requirements["data"]["values"] == [1, 2, 3]
+        assert consumer_1_requirements["state"] is not consumer_2_requirements["state"]
+        assert construction_counts == {"data": 1, "mapped_data": 1, "state": 2, "consumer_1": 1, "consumer_2": 1}
+
+    def test_component_hash(self, component_config):
+        component_factory = TestComponentFactory.get_component_factory()
+        graph = component_factory._calc_dependency_graph(component_config)
+        mapped_data_hash = ComponentFactory.get_component_hash("mapped_data", graph)
+        assert mapped_data_hash == ComponentFactory.get_component_hash("mapped_data", component_factory._calc_dependency_graph(component_config))
+        # changing the config of a requirement changes the hash of its dependents
+        component_config["data"]["config"]["values"] = [1, 4]
+        assert mapped_data_hash != ComponentFactory.get_component_hash("mapped_data", component_factory._calc_dependency_graph(component_config))
+
+    def test_component_hash_of_non_json_configs(self, component_config):
+        component_factory = TestComponentFactory.get_component_factory()
+        data_hash = ComponentFactory.get_component_hash("data", component_factory._calc_dependency_graph(component_config))
+        # numpy values (e.g., injected indices) are hashed by their contents
+        component_config["data"]["config"]["values"] = np.array([1, 2])
+        assert data_hash == ComponentFactory.get_component_hash("data", component_factory._calc_dependency_graph(component_config))
+        # values without a canonical JSON representation are rejected instead of being hashed by their repr
+        component_config["data"]["config"]["values"] = object()
+        with pytest.raises(ComponentConstructionError):
+            ComponentFactory.get_component_hash("data", component_factory._calc_dependency_graph(component_config))
+
+    def test_component_cache(self, tmp_path, component_config):
+        component_factory = TestComponentFactory.get_component_factory(str(tmp_path))
+        component_factory.build_components_from_config(component_config, ["consumer_1"])
+        assert len(os.listdir(tmp_path)) == 2
+        # a new factory, e.g., of the next job in the grid search, loads the data components from disk
+        component_factory = TestComponentFactory.get_component_factory(str(tmp_path))
+        components = component_factory.build_components_from_config(component_config, ["consumer_1"])
+        assert components["consumer_1"]["requirements"]["data"]["values"] == [1, 2, 3]
+        assert construction_counts == {"state": 1, "consumer_1": 1}
+
+    def test_component_cache_cleanup(self, tmp_path):
+        class UnpicklableComponent:
+            def __reduce__(self):
+                raise RuntimeError("component cannot be pickled")
+
+        component_cache = ComponentCache(str(tmp_path))
+        with pytest.raises(RuntimeError):
+            component_cache.put("hash", UnpicklableComponent())
+        # the temporary file is removed, even if the failure is not caught by the cache
+        assert os.listdir(tmp_path) == []
+        with pytest.warns(UserWarning):
+            component_cache.put("hash", lambda: None)
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,30 @@
+from ml_gym.blueprints.constructables import Requirement, AccelerateEvalComponentConstructable
+from ml_gym.gym.evaluators.accelerate_evaluator import AccelerateEvalComponent
+from pytests.blueprints.constructables.test_train_component_constructable import RegistryFixture, DataLoaderFixture
+from pytests.blueprints.constructables.test_eval_component_constructable import EvalConfigFixture
+
+
+class TestAccelerateEvalComponentConstructable(RegistryFixture, DataLoaderFixture, EvalConfigFixture):
+    def test_constructable(self, data_loader, prediction_postprocessing_registry, loss_function_registry,
+                           metric_registry, metrics_config, loss_funs_config, post_processors_config,
+                           cpu_target_subscription_keys, cpu_prediction_subscription_keys, metrics_computation_config,
+                           loss_computation_config):
+        requirements = {
+            "data_loaders": Requirement(components=data_loader),
+            "prediction_postprocessing_registry": Requirement(components=prediction_postprocessing_registry),
+            "loss_function_registry": Requirement(components=loss_function_registry),
+            "metric_registry": Requirement(components=metric_registry),
+        }
+
+        constructable = AccelerateEvalComponentConstructable(component_identifier="accelerate_eval_component_constructable",
+                                                             requirements=requirements,
+                                                             metrics_config=metrics_config,
+                                                             loss_funs_config=loss_funs_config,
+                                                             post_processors_config=post_processors_config,
+                                                             cpu_target_subscription_keys=cpu_target_subscription_keys,
+                                                             cpu_prediction_subscription_keys=cpu_prediction_subscription_keys,
+                                                             metrics_computation_config=metrics_computation_config,
+                                                             loss_computation_config=loss_computation_config)
+        eval_component = constructable.construct()
+
+        assert isinstance(eval_component, AccelerateEvalComponent)
@@ -11,6 +11,7 @@ from typing import Dict
 from data_stack.dataset.iterator import InformedDatasetIteratorIF, InMemoryDatasetIterator, \
     DatasetIteratorView
 from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.split_index_store import SplitIndexStore
 
 from pytests.blueprints.constructables.mocked_classes import MockedMNISTFactory
 
@@ -187,7 +188,9 @@ class TestFeatureEncodedIteratorConstructable(IteratorFixtures):
         constructable = FeatureEncodedIteratorConstructable(component_identifier="feature_encoding_component",
                                                             requirements=requirements,
                                                             feature_encoding_configs=feature_encoding_configs,
-                                                            applicable_splits=["train"])
+                                                            applicable_splits=["train"],
+                                                            chunk_size=128,
+                                                            num_workers=0)
         iterators = constructable.construct()
         iterator_train_encoded = iterators["train"]
         sample, target, tag = iterator_train_encoded[0]
@@ -195,6 +198,7 @@ class TestFeatureEncodedIteratorConstructable(IteratorFixtures):
         assert isinstance(target, int)
 
         assert isinstance(iterator_train_encoded._dataset_iterator, PostProcessedDatasetIterator)
+        assert iterator_train_encoded._dataset_iterator._post_processor.chunk_size == 128
         # print(DatasetIteratorReportGenerator.generate_report(iterator_train_encoded))
 
 
@@ -240,3 +244,16 @@ class TestIteratorViewConstructable(IteratorFixtures):
         except:
             assert True
         # print(DatasetIteratorReportGenerator.generate_report(iterator_view_train))
+
+    def test_constructable_with_split_index_store(self, informed_iterators, tmp_folder_path):
+        requirements = {"iterators": Requirement(components=informed_iterators, subscription=["train", "test"])}
+        split_index_store = SplitIndexStore(tmp_folder_path)
+        split_indices = {"train": split_index_store.put(list(range(5, 20))), "test": list(range(3))}
+        constructable = IteratorViewConstructable(component_identifier="mapped_component",
+                                                  requirements=requirements,
+                                                  split_indices=split_indices,
+                                                  applicable_split="train")
+        iterator_views = constructable.construct()
+        assert len(iterator_views["train"]) == 15
+        assert len(iterator_views["test"]) == 3
+        assert iterator_views["train"][0][0].equal(informed_iterators["train"][5][0])
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pytest
+import torch
+from data_stack.dataset.iterator import InformedDatasetIterator, SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import IteratorMeta, DatasetMeta
+from ml_gym.data_handling.postprocessors.encoder_cache import EncoderCache
+from ml_gym.data_handling.postprocessors.postprocessor import FeatureEncoderPostProcessor
+
+
+class TestEncoderCache:
+
+    @pytest.fixture
+    def iterator(self):
+        rng = np.random.default_rng(0)
+        samples = np.concatenate([rng.integers(0, 6, size=(100, 2)), rng.normal(size=(100, 2))], axis=1)
+        iterator_meta = IteratorMeta(sample_pos=0, target_pos=1, tag_pos=2)
+        dataset_meta = DatasetMeta(identifier="identifier", dataset_name="dataset_name",
+                                   dataset_tag="dataset_tag", iterator_meta=iterator_meta)
+        targets = torch.zeros(100)
+        return InformedDatasetIterator(SequenceDatasetIterator([torch.from_numpy(samples), targets, targets]), dataset_meta)
+
+    @pytest.fixture
+    def feature_encoding_configs(self):
+        return [{"feature_type": "categorical", "feature_names": [0, 1], "train_split": "train"},
+                {"feature_type": "continuous", "feature_names": [2, 3], "train_split": "train"}]
+
+    def test_fit(self, tmp_path, iterator, feature_encoding_configs, monkeypatch):
+        cache = EncoderCache(str(tmp_path))
+        post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=feature_encoding_configs)
+        cache.fit(post_processor, {"train": iterator})
+        assert len(os.listdir(tmp_path)) == 1
+
+        # the second post processor loads the encoders instead of fitting them
+        def fail(*args, **kwargs):
+            raise AssertionError("encoders were fitted again")
+        monkeypatch.setattr(FeatureEncoderPostProcessor, "fit", fail)
+        cached_post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=feature_encoding_configs)
+        EncoderCache(str(tmp_path)).fit(cached_post_processor, {"train": iterator})
+        assert list(cached_post_processor.encoders.keys()) == [0, 1, 2, 3]
+        sample = iterator[0]
+        assert torch.equal(cached_post_processor.postprocess(sample)[0], post_processor.postprocess(sample)[0])
+
+    def test_cache_key(self, iterator, feature_encoding_configs):
+        def get_key(iterators, configs):
+            return EncoderCache.get_cache_key(FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=configs), iterators)
+
+        key = get_key({"train": iterator}, feature_encoding_configs)
+        # splits that are not used for fitting do not affect the key
+        assert get_key({"train": iterator, "test": iterator}, feature_encoding_configs) == key
+        # the key changes with the configs
+        assert get_key({"train": iterator}, feature_encoding_configs[:1]) != key
+        # views on different indices, e.g., cross validation folds, have different keys
+        fold_keys = set()
+        for fold in range(3):
+            view = InformedDatasetFactory.get_dataset_iterator_view(iterator, iterator.dataset_meta, list(range(fold, 100, 3))[:33])
+            fold_keys.add(get_key({"train": view}, feature_encoding_configs))
+        assert len(fold_keys) == 3 and key not in fold_keys
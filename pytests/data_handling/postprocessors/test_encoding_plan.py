@@ -0,0 +1,54 @@
+import pytest
+import numpy as np
+from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, CategoricalCodesEncoder, ContinuousEncoder
+from ml_gym.data_handling.postprocessors.encoding_plan import FeatureEncodingPlan
+
+
+class TestFeatureEncodingPlan:
+
+    @pytest.fixture
+    def inputs(self) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        categorical = rng.integers(0, 5, size=(100, 2))
+        continuous = rng.normal(size=(100, 2))
+        passthrough = rng.normal(size=(100, 1))
+        # column layout: categorical, continuous, passthrough, categorical, continuous
+        return np.hstack([categorical[:, [0]], continuous[:, [0]], passthrough, categorical[:, [1]], continuous[:, [1]]])
+
+    @pytest.fixture
+    def encoders(self, inputs: np.ndarray):
+        encoders = {0: CategoricalEncoder(), 1: ContinuousEncoder(), 3: CategoricalEncoder(), 4: ContinuousEncoder()}
+        for column, encoder in encoders.items():
+            encoder.fit(values=inputs[:, column])
+        return encoders
+
+    def test_encode_matches_encoders(self, inputs: np.ndarray, encoders):
+        plan = FeatureEncodingPlan(encoders, num_columns=inputs.shape[1])
+        assert plan.output_size == 5 + 1 + 1 + 5 + 1
+        for sample_input in inputs[:10]:
+            expected = np.hstack([encoders[pos].transform(np.array([val])).flatten() if pos in encoders else val
+                                  for pos, val in enumerate(sample_input)])
+            assert np.allclose(plan.encode(sample_input), expected)
+
+    def test_encode_batch(self, inputs: np.ndarray, encoders):
+        plan = FeatureEncodingPlan(encoders, num_columns=inputs.shape[1])
+        encoded = plan.encode_batch(inputs)
+        assert encoded.shape == (len(inputs), plan.output_size)
+        assert all(np.array_equal(encoded[i], plan.encode(inputs[i])) for i in range(len(inputs)))
+
+    def test_unseen_category(self, inputs: np.ndarray, encoders):
+        plan = FeatureEncodingPlan(encoders, num_columns=inputs.shape[1])
+        sample_input = inputs[0].copy()
+        sample_input[0] = 7
+        with pytest.raises(KeyError):
+            plan.encode(sample_input)
+
+    def test_categorical_codes(self, inputs: np.ndarray):
+        encoders = {0: CategoricalCodesEncoder(), 3: CategoricalEncoder()}
+        for column, encoder in encoders.items():
+            encoder.fit(values=inputs[:, column])
+        plan = FeatureEncodingPlan(encoders, num_columns=inputs.shape[1])
+        assert plan.output_size == 1 + 1 + 1 + 5 + 1
+        encoded = plan.encode_batch(inputs)
+        assert np.array_equal(encoded[:, 0], encoders[0].get_codes(inputs[:, 0]))
+        assert np.array_equal(encoded[:, 3:8].argmax(axis=1), encoders[3].get_codes(inputs[:, 3]))
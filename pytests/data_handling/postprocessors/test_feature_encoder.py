@@ -1,7 +1,8 @@
+import pickle
 import numpy as np
 import pytest
 import torch
-from ml_gym.data_handling.postprocessors.feature_encoder import ContinuousEncoder, CategoricalEncoder
+from ml_gym.data_handling.postprocessors.feature_encoder import ContinuousEncoder, CategoricalEncoder, StreamingMoments
 
 
 class TestCategoricalEncoder:
@@ -30,6 +31,40 @@ class TestCategoricalEncoder:
         assert np.sum(transformed_sample) == 1
         assert encoder.get_output_size() == len(torch.bincount(values))
 
+    @pytest.mark.parametrize("values, samples", [(np.array([5, 100000, 7, 5]), np.array([7, 100000, 5])),
+                                                 (np.array([0.5, 1.5, 0.5]), np.array([1.5, 0.5])),
+                                                 (np.array(["b", "a", "c"]), np.array(["c", "a"]))])
+    def test_codes(self, values, samples):
+        encoder = CategoricalEncoder(one_hot=False)
+        encoder.fit(values)
+        codes = encoder.transform(samples)
+        assert codes.shape == (len(samples), 1) and encoder.get_output_size() == 1
+        assert encoder.all_values[codes[:, 0]].tolist() == samples.tolist()
+        one_hot_encoder = CategoricalEncoder()
+        one_hot_encoder.fit(values)
+        assert np.array_equal(one_hot_encoder.transform(samples).argmax(axis=1), codes[:, 0])
+
+    def test_fit_columns(self):
+        values = np.random.default_rng(0).integers(0, 4, size=(50, 3))
+        encoders = CategoricalEncoder.fit_columns(values)
+        assert len(encoders) == 3
+        for column, encoder in enumerate(encoders):
+            assert encoder.all_values.tolist() == np.unique(values[:, column]).tolist()
+
+    def test_nan_category(self):
+        encoder = CategoricalEncoder()
+        encoder.fit(np.array([1.0, np.nan, 2.0, np.nan]))
+        assert encoder.get_output_size() == 3
+        transformed = encoder.transform(np.array([np.nan, 2.0, 1.0]))
+        assert transformed.argmax(axis=1).tolist() == [2, 1, 0] and transformed.sum() == 3
+
+    def test_unpickle_previous_version(self):
+        # encoders persisted by previous versions have neither the one_hot flag nor the lookup table
+        encoder = CategoricalEncoder.__new__(CategoricalEncoder)
+        encoder.__dict__ = {"all_values": np.array([3, 5]), "value_to_ix": {"3": 0, "5": 1}, "ix_to_value": {0: "3", 1: "5"}}
+        unpickled_encoder = pickle.loads(pickle.dumps(encoder))
+        assert unpickled_encoder.transform(np.array([5, 3])).tolist() == [[0, 1], [1, 0]]
+
 
 class TestContinuousEncoder:
     @pytest.fixture
@@ -55,3 +90,48 @@ class TestContinuousEncoder:
         # StandardScaler does (x - mean )/ std
         assert (sample_value - np.mean(values)) / np.std(values) == encoder.transform(np.array([sample_value]))[0][0]
         assert encoder.get_output_size() == 1
+
+    def test_fit_columns(self):
+        values = np.random.default_rng(0).normal(loc=3, scale=2, size=(100, 3))
+        values[:, 2] = 1
+        encoders = ContinuousEncoder.fit_columns(values)
+        for column, encoder in enumerate(encoders):
+            single_encoder = ContinuousEncoder()
+            single_encoder.fit(values[:, column])
+            assert np.isclose(encoder.mean, single_encoder.mean) and np.isclose(encoder.scale, single_encoder.scale)
+        # constant columns are only centered
+        assert encoders[2].scale == 1 and np.all(encoders[2].transform(values[:, 2]) == 0)
+
+    def test_constant_column_with_round_off(self):
+        # the streamed moments of a constant column have a standard deviation in the order of 1e-13
+        values = np.full(1000, 1000.1)
+        moments = StreamingMoments()
+        for chunk in np.array_split(values, 7):
+            moments.update(chunk)
+        assert 0 < np.sqrt(moments.variance) < 1e-12
+        encoder = ContinuousEncoder()
+        encoder.set_moments(moments)
+        assert encoder.scale == 1 and np.allclose(encoder.transform(values), 0)
+
+    def test_unpickle_previous_version(self, values):
+        # encoders persisted by previous versions wrap a fitted sklearn StandardScaler
+        preprocessing = pytest.importorskip("sklearn.preprocessing")
+        encoder = ContinuousEncoder.__new__(ContinuousEncoder)
+        encoder.__dict__ = {"sklearn_encoder": preprocessing.StandardScaler().fit(np.expand_dims(values, axis=1))}
+        unpickled_encoder = pickle.loads(pickle.dumps(encoder))
+        fitted_encoder = ContinuousEncoder()
+        fitted_encoder.fit(values)
+        assert np.allclose(unpickled_encoder.transform(values), fitted_encoder.transform(values))
+        assert not hasattr(unpickled_encoder, "sklearn_encoder")
+
+
+class TestStreamingMoments:
+
+    def test_update(self):
+        values = np.random.default_rng(0).normal(size=(1000, 4)) * np.arange(1, 5)
+        moments = StreamingMoments()
+        for chunk in np.array_split(values, 7):
+            moments.update(chunk)
+        assert moments.count == 1000
+        assert np.allclose(moments.mean, values.mean(axis=0))
+        assert np.allclose(moments.variance, values.var(axis=0))
@@ -1,10 +1,13 @@
 import pytest
+import numpy as np
+import torch
 from typing import Tuple
-from data_stack.dataset.iterator import InformedDatasetIterator
+from data_stack.dataset.iterator import InformedDatasetIterator, SequenceDatasetIterator
 from data_stack.dataset.meta import IteratorMeta, DatasetMeta
 from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, ContinuousEncoder
 from ml_gym.data_handling.postprocessors.postprocessor import OneHotEncodedTargetPostProcessor, \
     LabelMapperPostProcessor, FeatureEncoderPostProcessor
+from ml_gym.error_handling.exception import DataIntegrityError
 from pytests.data_handling.postprocessors.mocked_class import MockedIterator
 
 
@@ -68,6 +71,61 @@ class TestFeatureEncoderPostProcessor:
         assert postprocess_sample[0][sample[0][3]] == 0
         assert postprocess_sample[0][sample[0][4]] == 0
 
+    def test_postprocess_batch(self, iterators, sample_position, custom_encoders):
+        feature_encoding_configs = [
+            {"feature_type": "categorical2", "feature_names": [0, 1], "train_split": "train"},
+            {"feature_type": "continuous2", "feature_names": [3], "train_split": "train"},
+        ]
+        feature_encoder_post_processor = FeatureEncoderPostProcessor(sample_position=sample_position,
+                                                                     feature_encoding_configs=feature_encoding_configs,
+                                                                     custom_encoders=custom_encoders)
+        feature_encoder_post_processor.fit(iterators)
+        samples = [iterators["train"][i] for i in range(10)]
+        postprocessed_samples = feature_encoder_post_processor.postprocess_batch(samples)
+        assert len(postprocessed_samples) == len(samples)
+        for sample, postprocessed_sample in zip(samples, postprocessed_samples):
+            expected_sample = feature_encoder_post_processor.postprocess(sample)
+            assert torch.equal(postprocessed_sample[0], expected_sample[0])
+            assert all(a is b for a, b in zip(postprocessed_sample[1:], sample[1:]))
+
+    @pytest.mark.parametrize("chunk_size, num_workers", [(1, 0), (7, 0), (64, 0), (1000, 0), (64, 2)])
+    def test_fit_chunked(self, chunk_size, num_workers):
+        rng = np.random.default_rng(0)
+        samples = np.concatenate([rng.integers(0, 6, size=(200, 2)), rng.normal(loc=5, scale=3, size=(200, 2))], axis=1)
+        iterator_meta = IteratorMeta(sample_pos=0, target_pos=1, tag_pos=2)
+        dataset_meta = DatasetMeta(identifier="identifier", dataset_name="dataset_name",
+                                   dataset_tag="dataset_tag", iterator_meta=iterator_meta)
+        targets = torch.zeros(200)
+        iterator = InformedDatasetIterator(SequenceDatasetIterator([torch.from_numpy(samples), targets, targets]), dataset_meta)
+        feature_encoding_configs = [
+            {"feature_type": "categorical", "feature_names": [0, 1], "train_split": "train"},
+            {"feature_type": "continuous", "feature_names": [2, 3], "train_split": "train"},
+        ]
+        chunked_post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=feature_encoding_configs,
+                                                             chunk_size=chunk_size, num_workers=num_workers)
+        chunked_post_processor.fit({"train": iterator})
+        sequential_post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=feature_encoding_configs,
+                                                                sequential=True)
+        sequential_post_processor.fit({"train": iterator})
+        for column in [0, 1]:
+            assert chunked_post_processor.encoders[column].all_values.tolist() == \
+                sequential_post_processor.encoders[column].all_values.tolist()
+        for column in [2, 3]:
+            assert np.isclose(chunked_post_processor.encoders[column].mean, sequential_post_processor.encoders[column].mean)
+            assert np.isclose(chunked_post_processor.encoders[column].scale, sequential_post_processor.encoders[column].scale)
+
+    @pytest.mark.parametrize('sequential', [True, False])
+    def test_fit_on_empty_split(self, sequential):
+        iterator_meta = IteratorMeta(sample_pos=0, target_pos=1, tag_pos=2)
+        dataset_meta = DatasetMeta(identifier="identifier", dataset_name="dataset_name",
+                                   dataset_tag="dataset_tag", iterator_meta=iterator_meta)
+        iterator = InformedDatasetIterator(SequenceDatasetIterator([[], [], []]), dataset_meta)
+        feature_encoding_configs = [{"feature_type": "continuous", "feature_names": [0], "train_split": "train"}]
+        post_processor = FeatureEncoderPostProcessor(sample_position=0, feature_encoding_configs=feature_encoding_configs,
+                                                     sequential=sequential)
+        with pytest.raises(DataIntegrityError):
+            post_processor.fit({"train": iterator})
+
 
 class TestOneHotEncodedTargetPostProcessor:
 
@@ -80,6 +138,13 @@ class TestOneHotEncodedTargetPostProcessor:
         sample_postprocessed = postprocessor.postprocess(sample)
         assert len(sample_postprocessed[1]) == 10 and sample_postprocessed[1][sample[1]] == 1
 
+    def test_postprocess_batch(self):
+        samples = [(None, target, None) for target in [5, 0, 9]]
+        postprocessor = OneHotEncodedTargetPostProcessor(target_vector_size=10, target_position=1)
+        samples_postprocessed = postprocessor.postprocess_batch(samples)
+        for sample, sample_postprocessed in zip(samples, samples_postprocessed):
+            assert torch.equal(sample_postprocessed[1], postprocessor.postprocess(sample)[1])
+
 
 class TestLabelMapperPostProcessor:
 
@@ -94,3 +159,25 @@ class TestLabelMapperPostProcessor:
                                                  tag_position=2)
         sample_postprocessed = postprocessor.postprocess(sample)
         assert sample_postprocessed[1] == 1 and sample_postprocessed[2] == 0
+
+    @pytest.mark.parametrize('samples', [[(None, 5, 4), (None, 1, 3), (None, 2, 5)],
+                                         [(None, "a", "b"), (None, 5, "c")]])
+    def test_postprocess_batch(self, samples):
+        # the second mapping is applied on top of the first one
+        postprocessor = LabelMapperPostProcessor(mappings=[{"previous_labels": [5], "new_label": 1},
+                                                           {"previous_labels": [1, 4], "new_label": 0}],
+                                                 target_position=1,
+                                                 tag_position=2)
+        samples_postprocessed = postprocessor.postprocess_batch(samples)
+        assert samples_postprocessed == [postprocessor.postprocess(sample) for sample in samples]
+
+    def test_postprocess_batch_with_non_numeric_tags(self):
+        # the targets must not be mapped before falling back to the per sample postprocessing
+        postprocessor = LabelMapperPostProcessor(mappings=[{"previous_labels": [1], "new_label": 2},
+                                                           {"previous_labels": [3], "new_label": 1}],
+                                                 target_position=1,
+                                                 tag_position=2)
+        samples = [(None, 3, "x"), (None, 1, "y")]
+        samples_postprocessed = postprocessor.postprocess_batch(samples)
+        assert samples_postprocessed == [(None, 1, "x"), (None, 2, "y")]
+        assert samples_postprocessed == [postprocessor.postprocess(sample) for sample in samples]
@@ -2,11 +2,25 @@ import pytest
 from data_stack.dataset.iterator import InformedDatasetIteratorIF, SequenceDatasetIterator
 from data_stack.dataset.factory import InformedDatasetFactory
 from data_stack.dataset.meta import MetaFactory
-from ml_gym.data_handling.dataset_loader import SamplerFactory, DatasetLoaderFactory
+from ml_gym.data_handling.dataset_loader import SamplerFactory, DatasetLoaderFactory, DatasetLoader
+from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.batching.batch import DatasetBatch
+from dataclasses import dataclass
+from ml_gym.data_handling.label_index import LabelProviderIF
+import numpy as np
 import torch
 from collections import Counter
 
 
+class LabelProvidingIterator(SequenceDatasetIterator, LabelProviderIF):
+
+    def __getitem__(self, index: int):
+        raise AssertionError("Samples must not be materialised when the labels are provided.")
+
+    def get_labels(self, label_pos: int) -> np.ndarray:
+        return np.array(self._dataset_sequences[label_pos])
+
+
 class TestSamplerFactory:
 
     @pytest.fixture
@@ -41,6 +55,16 @@ class TestSamplerFactory:
         assert sample_weights[100] * 200 == 1
         assert sample_weights[300] * 300 == 1
 
+    def test_weighted_random_sampler_with_label_provider(self, iterator_train: InformedDatasetIteratorIF):
+        label_providing_iterator = LabelProvidingIterator([[3]*30 + [1]*10 + [2]*20])
+        sampler = SamplerFactory.get_weighted_sampler(label_providing_iterator, label_pos=0)
+        sample_weights = sampler.weights
+        assert sample_weights.dtype == torch.double
+        assert len(sample_weights) == len(label_providing_iterator)
+        assert sample_weights[0] * 30 == 1
+        assert sample_weights[30] * 10 == 1
+        assert sample_weights[40] * 20 == 1
+
     def test_split_data_loaders(self, iterator_train: InformedDatasetIteratorIF):
         torch.manual_seed(0)
         iterator_dict = {"random_split": iterator_train, "weighted_random_split": iterator_train, "in_order_split": iterator_train}
@@ -74,3 +98,112 @@ class TestSamplerFactory:
         assert Counter(weighted_samples) == {3: 212, 2: 201, 1: 187}
         
 
+
+
+@dataclass
+class SequenceCollator(Collator):
+
+    def __call__(self, batch):
+        samples = torch.tensor([sample[0] for sample in batch], device=self.device)
+        return DatasetBatch(samples=samples, targets={"target": samples.clone()})
+
+
+@dataclass
+class RandomNumberCollator(Collator):
+
+    def __call__(self, batch):
+        return np.random.randint(0, 2**31, size=len(batch))
+
+
+class TestDatasetLoader:
+
+    @pytest.fixture
+    def iterator(self) -> InformedDatasetIteratorIF:
+        iterator = SequenceDatasetIterator([list(range(100))])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=0, tag_pos=0)
+        meta = MetaFactory.get_dataset_meta(identifier="test dataset id", dataset_name="test_dataset", dataset_tag="train",
+                                            iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+
+    def test_multi_worker_loading(self, iterator: InformedDatasetIteratorIF):
+        collator = SequenceCollator()
+        sampler = SamplerFactory.get_sequential_sampler(iterator)
+        single_process_loader = DatasetLoader(iterator, batch_size=8, sampler=sampler, collate_fn=collator)
+        multi_worker_loader = DatasetLoader(iterator, batch_size=8, sampler=sampler, collate_fn=collator, num_workers=1,
+                                            prefetch_factor=4, persistent_workers=True)
+        multi_worker_loader.device = torch.device("cpu")
+        # the workers collate with their own CPU bound copy of the collator
+        assert multi_worker_loader.collate_fn is not collator
+        assert multi_worker_loader.collate_fn.device == torch.device("cpu")
+        assert multi_worker_loader.device == torch.device("cpu")
+        for _ in range(2):
+            single_process_samples = torch.cat([batch.samples for batch in single_process_loader])
+            multi_worker_samples = torch.cat([batch.samples for batch in multi_worker_loader])
+            assert torch.equal(single_process_samples, multi_worker_samples)
+
+    def test_shared_collator_device(self, iterator: InformedDatasetIteratorIF):
+        collator = SequenceCollator(device=torch.device("meta"))
+        sampler = SamplerFactory.get_sequential_sampler(iterator)
+        train_loader = DatasetLoader(iterator, batch_size=8, sampler=sampler, collate_fn=collator)
+        test_loader = DatasetLoader(iterator, batch_size=8, sampler=sampler, collate_fn=collator)
+        train_loader.device = torch.device("cpu")
+        # the loaders share the collator, hence, they report the device the batches are actually collated on
+        assert test_loader.device == torch.device("cpu")
+        assert next(iter(test_loader)).samples.device == torch.device("cpu")
+
+    def test_worker_seeding(self, iterator: InformedDatasetIteratorIF):
+        def get_random_numbers(worker_seed: int):
+            data_loaders = DatasetLoaderFactory.get_splitted_data_loaders(dataset_splits={"train": iterator}, batch_size=10,
+                                                                          collate_fn=RandomNumberCollator(), sampling_strategies={},
+                                                                          num_workers=1, worker_seed=worker_seed)
+            return np.concatenate([batch for batch in data_loaders["train"]])
+
+        random_numbers = get_random_numbers(worker_seed=1)
+        assert np.array_equal(random_numbers, get_random_numbers(worker_seed=1))
+        assert not np.array_equal(random_numbers, get_random_numbers(worker_seed=2))
+
+    @pytest.mark.parametrize("sampling_strategy", [{"strategy": "RANDOM", "seed": 1}, {"strategy": "WEIGHTED_RANDOM", "label_pos": 0, "seed": 1},
+                                                   {"strategy": "IN_ORDER"}])
+    def test_resume(self, iterator: InformedDatasetIteratorIF, sampling_strategy):
+        def get_data_loader() -> DatasetLoader:
+            return DatasetLoaderFactory.get_splitted_data_loaders(dataset_splits={"train": iterator}, batch_size=8,
+                                                                  collate_fn=SequenceCollator(),
+                                                                  sampling_strategies={"train": dict(sampling_strategy)})["train"]
+
+        data_loader = get_data_loader()
+        passes = []
+        for _ in range(3):
+            batches = []
+            for batch in data_loader:
+                batches.append(batch.samples)
+                if len(passes) == 1 and len(batches) == 2:
+                    mid_pass_state = data_loader.get_state()
+            passes.append(batches)
+            if len(passes) == 2:
+                end_of_pass_state = data_loader.get_state()
+
+        for state, num_passes, start_batch in [(mid_pass_state, 1, 5), (end_of_pass_state, 1, 10), (end_of_pass_state, 2, 3), ({}, 2, 4)]:
+            resumed_data_loader = get_data_loader()
+            resumed_data_loader.set_state(state)
+            resumed_data_loader.resume(num_passes=num_passes, start_batch=start_batch)
+            resumed_batches = [batch.samples for batch in resumed_data_loader]
+            assert len(resumed_batches) == len(passes[num_passes]) - start_batch
+            assert all(torch.equal(b1, b2) for b1, b2 in zip(resumed_batches, passes[num_passes][start_batch:]))
+            # after the resumed pass, the loader continues with the next pass
+            if num_passes + 1 < len(passes):
+                assert all(torch.equal(b1, b2.samples) for b1, b2 in zip(passes[num_passes + 1], resumed_data_loader))
+
+    def test_resume_skips_loading(self):
+        class CountingIterator(SequenceDatasetIterator):
+            num_loaded = 0
+
+            def __getitem__(self, index: int):
+                CountingIterator.num_loaded += 1
+                return super().__getitem__(index)
+
+        iterator = CountingIterator([list(range(100))])
+        data_loader = DatasetLoader(iterator, batch_size=10, sampler=SamplerFactory.get_random_sampler(iterator, seed=0),
+                                    collate_fn=SequenceCollator())
+        data_loader.resume(num_passes=3, start_batch=7)
+        assert len([batch for batch in data_loader]) == 3
+        assert CountingIterator.num_loaded == 30
@@ -0,0 +1,36 @@
+from typing import Any, Tuple
+import pytest
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from ml_gym.data_handling.iterator_identity import IteratorIdentity
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf
+import torch
+
+
+class ConfiguredPostProcessor(PostProcessorIf):
+
+    def __init__(self, config: Any):
+        self.config = config
+
+    def postprocess(self, sample: Tuple[Any]) -> Tuple[Any]:
+        return sample
+
+
+class TestIteratorIdentity:
+
+    @staticmethod
+    def get_key(config: Any) -> str:
+        iterator = PostProcessedDatasetIterator(SequenceDatasetIterator([list(range(10))]), ConfiguredPostProcessor(config))
+        return IteratorIdentity.get_hash(IteratorIdentity.get_identity(iterator))
+
+    @pytest.mark.parametrize("config, other_config", [
+        (torch.tensor([1., 2.]), torch.tensor([1., 3.])),
+        (torch.tensor([1., 2.]), torch.tensor([1, 2])),
+        ({"a", "b"}, {"a", "c"})
+    ])
+    def test_post_processor_config(self, config: Any, other_config: Any):
+        assert TestIteratorIdentity.get_key(config) != TestIteratorIdentity.get_key(other_config)
+
+    def test_set_order(self):
+        # the key does not depend on the insertion order of the set elements
+        assert TestIteratorIdentity.get_key({"a", "b", 3}) == TestIteratorIdentity.get_key({3, "b", "a"})
@@ -0,0 +1,79 @@
+import pytest
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor
+import numpy as np
+import torch
+
+
+class CountingIterator(SequenceDatasetIterator):
+
+    def __init__(self, dataset_sequences):
+        super().__init__(dataset_sequences)
+        self.num_accesses = 0
+
+    def __getitem__(self, index: int):
+        self.num_accesses += 1
+        return super().__getitem__(index)
+
+
+class TestLabelIndex:
+
+    @pytest.fixture
+    def iterator(self) -> CountingIterator:
+        samples = [torch.rand(3) for _ in range(20)]
+        targets = [torch.tensor(i % 4) for i in range(20)]
+        return CountingIterator([samples, targets])
+
+    def test_get_labels(self, iterator: CountingIterator):
+        labels = LabelIndex.get_labels(iterator, label_pos=1)
+        assert isinstance(labels, np.ndarray)
+        assert labels.tolist() == [i % 4 for i in range(20)]
+
+    def test_labels_are_cached(self, iterator: CountingIterator):
+        LabelIndex.get_labels(iterator, label_pos=1)
+        num_accesses = iterator.num_accesses
+        assert num_accesses == len(iterator)
+        LabelIndex.get_labels(iterator, label_pos=1)
+        assert iterator.num_accesses == num_accesses
+
+    def test_persisted_labels(self, tmp_path):
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+        meta = MetaFactory.get_dataset_meta(identifier="id", dataset_name="dataset", dataset_tag="train", iterator_meta=iterator_meta)
+        samples = list(range(10))
+        targets = [i % 3 for i in range(10)]
+
+        first_iterator = CountingIterator([samples, targets])
+        labels = LabelIndex.get_labels(InformedDatasetFactory.get_dataset_iterator(first_iterator, meta), 1, str(tmp_path))
+        assert first_iterator.num_accesses == len(first_iterator)
+        assert len(list(tmp_path.glob("labels_*.npy"))) == 1
+
+        # a freshly constructed iterator with the same identity is served from disk
+        second_iterator = CountingIterator([samples, targets])
+        persisted_labels = LabelIndex.get_labels(InformedDatasetFactory.get_dataset_iterator(second_iterator, meta), 1, str(tmp_path))
+        assert second_iterator.num_accesses == 0
+        assert persisted_labels.tolist() == labels.tolist() == targets
+
+    def test_persisted_labels_of_label_mapped_iterators(self, tmp_path):
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=1)
+        meta = MetaFactory.get_dataset_meta(identifier="id", dataset_name="dataset", dataset_tag="train", iterator_meta=iterator_meta)
+        iterator = SequenceDatasetIterator([list(range(10)), [i % 3 for i in range(10)]])
+
+        def get_label_mapped_labels(new_label: int) -> np.ndarray:
+            post_processor = LabelMapperPostProcessor(mappings=[{"previous_labels": [0], "new_label": new_label}],
+                                                      target_position=1, tag_position=1)
+            label_mapped_iterator = InformedDatasetFactory.get_dataset_iterator(PostProcessedDatasetIterator(iterator, post_processor), meta)
+            return LabelIndex.get_labels(label_mapped_iterator, 1, str(tmp_path))
+
+        # the iterators share the dataset meta, but the label mappings are part of the key
+        assert get_label_mapped_labels(5)[0] == 5
+        assert get_label_mapped_labels(7)[0] == 7
+        assert len(list(tmp_path.glob("labels_*.npy"))) == 2
+
+    def test_get_label_iterator(self, iterator: CountingIterator):
+        label_iterator = LabelIndex.get_label_iterator(iterator, label_pos=1)
+        assert len(label_iterator) == len(iterator)
+        assert [sample[1] for sample in label_iterator] == [i % 4 for i in range(20)]
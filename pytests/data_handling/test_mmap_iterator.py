@@ -0,0 +1,84 @@
+import pickle
+import pytest
+import numpy as np
+import torch
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.mmap_iterator import MMapDatasetIterator
+from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
+from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.error_handling.exception import DataIntegrityError
+
+
+class TestMMapDatasetIterator:
+
+    @pytest.fixture
+    def iterator(self):
+        samples = [torch.rand(2, 3) for _ in range(20)]
+        ragged = [torch.arange(i % 4) for i in range(20)]
+        targets = list(range(20))
+        names = [f"sample_{i}" for i in range(20)]
+        arrays = [np.full(2, i, dtype=np.float32) for i in range(20)]
+        tags = [None] * 20
+        iterator = SequenceDatasetIterator([samples, ragged, targets, names, arrays, tags])
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=2, tag_pos=3)
+        meta = MetaFactory.get_dataset_meta(identifier="id", dataset_name="dataset", dataset_tag="train", iterator_meta=iterator_meta)
+        return InformedDatasetFactory.get_dataset_iterator(iterator, meta)
+
+    def test_write_and_read(self, iterator, tmp_path):
+        directory = str(tmp_path / "dataset")
+        MMapDatasetIterator.write(iterator, directory)
+        mmap_iterator = MMapDatasetIterator(directory)
+        assert len(mmap_iterator) == len(iterator)
+        for i in range(len(iterator)):
+            sample, mmap_sample = iterator[i], mmap_iterator[i]
+            assert torch.equal(sample[0], mmap_sample[0])
+            assert torch.equal(sample[1], mmap_sample[1])
+            assert sample[2] == mmap_sample[2] and isinstance(mmap_sample[2], int)
+            assert sample[3] == mmap_sample[3]
+            assert np.array_equal(sample[4], mmap_sample[4]) and mmap_sample[4].dtype == np.float32
+            assert mmap_sample[5] is None
+        assert [sample[2] for sample in mmap_iterator] == list(range(20))
+
+    def test_labels_and_pickling(self, iterator, tmp_path):
+        directory = str(tmp_path / "dataset")
+        MMapDatasetIterator.write(iterator, directory)
+        mmap_iterator = MMapDatasetIterator(directory)
+        assert mmap_iterator.get_labels(2).tolist() == list(range(20))
+        unpickled_iterator = pickle.loads(pickle.dumps(mmap_iterator))
+        assert torch.equal(unpickled_iterator[3][0], iterator[3][0])
+
+    def test_inconsistent_types(self, tmp_path):
+        iterator = SequenceDatasetIterator([[1, "a"]])
+        with pytest.raises(DataIntegrityError):
+            MMapDatasetIterator.write(iterator, str(tmp_path / "dataset"))
+        assert not MMapDatasetIterator.is_written(str(tmp_path / "dataset"))
+
+    def test_factory(self, iterator, tmp_path):
+        mmap_iterator = ModelGymInformedIteratorFactory.get_mmap_iterator("mmap_id", iterator, str(tmp_path))
+        assert mmap_iterator.dataset_meta.identifier == "mmap_id"
+        assert mmap_iterator.dataset_meta.dataset_tag == "train"
+        # an existing memory-mapped dataset is reused
+        assert len(ModelGymInformedIteratorFactory.get_mmap_iterator("mmap_id", iterator, str(tmp_path))) == len(iterator)
+        assert len(list(tmp_path.iterdir())) == 1
+        # labels are read from the memory-mapped column, also through views
+        view = InformedDatasetFactory.get_dataset_iterator_view(mmap_iterator, mmap_iterator.dataset_meta, [3, 5, 7])
+        assert LabelIndex.get_labels(view, 2).tolist() == [3, 5, 7]
+
+    def test_factory_tells_post_processed_iterators_apart(self, iterator, tmp_path):
+        def get_label_mapped_iterator(new_label: int):
+            post_processor = LabelMapperPostProcessor(mappings=[{"previous_labels": [0], "new_label": new_label}],
+                                                      target_position=2, tag_position=3)
+            return InformedDatasetFactory.get_dataset_iterator(PostProcessedDatasetIterator(iterator, post_processor),
+                                                               iterator.dataset_meta)
+
+        # the iterators share the dataset meta, but differ in their label mapping
+        first_mmap_iterator = ModelGymInformedIteratorFactory.get_mmap_iterator("mmap_id", get_label_mapped_iterator(100), str(tmp_path))
+        second_mmap_iterator = ModelGymInformedIteratorFactory.get_mmap_iterator("mmap_id", get_label_mapped_iterator(200), str(tmp_path))
+        assert first_mmap_iterator[0][2] == 100 and second_mmap_iterator[0][2] == 200
+        assert len(list(tmp_path.iterdir())) == 2
+        ModelGymInformedIteratorFactory.get_mmap_iterator("mmap_id", get_label_mapped_iterator(100), str(tmp_path))
+        assert len(list(tmp_path.iterdir())) == 2
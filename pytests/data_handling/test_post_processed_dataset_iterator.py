@@ -1,8 +1,11 @@
 import pytest
 from data_stack.dataset.iterator import InformedDatasetIterator
 from data_stack.dataset.meta import IteratorMeta, DatasetMeta
-from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
-from ml_gym.data_handling.postprocessors.postprocessor import OneHotEncodedTargetPostProcessor
+from data_stack.dataset.factory import InformedDatasetFactory
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator, BatchedFetchDatasetIterator
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.postprocessors.postprocessor import OneHotEncodedTargetPostProcessor, LabelMapperPostProcessor
+import torch
 
 from postprocessors.mocked_class import MockedIterator
 
@@ -29,3 +32,28 @@ class TestPostProcessedDatasetIterator:
         assert postprocess_dataset_iterator.underlying_iterators[0] == iterator
         item = postprocess_dataset_iterator[1]
         assert int(item[1][3].numpy()) == 1
+
+    def test_getitems(self, iterator, post_processor):
+        postprocess_dataset_iterator = PostProcessedDatasetIterator(dataset_iterator=iterator,
+                                                                    post_processor=post_processor)
+        indices = [3, 1, 4, 1, 5]
+        items = postprocess_dataset_iterator.__getitems__(indices)
+        assert len(items) == len(indices)
+        for index, item in zip(indices, items):
+            expected_item = postprocess_dataset_iterator[index]
+            assert torch.equal(item[0], expected_item[0])
+            assert torch.equal(item[1], expected_item[1])
+
+    def test_batched_fetch_in_data_loader(self, iterator):
+        label_mapper = LabelMapperPostProcessor(mappings=[{"previous_labels": [0, 1], "new_label": 7}], target_position=1, tag_position=2)
+        postprocess_dataset_iterator = PostProcessedDatasetIterator(dataset_iterator=iterator, post_processor=label_mapper)
+        informed_iterator = InformedDatasetFactory.get_dataset_iterator(postprocess_dataset_iterator, iterator.dataset_meta)
+        # batched fetching is resolved through views as well
+        view = InformedDatasetFactory.get_dataset_iterator_view(informed_iterator, iterator.dataset_meta, list(range(0, 500, 2)))
+        data_loader = DatasetLoader(dataset_iterator=view, batch_size=16, sampler=SamplerFactory.get_sequential_sampler(view),
+                                    collate_fn=lambda batch: torch.tensor([int(sample[1]) for sample in batch]))
+        assert isinstance(data_loader.dataset, BatchedFetchDatasetIterator)
+        assert data_loader.dataset_name == "dataset_name"
+        targets = torch.cat([batch for batch in data_loader])
+        assert targets.tolist() == [int(view[i][1]) for i in range(len(view))]
+        assert set(targets.tolist()) == {7, 4, 3, 2}
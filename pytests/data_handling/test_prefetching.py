@@ -0,0 +1,60 @@
+import threading
+import pytest
+import torch
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.prefetching import BatchPrefetcher
+
+
+class TestBatchPrefetcher:
+    num_batches = 10
+
+    @pytest.fixture
+    def batches(self):
+        return [DatasetBatch(samples=torch.full((2, 3), i), targets={"target": torch.full((2,), i)}, tags=torch.arange(2))
+                for i in range(TestBatchPrefetcher.num_batches)]
+
+    @pytest.mark.parametrize("depth", [1, 3])
+    def test_iteration(self, batches, depth: int):
+        prefetcher = BatchPrefetcher(list(enumerate(batches)), device=torch.device("cpu"), depth=depth)
+        assert len(prefetcher) == TestBatchPrefetcher.num_batches
+        items = list(prefetcher)
+        assert [batch_id for batch_id, _ in items] == list(range(TestBatchPrefetcher.num_batches))
+        assert all(batch.samples[0, 0] == batch_id for batch_id, batch in items)
+        # the prefetcher can be iterated repeatedly
+        assert len(list(prefetcher)) == TestBatchPrefetcher.num_batches
+
+    def test_epoch_boundaries(self, batches):
+        fetched_ids = []
+
+        def fetch():
+            for batch_id, batch in enumerate(batches):
+                fetched_ids.append(batch_id)
+                yield batch_id, batch
+
+        prefetcher = BatchPrefetcher(fetch(), depth=4, is_epoch_end_fun=lambda item: (item[0] + 1) % 3 == 0)
+        iterator = iter(prefetcher)
+        for _ in range(3):
+            next(iterator)
+        # the batches of the next epoch are not fetched before the consumer continues after the last batch of an epoch
+        threading.Event().wait(0.2)
+        assert fetched_ids == [0, 1, 2]
+        assert next(iterator)[0] == 3
+        iterator.close()
+
+    def test_producer_error(self):
+        def fetch():
+            yield 0
+            raise ValueError("loader failed")
+
+        iterator = iter(BatchPrefetcher(fetch()))
+        assert next(iterator) == 0
+        with pytest.raises(ValueError, match="loader failed"):
+            next(iterator)
+
+    def test_early_stop(self, batches):
+        iterator = iter(BatchPrefetcher(batches, depth=1))
+        next(iterator)
+        num_threads = threading.active_count()
+        # closing the iterator early stops the blocked background thread
+        iterator.close()
+        assert threading.active_count() == num_threads - 1
@@ -0,0 +1,38 @@
+import numpy as np
+import os
+from ml_gym.data_handling.split_index_store import SplitIndexStore
+from ml_gym.validation.cross_validation import CrossValidation
+from ml_gym.validation.nested_cross_validation import NestedCV
+
+
+class TestSplitIndexStore:
+
+    def test_put_and_resolve(self, tmp_path):
+        split_index_store = SplitIndexStore(str(tmp_path))
+        reference = split_index_store.put([4, 2, 7])
+        assert SplitIndexStore.is_reference(reference)
+        assert not SplitIndexStore.is_reference([4, 2, 7])
+        assert SplitIndexStore.resolve(reference).tolist() == [4, 2, 7]
+        # identical splits are stored once
+        assert split_index_store.put(np.array([4, 2, 7])) == reference
+        assert split_index_store.put([4, 2]) != reference
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_cv_splits(self, tmp_path):
+        folds_indices = [[0, 3], [1, 4], [2, 5]]
+        inline_splits = CrossValidation._create_folds_splits(folds_indices)
+        referenced_splits = CrossValidation._create_folds_splits(folds_indices, SplitIndexStore(str(tmp_path)))
+        assert inline_splits[1]["id_split_indices"] == {"train": [0, 3, 2, 5], "val": [1, 4]}
+        for inline_split, referenced_split in zip(inline_splits, referenced_splits):
+            for split_name, reference in referenced_split["id_split_indices"].items():
+                assert SplitIndexStore.resolve(reference).tolist() == inline_split["id_split_indices"][split_name]
+
+    def test_nested_cv_splits(self, tmp_path):
+        outer_folds_indices = [[0, 3], [1, 4], [2, 5]]
+        inner_folds_indices = [[[1, 2], [4, 5]], [[0, 2], [3, 5]], [[0, 1], [3, 4]]]
+        split_index_store = SplitIndexStore(str(tmp_path))
+        outer_splits = NestedCV._create_outer_folds_splits(outer_folds_indices, split_index_store)
+        inner_splits = NestedCV._create_inner_folds_splits(inner_folds_indices, split_index_store)
+        assert SplitIndexStore.resolve(outer_splits[2]["id_split_indices"]["train"]).tolist() == [0, 3, 1, 4]
+        assert SplitIndexStore.resolve(inner_splits[3]["id_split_indices"]["train"]).tolist() == [0, 2]
+        assert NestedCV._create_inner_folds_splits(inner_folds_indices)[3]["id_split_indices"] == {"train": [0, 2], "test": [3, 5]}
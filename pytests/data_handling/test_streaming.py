@@ -0,0 +1,118 @@
+import pytest
+import numpy as np
+import torch
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from data_stack.dataset.factory import InformedDatasetFactory
+from data_stack.dataset.meta import MetaFactory
+from ml_gym.data_handling.streaming import StreamingDatasetIterator
+from ml_gym.data_handling.dataset_loader import DatasetLoader
+
+
+def collate_ids(batch):
+    return torch.tensor([sample[0] for sample in batch])
+
+
+class TestStreamingDatasetIterator:
+
+    @pytest.fixture
+    def meta(self):
+        iterator_meta = MetaFactory.get_iterator_meta(sample_pos=0, target_pos=1, tag_pos=2)
+        return MetaFactory.get_dataset_meta(identifier="id", dataset_name="dataset", dataset_tag="train", iterator_meta=iterator_meta)
+
+    @pytest.fixture
+    def shards(self, meta):
+        shard_lengths = [23, 40, 17]
+        shards, offset = [], 0
+        for length in shard_lengths:
+            ids = list(range(offset, offset + length))
+            # class 1 is underrepresented
+            targets = [1 if i % 10 == 0 else 0 for i in ids]
+            shards.append(InformedDatasetFactory.get_dataset_iterator(SequenceDatasetIterator([ids, targets, ids]), meta))
+            offset += length
+        return shards
+
+    @staticmethod
+    def get_stream(shards, meta, **params) -> StreamingDatasetIterator:
+        stream = StreamingDatasetIterator(shards=shards, dataset_meta=meta, chunk_size=7, **params)
+        stream.begin_epoch()
+        return stream
+
+    def test_sequential_stream(self, shards, meta):
+        stream = self.get_stream(shards, meta)
+        assert len(stream) == 80
+        assert [sample[0] for sample in stream] == list(range(80))
+
+    def test_iterable_shards(self, shards, meta):
+        stream = self.get_stream([map(shard.__getitem__, range(len(shard))) for shard in shards], meta, num_samples=80)
+        assert len(stream) == 80
+        assert [sample[0] for sample in stream] == list(range(80))
+
+    def test_bounded_shuffling(self, shards, meta):
+        stream = self.get_stream(shards, meta, shuffle_buffer_size=16, seed=1)
+        ids = [sample[0] for sample in stream]
+        assert ids != list(range(80)) and sorted(ids) == list(range(80))
+        # samples are only shuffled within their buffer
+        for block_start in range(0, 80, 16):
+            assert sorted(ids[block_start:block_start + 16]) == list(range(block_start, min(block_start + 16, 80)))
+        # epochs are shuffled differently
+        stream.begin_epoch()
+        assert [sample[0] for sample in stream] != ids
+
+    def test_shard_shuffling(self, shards, meta):
+        stream = self.get_stream(shards, meta, shuffle_shards=True, seed=3)
+        ids = [sample[0] for sample in stream]
+        assert ids != list(range(80)) and sorted(ids) == list(range(80))
+        # the shards are read in a random order, but each shard is read sequentially
+        shard_starts = [i for i in range(80) if i == 0 or ids[i] != ids[i - 1] + 1]
+        assert len(shard_starts) <= 3 and {ids[i] for i in shard_starts} <= {0, 23, 63}
+
+    def test_class_weighted_sampling(self, shards, meta):
+        stream = self.get_stream(shards, meta, shuffle_buffer_size=40, class_weighted_sampling=True)
+        targets = np.array([sample[1] for sample in stream])
+        assert len(targets) == 80
+        # class 1 makes up 10% of the dataset and is upsampled to roughly 50%
+        assert 0.3 < targets.mean() < 0.7
+
+    @pytest.mark.parametrize("params", [{}, {"shuffle_buffer_size": 16}, {"shuffle_buffer_size": 16, "class_weighted_sampling": True}])
+    def test_resume_from_offset(self, shards, meta, params):
+        stream = self.get_stream(shards, meta, seed=5, **params)
+        stream.begin_epoch()
+        epoch_samples = [sample[0] for sample in stream]
+        for offset in [0, 5, 16, 37, 79]:
+            resumed_stream = StreamingDatasetIterator(shards=shards, dataset_meta=meta, chunk_size=7, seed=5, **params)
+            resumed_stream.set_stream_position(epoch=1, stream_offset=offset)
+            resumed_stream.begin_epoch()
+            assert [sample[0] for sample in resumed_stream] == epoch_samples[offset:]
+
+    def test_data_loader(self, shards, meta):
+        stream = StreamingDatasetIterator(shards=shards, dataset_meta=meta, chunk_size=7, shuffle_buffer_size=16)
+        data_loader = DatasetLoader(stream, batch_size=10, sampler=None, collate_fn=lambda batch: torch.tensor([s[0] for s in batch]))
+        assert len(data_loader) == 8
+        first_epoch = torch.cat(list(data_loader))
+        second_epoch = torch.cat(list(data_loader))
+        assert sorted(first_epoch.tolist()) == sorted(second_epoch.tolist()) == list(range(80))
+        assert not torch.equal(first_epoch, second_epoch)
+        assert stream.epoch == 1
+
+    def test_untracked_passes(self, shards, meta):
+        stream = StreamingDatasetIterator(shards=shards, dataset_meta=meta, chunk_size=7, shuffle_buffer_size=16)
+        data_loader = DatasetLoader(stream, batch_size=10, sampler=None, collate_fn=lambda batch: torch.tensor([s[0] for s in batch]))
+        first_epoch = torch.cat(list(data_loader))
+        with data_loader.untracked_passes():
+            assert sorted(torch.cat(list(data_loader)).tolist()) == list(range(80))
+        # the untracked pass does not advance the epoch of the stream
+        assert stream.get_stream_position() == (1, 0)
+        second_epoch = torch.cat(list(data_loader))
+        assert not torch.equal(first_epoch, second_epoch) and stream.epoch == 1
+
+    def test_resume_with_workers(self, shards, meta):
+        stream = StreamingDatasetIterator(shards=shards, dataset_meta=meta, chunk_size=7, shuffle_buffer_size=16)
+        data_loader = DatasetLoader(stream, batch_size=4, sampler=None, collate_fn=collate_ids, num_workers=2)
+        list(data_loader)
+        second_epoch = torch.cat(list(data_loader))
+        # resuming at the beginning of a pass continues with the same batches
+        data_loader.resume(num_passes=1, start_batch=0)
+        assert torch.equal(torch.cat(list(data_loader)), second_epoch)
+        # within a pass, the batch index does not translate to a stream offset, as the batches of the workers are interleaved
+        with pytest.raises(ValueError):
+            data_loader.resume(num_passes=1, start_batch=2)
@@ -0,0 +1,63 @@
+from functools import partial
+from typing import Iterable, Tuple
+import pytest
+import torch
+from data_stack.dataset.iterator import SequenceDatasetIterator
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.data_handling.dataset_loader import DatasetLoader, SamplerFactory
+from ml_gym.data_handling.prefetching import BatchPrefetcher
+from ml_gym.gym.trainers.standard_trainer import TrainComponent, Trainer
+
+
+class TestDataLoaderStack:
+
+    @staticmethod
+    def get_data_loader() -> DatasetLoader:
+        iterator = SequenceDatasetIterator([list(range(50))])
+        return DatasetLoader(iterator, batch_size=8, sampler=SamplerFactory.get_random_sampler(iterator, seed=3),
+                             collate_fn=lambda batch: torch.tensor([sample[0] for sample in batch]))
+
+    @pytest.mark.parametrize("num_batches_per_epoch, initial_epoch", [(7, 2), (5, 2), (10, 3)])
+    @pytest.mark.parametrize("evaluate_train_split", [False, True])
+    def test_warm_start(self, num_batches_per_epoch: int, initial_epoch: int, evaluate_train_split: bool):
+        num_epochs = 5
+        data_loader = self.get_data_loader()
+        data_loader_stack = TrainComponent._prepare_data_loader_stack(data_loader, num_epochs=num_epochs, initial_epoch=0,
+                                                                      num_batches_per_epoch=num_batches_per_epoch)
+        batches = []
+        for batch_id, batch in data_loader_stack:
+            batches.append(batch)
+            if (batch_id + 1) % num_batches_per_epoch == 0 and evaluate_train_split:
+                # the evaluator iterates the same loader at the end of each epoch
+                with data_loader.untracked_passes():
+                    assert sorted(torch.cat(list(data_loader)).tolist()) == list(range(50))
+            if batch_id + 1 == initial_epoch * num_batches_per_epoch:
+                # the trainer state is checkpointed at the end of the epoch
+                trainer_state = Trainer(None, data_loader).get_state()
+        assert len(batches) == num_epochs * num_batches_per_epoch
+
+        resumed_data_loader = self.get_data_loader()
+        Trainer(None, resumed_data_loader).set_state(trainer_state)
+        resumed_data_loader_stack = TrainComponent._prepare_data_loader_stack(resumed_data_loader, num_epochs=num_epochs,
+                                                                              initial_epoch=initial_epoch,
+                                                                              num_batches_per_epoch=num_batches_per_epoch)
+        resumed = list(resumed_data_loader_stack)
+        skipped_batches = initial_epoch * num_batches_per_epoch
+        assert [batch_id for batch_id, _ in resumed] == list(range(len(batches) - skipped_batches))
+        assert all(torch.equal(batch, resumed_batch) for batch, (_, resumed_batch) in zip(batches[skipped_batches:], resumed))
+
+    @pytest.mark.parametrize("num_batches_per_epoch", [1, 3, 4])
+    def test_prefetched_data_loader_stack(self, num_batches_per_epoch: int):
+        def get_data_loader_stack() -> Iterable[Tuple[int, DatasetBatch]]:
+            data_loader = self.get_data_loader()
+            data_loader.collate_fn = lambda batch: DatasetBatch(samples=torch.tensor([sample[0] for sample in batch]),
+                                                                targets={}, tags=None)
+            return TrainComponent._prepare_data_loader_stack(data_loader, num_epochs=3, initial_epoch=0,
+                                                             num_batches_per_epoch=num_batches_per_epoch)
+
+        is_epoch_end_fun = partial(TrainComponent._is_epoch_end, num_batches_per_epoch=num_batches_per_epoch)
+        prefetched = list(BatchPrefetcher(get_data_loader_stack(), device=torch.device("cpu"), depth=2,
+                                          is_epoch_end_fun=is_epoch_end_fun))
+        expected = list(get_data_loader_stack())
+        assert [batch_id for batch_id, _ in prefetched] == list(range(3 * num_batches_per_epoch))
+        assert all(torch.equal(batch.samples, expected_batch.samples) for (_, batch), (_, expected_batch) in zip(prefetched, expected))
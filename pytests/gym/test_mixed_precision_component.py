@@ -0,0 +1,129 @@
+import pytest
+import torch
+from torch.optim.sgd import SGD
+from ml_gym.error_handling.exception import PrecisionPolicyError
+from ml_gym.gym.mixed_precision_component import MixedPrecisionComponent
+from ml_gym.batching.batch import DatasetBatch
+from ml_gym.gym.trainers.standard_trainer import TrainComponent
+from ml_gym.optimizers.optimizer import OptimizerAdapter
+
+
+class TestMixedPrecisionComponent:
+
+    @pytest.fixture
+    def device(self) -> torch.device:
+        return torch.device("cpu")
+
+    @pytest.fixture
+    def model(self) -> torch.nn.Module:
+        torch.manual_seed(0)
+        return torch.nn.Linear(4, 1)
+
+    @staticmethod
+    def get_optimizer(model: torch.nn.Module) -> OptimizerAdapter:
+        optimizer = OptimizerAdapter(SGD, {"lr": 0.1})
+        optimizer.register_model_params(dict(model.named_parameters()))
+        return optimizer
+
+    def test_invalid_precision(self):
+        with pytest.raises(PrecisionPolicyError):
+            MixedPrecisionComponent(precision="fp8")
+
+    @pytest.mark.parametrize("precision", [MixedPrecisionComponent.Precision.FP32, MixedPrecisionComponent.Precision.BF16])
+    def test_step_without_loss_scaling(self, precision: str, model: torch.nn.Module, device: torch.device):
+        mixed_precision_component = MixedPrecisionComponent(precision=precision)
+        optimizer = TestMixedPrecisionComponent.get_optimizer(model)
+        weight = model.weight.detach().clone()
+        with mixed_precision_component.autocast(device):
+            loss = model(torch.ones(2, 4)).sum()
+        mixed_precision_component.backward(loss, device)
+        mixed_precision_component.step(optimizer, device)
+        assert not torch.equal(weight, model.weight)
+        assert mixed_precision_component.get_state() == {}
+
+    def test_fp16_loss_scaling(self, model: torch.nn.Module, device: torch.device):
+        mixed_precision_component = MixedPrecisionComponent(precision=MixedPrecisionComponent.Precision.FP16,
+                                                             loss_scaler_params={"init_scale": 2.**10, "growth_interval": 1})
+        optimizer = TestMixedPrecisionComponent.get_optimizer(model)
+        with mixed_precision_component.autocast(device):
+            loss = model(torch.ones(2, 4)).sum()
+        mixed_precision_component.backward(loss, device)
+        # the gradients are unscaled before the step
+        expected_weight = model.weight.detach() - 0.1 * model.weight.grad / 2.**10
+        mixed_precision_component.step(optimizer, device)
+        assert torch.allclose(expected_weight, model.weight)
+        assert mixed_precision_component.get_state()["loss_scaler"]["scale"] == 2.**11
+
+    def test_loss_scaler_state(self, model: torch.nn.Module, device: torch.device):
+        mixed_precision_component = MixedPrecisionComponent(precision=MixedPrecisionComponent.Precision.FP16,
+                                                            loss_scaler_params={"init_scale": 2.**10})
+        # the scale is halved when the gradients overflow
+        mixed_precision_component.backward(model(torch.full((2, 4), float("inf"))).sum(), device)
+        mixed_precision_component.step(TestMixedPrecisionComponent.get_optimizer(model), device)
+        state = mixed_precision_component.get_state()
+        assert state["loss_scaler"]["scale"] == 2.**9
+
+        # a warm started component resumes with the checkpointed scale, even before the scaler is created
+        warm_started_component = MixedPrecisionComponent(precision=MixedPrecisionComponent.Precision.FP16)
+        warm_started_component.set_state(state)
+        assert warm_started_component.get_state() == state
+        assert warm_started_component._get_loss_scaler(device).get_scale() == 2.**9
+
+    @pytest.mark.filterwarnings("ignore::UserWarning", "ignore::FutureWarning")
+    def test_fp16_without_device_agnostic_loss_scaler(self, model: torch.nn.Module, device: torch.device, monkeypatch):
+        # torch < 2.3 only provides the CUDA scaler, which disables itself on other devices
+        monkeypatch.delattr(torch.amp, "GradScaler")
+        mixed_precision_component = MixedPrecisionComponent(precision=MixedPrecisionComponent.Precision.FP16)
+        optimizer = TestMixedPrecisionComponent.get_optimizer(model)
+        with mixed_precision_component.autocast(device):
+            loss = model(torch.ones(2, 4)).sum()
+        mixed_precision_component.backward(loss, device)
+        expected_weight = model.weight.detach() - 0.1 * model.weight.grad
+        mixed_precision_component.step(optimizer, device)
+        assert torch.allclose(expected_weight, model.weight)
+
+    @pytest.mark.parametrize("gradient_accumulation_steps, num_batches_per_epoch, expected_steps",
+                             [(1, 3, [(0, 1), (0, 1), (0, 1)]),
+                              (2, 5, [(0, 2), (1, 2), (0, 2), (1, 2), (0, 1)]),
+                              (4, 3, [(0, 3), (1, 3), (2, 3)])])
+    def test_gradient_accumulation_steps(self, gradient_accumulation_steps: int, num_batches_per_epoch: int,
+                                         expected_steps):
+        train_component = TrainComponent(None, [], None, gradient_accumulation_steps=gradient_accumulation_steps)
+        # the accumulation restarts at each epoch boundary
+        for batch_id in range(2 * num_batches_per_epoch):
+            accumulation_step = train_component._get_accumulation_step(batch_id, num_batches_per_epoch)
+            assert accumulation_step == expected_steps[batch_id % num_batches_per_epoch]
+
+    def test_train_batch_gradient_accumulation(self, device: torch.device):
+        class MSETrainComponent(TrainComponent):
+            def calc_loss(self, model: torch.nn.Module, batch: DatasetBatch) -> torch.Tensor:
+                return (model(batch.samples) - batch.targets["target"]).pow(2).mean()
+
+        torch.manual_seed(0)
+        samples, targets = torch.randn(8, 4), torch.randn(8, 1)
+        models = [torch.nn.Linear(4, 1) for _ in range(2)]
+        models[1].load_state_dict(models[0].state_dict())
+
+        # the fast path on the full batch
+        train_component = MSETrainComponent(None, [], None)
+        optimizer = TestMixedPrecisionComponent.get_optimizer(models[0])
+        train_component._train_batch(DatasetBatch(samples=samples, targets={"target": targets}, tags=torch.arange(8)), models[0], optimizer, device)
+        assert all(parameter.grad is not None for parameter in models[0].parameters())
+
+        # the accumulated gradients of both halves equal the gradients of the full batch
+        train_component = MSETrainComponent(None, [], None, gradient_accumulation_steps=2)
+        optimizer = TestMixedPrecisionComponent.get_optimizer(models[1])
+        for accumulation_step in range(2):
+            batch = DatasetBatch(samples=samples[4*accumulation_step:4*(accumulation_step+1)],
+                                 targets={"target": targets[4*accumulation_step:4*(accumulation_step+1)]},
+                                 tags=torch.arange(4))
+            train_component._train_batch(batch, models[1], optimizer, device, accumulation_step=accumulation_step,
+                                         num_accumulation_steps=2)
+        for parameter, accumulated_parameter in zip(models[0].parameters(), models[1].parameters()):
+            assert torch.allclose(parameter, accumulated_parameter)
+
+    def test_train_component_state(self):
+        mixed_precision_component = MixedPrecisionComponent(precision=MixedPrecisionComponent.Precision.FP16)
+        mixed_precision_component.set_state({"loss_scaler": {"scale": 4.0}})
+        train_component = TrainComponent(None, [], None, mixed_precision_component=mixed_precision_component)
+        assert train_component.get_state()["mixed_precision_component"] == {"loss_scaler": {"scale": 4.0}}
@@ -0,0 +1,86 @@
+from typing import List
+import pytest
+import torch
+from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.loss_functions.loss_functions import LPLoss, CrossEntropyLoss, Loss
+from ml_gym.loss_functions.loss_scaler import MeanScaler, NoScaler, Scaler
+from ml_gym.loss_functions.multi_term_loss_functions import MultiLoss
+
+
+class ConstantScaler(Scaler):
+    # scaler without a constant scale factor, which is not fused
+    def train(self, loss: torch.Tensor):
+        pass
+
+    def warm_up(self, loss: torch.Tensor):
+        pass
+
+    def finish_warmup(self):
+        pass
+
+    def scale(self, tensor: torch.Tensor) -> torch.Tensor:
+        return tensor + 1
+
+
+class CountingInferenceResultBatch(InferenceResultBatch):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_gathered_targets = 0
+
+    def get_targets(self, key: str) -> torch.Tensor:
+        self.num_gathered_targets += 1
+        return super().get_targets(key)
+
+
+class TestMultiLoss:
+    target_key = "target_key"
+    prediction_key = "prediction_key"
+    class_key = "class_key"
+    logits_key = "logits_key"
+
+    @pytest.fixture
+    def inference_result_batch(self) -> CountingInferenceResultBatch:
+        torch.manual_seed(0)
+        return CountingInferenceResultBatch(targets={TestMultiLoss.target_key: torch.randn(8, 3),
+                                                     TestMultiLoss.class_key: torch.randint(0, 4, (8,))},
+                                            predictions={TestMultiLoss.prediction_key: torch.randn(8, 3, requires_grad=True),
+                                                         TestMultiLoss.logits_key: torch.randn(8, 4, requires_grad=True)},
+                                            tags=torch.arange(8))
+
+    @staticmethod
+    def get_multi_loss(scalers, fused: bool) -> MultiLoss:
+        loss_terms = [LPLoss(TestMultiLoss.target_key, TestMultiLoss.prediction_key, exponent=2, average_batch_loss=False),
+                      LPLoss(TestMultiLoss.target_key, TestMultiLoss.prediction_key, exponent=1, average_batch_loss=False),
+                      CrossEntropyLoss(TestMultiLoss.class_key, TestMultiLoss.logits_key, average_batch_loss=False)]
+        return MultiLoss(tag="multi_loss", scalers=scalers, loss_terms=loss_terms, loss_weights=[0.5, 2.0, 1.0], fused=fused)
+
+    @pytest.mark.parametrize("scalers", [lambda: [MeanScaler(), NoScaler(), MeanScaler()],
+                                         lambda: [MeanScaler(), ConstantScaler(), NoScaler()]])
+    def test_fused_loss(self, inference_result_batch: CountingInferenceResultBatch, scalers):
+        fused_loss = TestMultiLoss.get_multi_loss(scalers(), fused=True)
+        loss = TestMultiLoss.get_multi_loss(scalers(), fused=False)
+        for multi_loss in [fused_loss, loss]:
+            multi_loss.scalers[0].mean = 4.0
+
+        expected_loss_tensor = loss(inference_result_batch)
+        inference_result_batch.num_gathered_targets = 0
+        fused_loss_tensor = fused_loss(inference_result_batch)
+        # the LP loss terms share their gathered tensors
+        assert inference_result_batch.num_gathered_targets == 2
+        assert fused_loss_tensor.shape == expected_loss_tensor.shape
+        assert torch.allclose(fused_loss_tensor, expected_loss_tensor)
+
+        fused_loss_tensor.sum().backward()
+        assert inference_result_batch.predictions[TestMultiLoss.prediction_key].grad is not None
+
+    def test_warm_up(self, inference_result_batch: CountingInferenceResultBatch):
+        multi_loss = TestMultiLoss.get_multi_loss([MeanScaler(), MeanScaler(), NoScaler()], fused=True)
+        loss_terms: List[Loss] = multi_loss.loss_terms
+        warmup_loss_tensors = [[], []]
+        for _ in range(3):
+            multi_loss.warm_up(inference_result_batch)
+            for i in range(2):
+                warmup_loss_tensors[i].append(loss_terms[i](inference_result_batch))
+        multi_loss.finish_warmup()
+        for i in range(2):
+            assert multi_loss.scalers[i].mean == pytest.approx(torch.cat(warmup_loss_tensors[i]).mean().item())
@@ -28,6 +28,14 @@ class TestMeanScaler:
         mean_scaler.set_state(state)
         assert state["mean"] == mean_scaler.get_state()["mean"]
 
+    def test_warm_up(self, loss):
+        mean_scaler = MeanScaler()
+        for i in range(3):
+            mean_scaler.warm_up(loss * i)
+        mean_scaler.finish_warmup()
+        assert mean_scaler.mean == pytest.approx(torch.cat([loss * i for i in range(3)]).mean().item())
+        assert mean_scaler.scale(1) == 1 / mean_scaler.mean
+
 
 class TestNoScaler:
     @pytest.fixture
@@ -42,3 +50,4 @@ class TestNoScaler:
         scaler = NoScaler()
         scaler.train(loss=loss)
         assert scaler.scale(value) == value
+
@@ -1,8 +1,10 @@
+import copy
 import pytest
 import torch
 from ml_gym.batching.batch import InferenceResultBatch
 from ml_gym.metrics.metrics import binary_aupr_score, binary_auroc_score, PredictionMetric, ClassSpecificExpectedCalibrationErrorMetric, \
-    BrierScoreMetric, BinaryClasswiseExpectedCalibrationErrorMetric
+    BrierScoreMetric, BinaryClasswiseExpectedCalibrationErrorMetric, StreamingPredictionMetric, RecallAtKMetric, AreaUnderRecallAtKMetric
+from sklearn.metrics import accuracy_score, f1_score
 from ml_gym.metrics.metric_factory import MetricFactory
 import numpy as np
 
@@ -63,41 +65,6 @@ class TestExpectedCalibrationError:
                                     predictions={TestExpectedCalibrationError.prediction_probability_key: prediction_probabilities},
                                     tags=None)
 
-    def test__calc_prevalence(self, probability_inference_batch_result: InferenceResultBatch):
-        ece_metric = ClassSpecificExpectedCalibrationErrorMetric(tag="tag",
-                                                                 identifier="identifier",
-                                                                 target_subscription_key=self.target_key,
-                                                                 prediction_subscription_key=self.prediction_probability_key,
-                                                                 num_bins=10,
-                                                                 class_label=1)
-        y_true = probability_inference_batch_result.targets[self.target_key]
-        prevalence = ece_metric._calc_prevalence(y_true)
-        assert prevalence == 3/7
-
-    def test__calc_confidence(self, probability_inference_batch_result: InferenceResultBatch):
-        ece_metric = ClassSpecificExpectedCalibrationErrorMetric(tag="tag",
-                                                                 identifier="identifier",
-                                                                 target_subscription_key=self.target_key,
-                                                                 prediction_subscription_key=self.prediction_probability_key,
-                                                                 num_bins=10,
-                                                                 class_label=1)
-        y_pred = probability_inference_batch_result.predictions[self.prediction_probability_key]
-        conf = ece_metric._calc_confidence(y_pred)
-        assert conf == torch.mean(y_pred)
-
-    def test__calc_calibration_error(self, probability_inference_batch_result: InferenceResultBatch):
-        ece_metric = ClassSpecificExpectedCalibrationErrorMetric(tag="tag",
-                                                                 identifier="identifier",
-                                                                 target_subscription_key=self.target_key,
-                                                                 prediction_subscription_key=self.prediction_probability_key,
-                                                                 num_bins=10,
-                                                                 class_label=1)
-        y_true = probability_inference_batch_result.targets[self.target_key]
-        y_pred_proba = probability_inference_batch_result.predictions[self.prediction_probability_key]
-
-        ece_score = ece_metric._calc_calibration_error(y_true, y_pred_proba)
-        assert ece_score == abs(torch.mean(y_pred_proba) - 3/7)
-
     def test__calc_expcted_ce_summed(self, probability_inference_batch_result: InferenceResultBatch):
         ece_metric = ClassSpecificExpectedCalibrationErrorMetric(tag="tag",
                                                                  identifier="identifier",
@@ -218,3 +185,84 @@ class TestRecallAtKMetric:
     def test_metric_fun(self, recall_at_k_metric_fun, inference_result_batch: InferenceResultBatch):
         result = recall_at_k_metric_fun(inference_result_batch=inference_result_batch)
         assert [1/4, 2/4] == result
+
+
+class TestStreamingMetrics:
+    target_key = "target_key"
+    prediction_key = "prediction_key"
+    prediction_class_key = "prediction_class_key"
+    batch_size = 64
+
+    @pytest.fixture
+    def inference_result_batch(self) -> InferenceResultBatch:
+        generator = torch.Generator().manual_seed(0)
+        targets = torch.randint(0, 2, (500,), generator=generator)
+        predictions = torch.rand(500, generator=generator)
+        return InferenceResultBatch(targets={TestStreamingMetrics.target_key: targets},
+                                    predictions={TestStreamingMetrics.prediction_key: predictions,
+                                                 TestStreamingMetrics.prediction_class_key: (predictions > 0.5).long()},
+                                    tags=torch.arange(500))
+
+    @staticmethod
+    def get_batches(inference_result_batch: InferenceResultBatch):
+        for i in range(0, len(inference_result_batch), TestStreamingMetrics.batch_size):
+            selection = slice(i, i + TestStreamingMetrics.batch_size)
+            yield InferenceResultBatch(targets={key: t[selection] for key, t in inference_result_batch.targets.items()},
+                                       predictions={key: p[selection] for key, p in inference_result_batch.predictions.items()},
+                                       tags=inference_result_batch.tags[selection])
+
+    @pytest.mark.parametrize("metric", [
+        StreamingPredictionMetric(tag="accuracy", identifier="accuracy", target_subscription_key=target_key,
+                                  prediction_subscription_key=prediction_class_key, metric_fun=accuracy_score),
+        StreamingPredictionMetric(tag="f1", identifier="f1", target_subscription_key=target_key,
+                                  prediction_subscription_key=prediction_class_key, metric_fun=f1_score, params={"average": "macro"}),
+        ClassSpecificExpectedCalibrationErrorMetric(tag="ece", identifier="ece", target_subscription_key=target_key,
+                                                    prediction_subscription_key=prediction_key, sum_up_bins=False),
+        BrierScoreMetric(tag="brier", identifier="brier", prediction_subscription_key=prediction_key, target_subscription_key=target_key),
+        RecallAtKMetric(tag="recall_at_k", identifier="recall_at_k", prediction_subscription_key=prediction_key,
+                        target_subscription_key=target_key, class_label=1, k_vals=[10, 100, 200]),
+        AreaUnderRecallAtKMetric(tag="au_recall_at_k", identifier="au_recall_at_k", prediction_subscription_key=prediction_key,
+                                 target_subscription_key=target_key, class_label=1, k_vals=[10, 100, 200])
+    ])
+    def test_update_and_merge(self, metric, inference_result_batch: InferenceResultBatch):
+        reference_score = metric(inference_result_batch)
+        metric.reset()
+        for batch in TestStreamingMetrics.get_batches(inference_result_batch):
+            metric.update(batch)
+        assert np.allclose(metric.compute(), reference_score)
+
+        # states computed on disjoint parts of the split are mergeable
+        other_metric = copy.deepcopy(metric)
+        metric.reset()
+        other_metric.reset()
+        for i, batch in enumerate(TestStreamingMetrics.get_batches(inference_result_batch)):
+            (metric if i % 2 == 0 else other_metric).update(batch)
+        metric.merge(other_metric)
+        assert np.allclose(metric.compute(), reference_score)
+
+    def test_prediction_metric_equivalence(self, inference_result_batch: InferenceResultBatch):
+        metric_params = {"tag": "accuracy", "identifier": "accuracy", "target_subscription_key": self.target_key,
+                         "prediction_subscription_key": self.prediction_class_key, "metric_fun": accuracy_score}
+        assert StreamingPredictionMetric(**metric_params)(inference_result_batch) == PredictionMetric(**metric_params)(inference_result_batch)
+
+    def test_binned_auroc(self, inference_result_batch: InferenceResultBatch):
+        metric_params = {"tag": "auroc", "identifier": "auroc", "target_subscription_key": self.target_key,
+                         "prediction_subscription_key": self.prediction_key, "metric_fun": binary_auroc_score}
+        binned_metric = StreamingPredictionMetric(num_bins=1000, **metric_params)
+        for batch in TestStreamingMetrics.get_batches(inference_result_batch):
+            binned_metric.update(batch)
+        assert abs(binned_metric.compute() - PredictionMetric(**metric_params)(inference_result_batch)) < 0.001
+
+    def test_multilabel_prediction_metric_equivalence(self):
+        # multilabel indicator matrices are not counted pairwise, but accumulated as done by PredictionMetric
+        batch = InferenceResultBatch(targets={self.target_key: torch.LongTensor([[1, 0], [1, 1]])},
+                                     predictions={self.prediction_class_key: torch.LongTensor([[1, 1], [1, 1]])},
+                                     tags=torch.arange(2))
+        metric_params = {"tag": "accuracy", "identifier": "accuracy", "target_subscription_key": self.target_key,
+                         "prediction_subscription_key": self.prediction_class_key, "metric_fun": accuracy_score}
+        metric = StreamingPredictionMetric(**metric_params)
+        for i in range(len(batch)):
+            metric.update(InferenceResultBatch(targets={self.target_key: batch.targets[self.target_key][i:i + 1]},
+                                               predictions={self.prediction_class_key: batch.predictions[self.prediction_class_key][i:i + 1]},
+                                               tags=batch.tags[i:i + 1]))
+        assert metric.compute() == PredictionMetric(**metric_params)(batch) == 0.5
@@ -1,6 +1,7 @@
 import pytest
+from sklearn.metrics import accuracy_score
 from ml_gym.metrics.metric_factory import MetricFactory
-from ml_gym.metrics.metrics import PredictionMetric, BrierScoreMetric, RecallAtKMetric, AreaUnderRecallAtKMetric, \
+from ml_gym.metrics.metrics import StreamingPredictionMetric, PredictionMetric, BrierScoreMetric, RecallAtKMetric, AreaUnderRecallAtKMetric, \
     ClassSpecificExpectedCalibrationErrorMetric, BinaryClasswiseExpectedCalibrationErrorMetric
 
 
@@ -15,6 +16,12 @@ class TestMetricFactory:
         prediction_key = "prediction_key"
         return prediction_key
 
+    def test_get_streaming_sklearn_metric(self, target_subscription_key, prediction_key):
+        metric_type = MetricFactory.get_streaming_sklearn_metric(metric_key="ACCURACY", metric_fun=accuracy_score, params={"num_bins": 10})
+        metric_func = metric_type(tag="accuracy", target_subscription_key=target_subscription_key,
+                                  prediction_subscription_key=prediction_key)
+        assert isinstance(metric_func, StreamingPredictionMetric) and metric_func.num_bins == 10
+
     def test_get_brier_score_metric_fun(self, target_subscription_key, prediction_key):
         metric_func = MetricFactory.get_brier_score_metric_fun(target_subscription_key=target_subscription_key,
                                                                prediction_subscription_key=prediction_key,
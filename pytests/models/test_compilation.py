@@ -0,0 +1,79 @@
+from copy import deepcopy
+from typing import Dict
+import pytest
+import torch
+from ml_gym.error_handling.exception import ModelCompilationError
+from ml_gym.models.nn.compilation import ModelCompiler
+from ml_gym.models.nn.net import NNModel
+
+
+class LinearModel(NNModel):
+    def __init__(self, seed: int = None):
+        super().__init__(seed=seed)
+        self.linear = torch.nn.Linear(3, 2)
+        self.dropout = torch.nn.Dropout(p=0.5)
+
+    def forward(self, inputs: torch.Tensor) -> Dict[str, torch.Tensor]:
+        return self.forward_impl(inputs)
+
+    def forward_impl(self, inputs: torch.Tensor) -> Dict[str, torch.Tensor]:
+        return {"outputs": self.dropout(self.linear(inputs))}
+
+
+class TestModelCompiler:
+    model_hash = ModelCompiler.get_model_hash("LINEAR", {})
+
+    @pytest.fixture
+    def inputs(self) -> torch.Tensor:
+        return torch.randn(4, 3)
+
+    @pytest.fixture
+    def compilation_counts(self) -> Dict[str, int]:
+        return {"count": 0}
+
+    @pytest.fixture
+    def torch_compiler(self, compilation_counts) -> ModelCompiler:
+        def counting_backend(graph_module: torch.fx.GraphModule, example_inputs):
+            compilation_counts["count"] += 1
+            return graph_module.forward
+
+        return ModelCompiler(compiler=ModelCompiler.Compilers.TORCH_COMPILE, backend=counting_backend)
+
+    def test_model_hash(self):
+        assert TestModelCompiler.model_hash == ModelCompiler.get_model_hash("LINEAR", {})
+        assert TestModelCompiler.model_hash != ModelCompiler.get_model_hash("LINEAR", {"hidden_size": 2})
+
+    def test_invalid_compiler(self):
+        with pytest.raises(ModelCompilationError):
+            ModelCompiler(compiler="unknown")
+
+    def test_torch_compile_cache(self, torch_compiler: ModelCompiler, compilation_counts: Dict[str, int], inputs: torch.Tensor):
+        # the models of the same config share the compiled forward function
+        models = [torch_compiler.compile(LinearModel(seed=seed).eval(), TestModelCompiler.model_hash) for seed in range(3)]
+        for model in models:
+            assert torch.allclose(model(inputs)["outputs"], LinearModel.forward(model, inputs)["outputs"])
+        assert compilation_counts["count"] == 1
+
+    @pytest.mark.parametrize("compiler", [ModelCompiler.Compilers.TORCH_COMPILE, ModelCompiler.Compilers.TORCHSCRIPT])
+    def test_state_dict(self, compiler: str, inputs: torch.Tensor):
+        model_compiler = ModelCompiler(compiler=compiler, backend="eager")
+        model = model_compiler.compile(LinearModel(seed=0).eval(), ModelCompiler.get_model_hash("LINEAR", {"compiler": compiler}))
+        model(inputs)
+        # the state dict is the one of the original module
+        assert list(model.state_dict().keys()) == ["linear.weight", "linear.bias"]
+        eager_model = LinearModel(seed=1).eval()
+        model.load_state_dict(eager_model.state_dict())
+        assert torch.allclose(model(inputs)["outputs"], eager_model(inputs)["outputs"])
+        copied_model = deepcopy(model)
+        assert torch.allclose(copied_model(inputs)["outputs"], eager_model(inputs)["outputs"])
+
+    def test_torchscript_modes(self, inputs: torch.Tensor):
+        model = ModelCompiler(compiler=ModelCompiler.Compilers.TORCHSCRIPT).compile(LinearModel(seed=0), TestModelCompiler.model_hash)
+        # the dropout is only applied in training mode
+        assert (model(torch.ones(1000, 3))["outputs"] == 0).any()
+        model.eval()
+        assert torch.allclose(model(inputs)["outputs"], LinearModel.forward(model, inputs)["outputs"])
+        # the traces are updated along with the parameters, e.g., by the optimizer
+        with torch.no_grad():
+            model.linear.weight.add_(1.0)
+        assert torch.allclose(model(inputs)["outputs"], LinearModel.forward(model, inputs)["outputs"])
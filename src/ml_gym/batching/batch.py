@@ -1,12 +1,26 @@
 import torch
 from abc import abstractmethod, ABC
-from typing import Dict, List, Any, Callable, Union
+from typing import Dict, List, Any, Callable, Tuple, Union
 from ml_gym.error_handling.exception import BatchStateError
-import copy
 from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+import json
+import mmap
+import struct
+import sys
+import warnings
 
 
 class TorchDeviceMixin(ABC):
+    """Moves the tensors of a batch between devices. Besides the synchronous `to`, batches can be transferred asynchronously
+    via `to_async`, which copies the tensors with `non_blocking=True` on a side stream of the CUDA device (staging host
+    tensors in pinned memory), such that the transfer overlaps with the computations on the current stream. The batch must
+    not be used before calling `await_ready`. Without CUDA, `to_async` falls back to the synchronous `to`.
+    """
+    # side streams of the CUDA devices used for asynchronous transfers
+    _transfer_streams: Dict[torch.device, "torch.cuda.Stream"] = {}
+    # byte alignment of the tensors within the buffer of a fused transfer
+    _fused_transfer_alignment = 16
 
     @staticmethod
     def _dict_tensor_to_device(d: Dict[str, Any], device: torch.device) -> Dict[str, Any]:
@@ -28,6 +42,151 @@ class TorchDeviceMixin(ABC):
             return [TorchDeviceMixin.traverse_apply(d, apply_fun) for d in ds]
         return apply_fun(ds)
 
+    @staticmethod
+    def get_transfer_stream(device: torch.device) -> "torch.cuda.Stream":
+        if device.index is None:
+            device = torch.device("cuda", torch.cuda.current_device())
+        if device not in TorchDeviceMixin._transfer_streams:
+            TorchDeviceMixin._transfer_streams[device] = torch.cuda.Stream(device)
+        return TorchDeviceMixin._transfer_streams[device]
+
+    @staticmethod
+    def _tensor_to_device_async(tensor: torch.Tensor, device: torch.device, stream: "torch.cuda.Stream") -> torch.Tensor:
+        # the copies are issued on the side stream, which waited for the current stream beforehand
+        with torch.cuda.stream(stream):
+            if device.type == "cuda" and tensor.device.type == "cpu":
+                tensor = tensor if tensor.is_pinned() else tensor.pin_memory()
+                return tensor.to(device, non_blocking=True)
+            elif device.type == "cpu" and tensor.device.type == "cuda":
+                host_tensor = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+                host_tensor.copy_(tensor, non_blocking=True)
+                # the allocator must not reuse the device memory before the copy has finished
+                tensor.record_stream(stream)
+                return host_tensor
+            return tensor.to(device, non_blocking=True)
+
+    @staticmethod
+    def _pack_tensors(tensors: List[torch.Tensor]) -> Tuple[torch.Tensor, List[int]]:
+        # concatenates the bytes of the tensors (aligned for reinterpreting them) into a single buffer on their device
+        chunks, offsets, offset = [], [], 0
+        for tensor in tensors:
+            padding = -offset % TorchDeviceMixin._fused_transfer_alignment
+            if padding > 0:
+                chunks.append(torch.zeros(padding, dtype=torch.uint8, device=tensor.device))
+                offset += padding
+            offsets.append(offset)
+            chunks.append(tensor.detach().contiguous().reshape(-1).view(torch.uint8))
+            offset += tensor.numel() * tensor.element_size()
+        return torch.cat(chunks), offsets
+
+    @staticmethod
+    def _unpack_tensors(buffer: torch.Tensor, tensors: List[torch.Tensor], offsets: List[int]) -> List[torch.Tensor]:
+        # views on the buffer with the dtypes and shapes of the packed tensors
+        return [buffer[offset:offset + tensor.numel() * tensor.element_size()].view(tensor.dtype).view(tensor.shape)
+                for tensor, offset in zip(tensors, offsets)]
+
+    @staticmethod
+    def _tensors_to_device_fused(tensors: List[torch.Tensor], device: torch.device, non_blocking: bool = False) -> List[torch.Tensor]:
+        source_devices = {tensor.device for tensor in tensors}
+        source_device = next(iter(source_devices)) if len(source_devices) == 1 else None
+        if len(tensors) < 2 or source_device is None or \
+                (source_device.type == device.type and device.index in [None, source_device.index]):
+            return [tensor.to(device, non_blocking=non_blocking) for tensor in tensors]
+        buffer, offsets = TorchDeviceMixin._pack_tensors(tensors)
+        if non_blocking and device.type == "cpu" and source_device.type == "cuda":
+            transferred_buffer = torch.empty(buffer.shape, dtype=torch.uint8, pin_memory=True)
+            transferred_buffer.copy_(buffer, non_blocking=True)
+        elif non_blocking and device.type == "cuda" and source_device.type == "cpu":
+            transferred_buffer = buffer.pin_memory().to(device, non_blocking=True)
+        else:
+            transferred_buffer = buffer.to(device, non_blocking=non_blocking)
+        return TorchDeviceMixin._unpack_tensors(transferred_buffer, tensors, offsets)
+
+    def _get_tensors(self) -> List[torch.Tensor]:
+        tensors = []
+
+        def collect(tensor: torch.Tensor) -> torch.Tensor:
+            tensors.append(tensor)
+            return tensor
+        self._apply(collect)
+        return tensors
+
+    def _set_tensors(self, tensors: List[torch.Tensor]):
+        # replaces the tensors in the order of `_get_tensors`
+        tensor_iterator = iter(tensors)
+        self._apply(lambda tensor: next(tensor_iterator))
+
+    def to_fused(self, device: torch.device) -> "Batch":
+        """
+        Transfers all tensors of the batch to the device with a single copy, instead of one copy per tensor.
+        This is beneficial for batches of many small tensors, e.g., the subscribed predictions and targets of an evaluation batch.
+
+        :params:
+            device (torch.device): Target device.
+        :returns:
+            Batch: The batch itself.
+        """
+        self._set_tensors(TorchDeviceMixin._tensors_to_device_fused(self._get_tensors(), device))
+        return self
+
+    def to_async(self, device: torch.device, fused: bool = False) -> "Batch":
+        """
+        Starts the asynchronous transfer of the batch to the device.
+
+        :params:
+            device (torch.device): Target device.
+            fused (bool): Whether to transfer all tensors with a single copy (see `to_fused`).
+        :returns:
+            Batch: The batch itself, which must not be used before `await_ready` is called.
+        """
+        cuda_device = device if device.type == "cuda" else self.device if self.device.type == "cuda" else None
+        if cuda_device is None or not torch.cuda.is_available():
+            self._transfer_event = None
+            return self.to_fused(device) if fused else self.to(device)
+        stream = TorchDeviceMixin.get_transfer_stream(cuda_device)
+        stream.wait_stream(torch.cuda.current_stream(cuda_device))
+        if fused:
+            tensors = self._get_tensors()
+            with torch.cuda.stream(stream):
+                for tensor in tensors:
+                    if tensor.device.type == "cuda":
+                        # the allocator must not reuse the device memory before the buffer has been packed
+                        tensor.record_stream(stream)
+                self._set_tensors(TorchDeviceMixin._tensors_to_device_fused(tensors, device, non_blocking=True))
+        else:
+            self._apply(partial(TorchDeviceMixin._tensor_to_device_async, device=device, stream=stream))
+        self._transfer_event = torch.cuda.Event()
+        self._transfer_event.record(stream)
+        return self
+
+    def await_ready(self) -> "Batch":
+        """
+        Waits for a transfer started by `to_async`. Batches on a CUDA device are synchronised with the current stream
+        (i.e., the host is not blocked), batches on the CPU are synchronised with the host.
+
+        :returns:
+            Batch: The batch itself.
+        """
+        transfer_event = getattr(self, "_transfer_event", None)
+        if transfer_event is not None:
+            if self.device.type == "cuda":
+                current_stream = torch.cuda.current_stream(self.device)
+                current_stream.wait_event(transfer_event)
+
+                def record_stream(tensor: torch.Tensor) -> torch.Tensor:
+                    # the tensors were allocated on the side stream, but are used on the current stream
+                    tensor.record_stream(current_stream)
+                    return tensor
+                self._apply(record_stream)
+            else:
+                transfer_event.synchronize()
+            self._transfer_event = None
+        return self
+
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        # applies the function to all tensors of the batch and replaces them by the results
+        raise NotImplementedError
+
     @property
     @abstractmethod
     def device(self) -> torch.device:
@@ -84,6 +243,12 @@ class Batch(ABC):
     def combine_impl(batches: List['Batch']) -> 'Batch':
         raise NotImplementedError
 
+    def __reduce_ex__(self, protocol: int):
+        # batches of host tensors are pickled as a single contiguous buffer (see `BatchSerializer`), such that, e.g.,
+        # a torch.multiprocessing queue moves one buffer instead of every tensor to shared memory
+        reduced_batch = BatchSerializer.reduce(self)
+        return reduced_batch if reduced_batch is not None else super().__reduce_ex__(protocol)
+
 
 class DatasetBatch(Batch, TorchDeviceMixin):
     """A batch of samples and its targets and tags. Used to batch train a model."""
@@ -130,6 +295,29 @@ class DatasetBatch(Batch, TorchDeviceMixin):
         self.to(device=torch.device("cpu"))
         return self
 
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        self._samples = TorchDeviceMixin.traverse_apply(self._samples, apply_fun)
+        self._targets = TorchDeviceMixin.traverse_apply(self._targets, apply_fun)
+        self._tags = apply_fun(self._tags)
+
+    def _get_tensor_tree(self) -> Dict[str, Any]:
+        return {"samples": self._samples, "targets": self._targets, "tags": self._tags}
+
+    def _get_meta(self) -> Dict[str, Any]:
+        return {"samples_require_grad": self.samples_require_grad}
+
+    @classmethod
+    def _from_tensor_tree(cls, tensor_tree: Dict[str, Any], meta: Dict[str, Any]) -> "DatasetBatch":
+        return cls(samples=tensor_tree["samples"], targets=tensor_tree.get("targets", {}), tags=tensor_tree["tags"],
+                   samples_require_grad=meta["samples_require_grad"])
+
+    def pin_memory(self) -> "DatasetBatch":
+        # called by the torch DataLoader's pin memory thread, if `pin_memory` is enabled
+        self._samples = self._samples.pin_memory()
+        self._targets = {k: v.pin_memory() for k, v in self._targets.items()}
+        self._tags = self._tags.pin_memory()
+        return self
+
     @property
     def device(self) -> torch.device:
         return self._samples.device
@@ -152,11 +340,10 @@ class DatasetBatch(Batch, TorchDeviceMixin):
 
     @staticmethod
     def combine_pair(b_1: 'DatasetBatch', b_2: 'DatasetBatch') -> 'DatasetBatch':
-        b_1 = copy.deepcopy(b_1)
-        b_2 = copy.deepcopy(b_2)
-        tags = torch.cat([b_1.tags, b_2.tags])
-        samples = torch.cat([b_1.samples, b_2.samples])
-        targets = Batch._combine_tensor_dicts([b_1.targets, b_2.targets])
+        # the concatenation allocates new tensors, i.e., the combined batch does not share memory with b_1 and b_2
+        tags = torch.cat([b_1.tags.detach(), b_2.tags.detach()])
+        samples = torch.cat([b_1.samples.detach(), b_2.samples.detach()])
+        targets = Batch._combine_tensor_dicts([TorchDeviceMixin._detach_dict_tensor(b.targets) for b in [b_1, b_2]])
         return DatasetBatch(targets=targets, samples=samples, tags=tags)
 
 
@@ -189,6 +376,21 @@ class InferenceResultBatch(Batch, TorchDeviceMixin):
         self._tags = self._tags.detach()
         self._predictions = TorchDeviceMixin._detach_dict_tensor(self._predictions)
 
+    def _apply(self, apply_fun: Callable[[torch.Tensor], torch.Tensor]):
+        self._predictions = TorchDeviceMixin.traverse_apply(self._predictions, apply_fun)
+        self._targets = TorchDeviceMixin.traverse_apply(self._targets, apply_fun)
+        self._tags = apply_fun(self._tags)
+
+    def _get_tensor_tree(self) -> Dict[str, Any]:
+        return {"predictions": self._predictions, "targets": self._targets, "tags": self._tags}
+
+    def _get_meta(self) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def _from_tensor_tree(cls, tensor_tree: Dict[str, Any], meta: Dict[str, Any]) -> "InferenceResultBatch":
+        return cls(predictions=tensor_tree.get("predictions", {}), targets=tensor_tree.get("targets", {}), tags=tensor_tree["tags"])
+
     @property
     def predictions(self) -> Dict[str, torch.Tensor]:
         return self._predictions
@@ -234,49 +436,470 @@ class InferenceResultBatch(Batch, TorchDeviceMixin):
         tags_ = self.tags.detach().clone()
         return InferenceResultBatch(predictions=predictions_, targets=targets_, tags=tags_)
 
-    def split_results(self, target_keys: List[str], predictions_keys: List[Union[str, List]], device: torch.device):
-        def _filter_predictions(predictions_keys: List[str], predictions: Dict, filtered_predictions: Dict):
-            p_key = predictions_keys[0]
-            if p_key == "*":
-                p_keys = list(predictions.keys())
-            else:
-                p_keys = [p_key]
-            if len(predictions_keys) == 1:
-                for p_key in p_keys:
-                    filtered_predictions[p_key] = predictions[p_key]
-            else:
-                for p_key in p_keys:
-                    if p_key not in filtered_predictions:
-                        filtered_predictions[p_key] = {}
-                    _filter_predictions(predictions_keys[1:], predictions[p_key], filtered_predictions[p_key])
-
-        predictions_keys_list = [[p_key] if isinstance(p_key, str) else p_key for p_key in predictions_keys]
-        filtered_targets = {key: self._targets[key].to(device) for key in target_keys if key in self._targets}
-
-        filtered_predictions = {}
-        for p_keys in predictions_keys_list:
-            _filter_predictions(p_keys, self.predictions, filtered_predictions)
-
-        filtered_predictions = TorchDeviceMixin._dict_tensor_to_device(filtered_predictions, device)
-        tags = self.tags.to(device)
-        return InferenceResultBatch(targets=filtered_targets, predictions=filtered_predictions, tags=tags)
+    def split_results(self, target_keys: List[str], predictions_keys: List[Union[str, List]], device: torch.device,
+                      non_blocking: bool = False):
+        # for repeated selections (e.g., during evaluation), the selector should be compiled once and reused instead
+        filtered_batch = InferenceResultBatchSelector(target_keys, predictions_keys).select(self)
+        # the asynchronously transferred batch must be awaited (see `TorchDeviceMixin.to_async`)
+        return filtered_batch.to_async(device, fused=True) if non_blocking else filtered_batch.to_fused(device)
+
+    def own_tensors(self, dataset_batch: DatasetBatch) -> 'InferenceResultBatch':
+        """
+        Copies the targets and tags that still share memory with the dataset batch (i.e., have not been moved to another
+        device), such that the inference result batch owns all of its tensors. Without calling this method, the
+        inference result batch is a shared view on the dataset batch, which must not be modified in place afterwards.
+
+        :params:
+            dataset_batch (DatasetBatch): Dataset batch the targets and tags were taken from.
+        :returns:
+            InferenceResultBatch: The batch itself.
+        """
+        shared_data_ptrs = {tensor.untyped_storage().data_ptr() for tensor in [*dataset_batch.targets.values(), dataset_batch.tags]}
+
+        def own(tensor: torch.Tensor) -> torch.Tensor:
+            return tensor.clone() if tensor.untyped_storage().data_ptr() in shared_data_ptrs else tensor
+        self._targets = {k: own(v) for k, v in self._targets.items()}
+        self._tags = own(self._tags)
+        return self
 
     @staticmethod
     def combine_pair(b_1: 'InferenceResultBatch', b_2: 'InferenceResultBatch') -> 'InferenceResultBatch':
-        # tags = torch.cat([b_1.tags, b_2.tags])
-        tags = b_1.tags + b_2.tags
+        tags = torch.cat([b_1.tags, b_2.tags])
         predictions = Batch._combine_tensor_dicts([b_1.predictions, b_2.predictions])
         targets = Batch._combine_tensor_dicts([b_1.targets, b_2.targets])
         return InferenceResultBatch(targets=targets, predictions=predictions, tags=tags)
 
     @staticmethod
     def combine_impl(batches: List['InferenceResultBatch']) -> 'InferenceResultBatch':
-        tags = torch.tensor([tag for batch in batches for tag in batch.tags])
+        tags = torch.cat([batch.tags for batch in batches])
         predictions = Batch._combine_tensor_dicts([batch.predictions for batch in batches])
         targets = Batch._combine_tensor_dicts([batch.targets for batch in batches])
         return InferenceResultBatch(targets=targets, predictions=predictions, tags=tags)
 
 
+class _AttachedSharedMemory(SharedMemory):
+    # the tensors of a deserialized batch are views on the shared memory, i.e., it cannot be closed explicitly and is
+    # unmapped when the batch and all views on it have been freed
+    def __del__(self):
+        pass
+
+
+class BatchSerializer:
+    """Flat, self-describing binary format of `DatasetBatch` and `InferenceResultBatch` objects:
+
+        | magic (4 bytes) | version (uint16) | header length (uint32) | JSON header | padding | tensor buffer |
+
+    The header lists the key path, dtype, shape and buffer offset of every tensor of the batch, the tensor buffer
+    contains the bytes of all tensors, each aligned to `TorchDeviceMixin._fused_transfer_alignment` bytes.
+    Deserialisation creates the tensors as views on the given buffer (e.g., a memory mapped file or shared memory), i.e.,
+    no data is copied. Hence, the buffer has to be writable, if the tensors are modified in place.
+    """
+    MAGIC = b"MLGB"
+    VERSION = 1
+    _prefix = struct.Struct("<4sHI")
+    _batch_types = {"DatasetBatch": DatasetBatch, "InferenceResultBatch": InferenceResultBatch}
+
+    @staticmethod
+    def _flatten(tensor_tree: Union[Dict, torch.Tensor], path: Tuple = ()) -> List[Tuple[Tuple, torch.Tensor]]:
+        if isinstance(tensor_tree, dict):
+            return [item for key, sub_tree in tensor_tree.items() for item in BatchSerializer._flatten(sub_tree, path + (key,))]
+        return [(path, tensor_tree)]
+
+    @staticmethod
+    def _unflatten(items: List[Tuple[List, torch.Tensor]]) -> Dict[str, Any]:
+        tensor_tree = {}
+        for path, tensor in items:
+            sub_tree = tensor_tree
+            for key in path[:-1]:
+                sub_tree = sub_tree.setdefault(key, {})
+            sub_tree[path[-1]] = tensor
+        return tensor_tree
+
+    @staticmethod
+    def _get_tensors_and_header(batch: Batch) -> Tuple[List[torch.Tensor], Dict[str, Any]]:
+        if type(batch).__name__ not in BatchSerializer._batch_types:
+            raise BatchStateError(f"Batches of type {type(batch).__name__} cannot be serialized.")
+        tensors, tensor_headers, offset = [], [], 0
+        for path, tensor in BatchSerializer._flatten(batch._get_tensor_tree()):
+            offset += -offset % TorchDeviceMixin._fused_transfer_alignment
+            tensors.append(tensor)
+            tensor_headers.append({"path": list(path), "dtype": str(tensor.dtype)[len("torch."):], "shape": list(tensor.shape),
+                                   "offset": offset})
+            offset += tensor.numel() * tensor.element_size()
+        header = {"batch_type": type(batch).__name__, "meta": batch._get_meta(), "byteorder": sys.byteorder,
+                  "tensors": tensor_headers, "buffer_size": offset}
+        return tensors, header
+
+    @staticmethod
+    def _copy_tensors(tensors: List[torch.Tensor], header: Dict[str, Any], buffer: torch.Tensor):
+        for tensor, tensor_header in zip(tensors, header["tensors"]):
+            num_bytes = tensor.numel() * tensor.element_size()
+            buffer[tensor_header["offset"]:tensor_header["offset"] + num_bytes] = tensor.detach().contiguous().reshape(-1).view(torch.uint8)
+
+    @staticmethod
+    def _get_tensor_views(header: Dict[str, Any], buffer: torch.Tensor) -> Batch:
+        items = []
+        for tensor_header in header["tensors"]:
+            dtype = getattr(torch, tensor_header["dtype"])
+            num_bytes = torch.Size(tensor_header["shape"]).numel() * torch.empty(0, dtype=dtype).element_size()
+            tensor = buffer[tensor_header["offset"]:tensor_header["offset"] + num_bytes].view(dtype).view(tensor_header["shape"])
+            items.append((tensor_header["path"], tensor))
+        batch_type = BatchSerializer._batch_types[header["batch_type"]]
+        return batch_type._from_tensor_tree(BatchSerializer._unflatten(items), header["meta"])
+
+    @staticmethod
+    def _encode_header(header: Dict[str, Any]) -> Tuple[bytes, int]:
+        # returns the header and the offset of the tensor buffer
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = BatchSerializer._prefix.size + len(header_bytes)
+        return header_bytes, data_offset + (-data_offset % TorchDeviceMixin._fused_transfer_alignment)
+
+    @staticmethod
+    def get_serialized_size(batch: Batch) -> int:
+        _, header = BatchSerializer._get_tensors_and_header(batch)
+        _, data_offset = BatchSerializer._encode_header(header)
+        return data_offset + header["buffer_size"]
+
+    @staticmethod
+    def serialize_into(batch: Batch, buffer: Any) -> int:
+        """
+        Serializes the host tensors of the batch into a writable buffer, e.g., shared memory, with a single copy per tensor.
+
+        :params:
+            batch (Batch): Batch to be serialized.
+            buffer (Any): Writable object supporting the buffer protocol, with at least `get_serialized_size` bytes.
+        :returns:
+            int: Number of bytes written.
+        """
+        tensors, header = BatchSerializer._get_tensors_and_header(batch)
+        header_bytes, data_offset = BatchSerializer._encode_header(header)
+        buffer = memoryview(buffer).cast("B")
+        if len(buffer) < data_offset + header["buffer_size"]:
+            raise BatchStateError(f"Buffer of {len(buffer)} bytes is too small for serialized batch of {data_offset + header['buffer_size']} bytes.")
+        BatchSerializer._prefix.pack_into(buffer, 0, BatchSerializer.MAGIC, BatchSerializer.VERSION, len(header_bytes))
+        buffer[BatchSerializer._prefix.size:BatchSerializer._prefix.size + len(header_bytes)] = header_bytes
+        if header["buffer_size"] > 0:
+            tensor_buffer = torch.frombuffer(buffer, dtype=torch.uint8, count=header["buffer_size"], offset=data_offset)
+            BatchSerializer._copy_tensors(tensors, header, tensor_buffer)
+        return data_offset + header["buffer_size"]
+
+    @staticmethod
+    def serialize(batch: Batch) -> bytearray:
+        """
+        Serializes the host tensors of the batch.
+
+        :params:
+            batch (Batch): Batch to be serialized.
+        :returns:
+            bytearray: Serialized batch.
+        """
+        buffer = bytearray(BatchSerializer.get_serialized_size(batch))
+        BatchSerializer.serialize_into(batch, buffer)
+        return buffer
+
+    @staticmethod
+    def deserialize(buffer: Any) -> Batch:
+        """
+        Deserializes a batch without copying, i.e., the tensors of the batch are views on the buffer.
+
+        :params:
+            buffer (Any): Object supporting the buffer protocol, e.g., bytes, a memory map or shared memory.
+        :returns:
+            Batch: Deserialized batch.
+        """
+        buffer = memoryview(buffer).cast("B")
+        magic, version, header_length = BatchSerializer._prefix.unpack_from(buffer, 0)
+        if magic != BatchSerializer.MAGIC or version != BatchSerializer.VERSION:
+            raise BatchStateError(f"Buffer does not contain a serialized batch of version {BatchSerializer.VERSION}.")
+        header = json.loads(bytes(buffer[BatchSerializer._prefix.size:BatchSerializer._prefix.size + header_length]))
+        if header["byteorder"] != sys.byteorder:
+            raise BatchStateError(f"Batch was serialized with byteorder {header['byteorder']}.")
+        _, data_offset = BatchSerializer._encode_header(header)
+        if header["buffer_size"] == 0:
+            tensor_buffer = torch.empty(0, dtype=torch.uint8)
+        else:
+            with warnings.catch_warnings():
+                # tensors on read-only buffers (e.g., bytes) are valid as long as they are not modified in place
+                warnings.filterwarnings("ignore", message="The given buffer is not writable")
+                tensor_buffer = torch.frombuffer(buffer, dtype=torch.uint8, count=header["buffer_size"], offset=data_offset)
+        return BatchSerializer._get_tensor_views(header, tensor_buffer)
+
+    @staticmethod
+    def save(batch: Batch, path: str):
+        with open(path, "wb") as fp:
+            fp.write(BatchSerializer.serialize(batch))
+
+    @staticmethod
+    def load(path: str) -> Batch:
+        """
+        Loads a batch saved via `save` by memory mapping the file, i.e., the file is only read when the tensors are accessed.
+        The memory map is copy-on-write, such that modifications of the tensors are not written back to the file.
+
+        :params:
+            path (str): Path of the serialized batch.
+        :returns:
+            Batch: Batch whose tensors are views on the memory map.
+        """
+        with open(path, "rb") as fp:
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_COPY)
+        return BatchSerializer.deserialize(buffer)
+
+    @staticmethod
+    def to_shared_memory(batch: Batch) -> SharedMemory:
+        """
+        Serializes the batch into a new shared memory block, whose name can be passed to another process, which
+        retrieves the batch via `from_shared_memory`. The caller closes the returned block after the handoff.
+
+        :params:
+            batch (Batch): Batch to be serialized.
+        :returns:
+            SharedMemory: Shared memory block containing the serialized batch.
+        """
+        shared_memory = SharedMemory(create=True, size=max(1, BatchSerializer.get_serialized_size(batch)))
+        BatchSerializer.serialize_into(batch, shared_memory.buf)
+        return shared_memory
+
+    @staticmethod
+    def from_shared_memory(name: str, unlink: bool = True) -> Batch:
+        """
+        Attaches to a shared memory block created by `to_shared_memory` and deserializes the batch without copying.
+        The block stays mapped as long as the batch exists.
+
+        :params:
+            name (str): Name of the shared memory block.
+            unlink (bool): Whether to unlink the block after attaching, i.e., whether this is the only consumer.
+        :returns:
+            Batch: Batch whose tensors are views on the shared memory.
+        """
+        shared_memory = _AttachedSharedMemory(name=name)
+        batch = BatchSerializer.deserialize(shared_memory.buf)
+        if unlink:
+            shared_memory.unlink()
+        # keeps the memory mapped, as long as the batch is alive
+        batch._shared_memory = shared_memory
+        return batch
+
+    @staticmethod
+    def reduce(batch: Batch) -> Tuple[Callable, Tuple]:
+        # pickle reduction of batches consisting of host tensors, None otherwise. Tensors requiring gradients fall back
+        # to the default pickling, as the buffer does not retain `requires_grad`
+        if type(batch).__name__ not in BatchSerializer._batch_types:
+            return None
+        tensors, header = BatchSerializer._get_tensors_and_header(batch)
+        if any(tensor.device.type != "cpu" or tensor.requires_grad for tensor in tensors):
+            return None
+        buffer = torch.empty(header["buffer_size"], dtype=torch.uint8)
+        BatchSerializer._copy_tensors(tensors, header, buffer)
+        return BatchSerializer._get_tensor_views, (header, buffer)
+
+
+class InferenceResultBatchSelector:
+    """Selects targets and (nested) predictions of inference result batches, e.g., the cpu subscriptions of the evaluator.
+    The subscription keys are compiled once into a flat list of access paths, e.g., `["a", ["b", "b_1"]]` into
+    `[("a",), ("b", "b_1")]`. Paths containing wildcards (`"*"`) are expanded against the keys of each batch.
+    """
+    __slots__ = ("target_keys", "prediction_paths", "_has_wildcards")
+
+    def __init__(self, target_keys: List[str], predictions_keys: List[Union[str, List]]):
+        self.target_keys = list(target_keys) if target_keys is not None else []
+        predictions_keys = predictions_keys if predictions_keys is not None else []
+        self.prediction_paths: List[Tuple[str, ...]] = [(key,) if isinstance(key, str) else tuple(key) for key in predictions_keys]
+        self._has_wildcards = any("*" in path for path in self.prediction_paths)
+
+    def get_prediction_paths(self, predictions: Dict[str, Any]) -> List[Tuple[str, ...]]:
+        """
+        Returns the access paths of the selected predictions.
+
+        :params:
+            predictions (Dict[str, Any]): Nested predictions of a batch, used to expand the wildcards.
+        :returns:
+            List[Tuple[str, ...]]: Access paths without wildcards.
+        """
+        if not self._has_wildcards:
+            return self.prediction_paths
+        expanded_paths = {}
+        for path in self.prediction_paths:
+            partial_paths = [((), predictions)]
+            for key in path:
+                partial_paths = [(prefix + (sub_key,), value[sub_key]) for prefix, value in partial_paths
+                                 for sub_key in (value.keys() if key == "*" else [key])]
+            expanded_paths.update(dict.fromkeys(prefix for prefix, _ in partial_paths))
+        return list(expanded_paths.keys())
+
+    def select(self, batch: InferenceResultBatch) -> InferenceResultBatch:
+        """
+        Selects the subscribed targets and predictions without copying or transferring them.
+
+        :params:
+            batch (InferenceResultBatch): Batch to select from.
+        :returns:
+            InferenceResultBatch: Batch sharing the selected tensors and the tags.
+        """
+        targets = {key: batch.targets[key] for key in self.target_keys if key in batch.targets}
+        predictions = {}
+        for path in self.get_prediction_paths(batch.predictions):
+            source, selection = batch.predictions, predictions
+            for key in path[:-1]:
+                source = source[key]
+                selection = selection.setdefault(key, {})
+            selection[path[-1]] = source[path[-1]]
+        return InferenceResultBatch(targets=targets, predictions=predictions, tags=batch.tags)
+
+
+class GrowableTensorBuffer:
+    """Preallocated CPU buffer, which tensors are appended to along the first dimension. The capacity is doubled, whenever
+    an appended tensor does not fit anymore, such that appending n samples costs amortised O(n) copies.
+    """
+    __slots__ = ("_buffer", "_length", "_initial_capacity")
+
+    def __init__(self, initial_capacity: int = 0):
+        self._buffer: torch.Tensor = None
+        self._length = 0
+        self._initial_capacity = initial_capacity
+
+    def append(self, tensor: torch.Tensor):
+        tensor = tensor.detach()
+        if tensor.dim() == 0:
+            tensor = tensor.unsqueeze(0)
+        if self._buffer is None:
+            capacity = max(self._initial_capacity, len(tensor))
+            self._buffer = torch.empty((capacity, *tensor.shape[1:]), dtype=tensor.dtype)
+        elif tensor.shape[1:] != self._buffer.shape[1:]:
+            raise BatchStateError(f"Cannot append tensor of shape {tuple(tensor.shape)} to buffer of shape {tuple(self._buffer.shape)}.")
+        end = self._length + len(tensor)
+        if end > len(self._buffer):
+            buffer = torch.empty((max(end, 2 * len(self._buffer)), *self._buffer.shape[1:]), dtype=self._buffer.dtype)
+            buffer[:self._length] = self._buffer[:self._length]
+            self._buffer = buffer
+        self._buffer[self._length:end] = tensor
+        self._length = end
+
+    @property
+    def tensor(self) -> torch.Tensor:
+        # view on the filled part of the buffer, i.e., no copy
+        return self._buffer[:self._length]
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class InferenceResultBatchAccumulator:
+    """Accumulates the inference result batches of an epoch (e.g., the cpu subscriptions during evaluation) in place.
+    Each target, prediction and the tags are copied into a `GrowableTensorBuffer`, such that the epoch level
+    `InferenceResultBatch` is a set of views on the buffers and does not need to be concatenated anymore.
+    """
+    __slots__ = ("_targets", "_predictions", "_tags", "_initial_capacity", "_num_batches")
+
+    def __init__(self, initial_capacity: int = 0):
+        """
+        :params:
+            initial_capacity (int): Number of samples to preallocate the buffers for, e.g., the length of the dataset.
+        """
+        self._initial_capacity = initial_capacity
+        self._targets: Dict[str, GrowableTensorBuffer] = {}
+        self._predictions: Dict[str, Union[Dict, GrowableTensorBuffer]] = {}
+        self._tags = GrowableTensorBuffer(initial_capacity)
+        self._num_batches = 0
+
+    def _append_tensor_dict(self, buffers: Dict[str, Any], tensor_dict: Dict[str, Any]):
+        if self._num_batches > 0 and buffers.keys() != tensor_dict.keys():
+            raise BatchStateError(f"Keys {list(tensor_dict.keys())} differ from the accumulated keys {list(buffers.keys())}.")
+        for key, value in tensor_dict.items():
+            if isinstance(value, dict):
+                self._append_tensor_dict(buffers.setdefault(key, {}), value)
+            else:
+                buffers.setdefault(key, GrowableTensorBuffer(self._initial_capacity)).append(value)
+
+    @staticmethod
+    def _get_tensor_dict(buffers: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: InferenceResultBatchAccumulator._get_tensor_dict(buffer) if isinstance(buffer, dict) else buffer.tensor
+                for key, buffer in buffers.items()}
+
+    def append(self, batch: InferenceResultBatch):
+        self._append_tensor_dict(self._targets, batch.targets)
+        self._append_tensor_dict(self._predictions, batch.predictions)
+        self._tags.append(torch.as_tensor(batch.tags))
+        self._num_batches += 1
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def combine(self) -> InferenceResultBatch:
+        """
+        Returns the accumulated results.
+
+        :returns:
+            InferenceResultBatch: Views on the accumulated targets, predictions and tags.
+        """
+        if self._num_batches == 0:
+            raise BatchStateError("Cannot combine an empty accumulator.")
+        return InferenceResultBatch(targets=InferenceResultBatchAccumulator._get_tensor_dict(self._targets),
+                                    predictions=InferenceResultBatchAccumulator._get_tensor_dict(self._predictions),
+                                    tags=self._tags.tensor)
+
+
+class InferenceResultBatchOffloader:
+    """Offloads the selected results of inference result batches into an `InferenceResultBatchAccumulator`.
+    The selections of `bulk_size` batches are concatenated on their device and transferred with a single fused,
+    asynchronous copy, which overlaps with the computation of the subsequent batches. Batches already residing on
+    the target device are appended right away.
+    """
+    __slots__ = ("selector", "accumulator", "device", "bulk_size", "_staged_batches", "_pending_batch")
+
+    def __init__(self, selector: InferenceResultBatchSelector, accumulator: InferenceResultBatchAccumulator,
+                 device: torch.device = torch.device("cpu"), bulk_size: int = 1):
+        """
+        :params:
+            selector (InferenceResultBatchSelector): Selects the results to be offloaded.
+            accumulator (InferenceResultBatchAccumulator): Accumulates the offloaded results.
+            device (torch.device): Device to offload the results to.
+            bulk_size (int): Number of batches transferred at once.
+        """
+        self.selector = selector
+        self.accumulator = accumulator
+        self.device = device
+        self.bulk_size = bulk_size
+        self._staged_batches: List[InferenceResultBatch] = []
+        self._pending_batch: InferenceResultBatch = None
+
+    def append(self, batch: InferenceResultBatch):
+        selected_batch = self.selector.select(batch)
+        if selected_batch.device == self.device:
+            self._flush()
+            self._await_pending()
+            self.accumulator.append(selected_batch)
+            return
+        self._staged_batches.append(selected_batch)
+        if len(self._staged_batches) >= self.bulk_size:
+            self._flush()
+
+    def _flush(self):
+        if len(self._staged_batches) == 0:
+            return
+        staged_batch = self._staged_batches[0] if len(self._staged_batches) == 1 else InferenceResultBatch.combine(self._staged_batches)
+        self._staged_batches = []
+        # the previous transfer is awaited only after issuing the next one
+        pending_batch = staged_batch.to_async(self.device, fused=True)
+        self._await_pending()
+        self._pending_batch = pending_batch
+
+    def _await_pending(self):
+        if self._pending_batch is not None:
+            self.accumulator.append(self._pending_batch.await_ready())
+            self._pending_batch = None
+
+    def combine(self) -> InferenceResultBatch:
+        """
+        Finishes the outstanding transfers and returns the accumulated results.
+
+        :returns:
+            InferenceResultBatch: Views on the accumulated targets, predictions and tags.
+        """
+        self._flush()
+        self._await_pending()
+        return self.accumulator.combine()
+
+
 class EvaluationBatchResult(Batch):
     """Data class for storing the results of a single or multiple batches. Also entire epoch results are stored in here.
     """
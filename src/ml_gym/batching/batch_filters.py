@@ -1,18 +1,153 @@
 from ml_gym.batching.batch import InferenceResultBatch
-from typing import List, Callable
+from ml_gym.registries.class_registry import ClassRegistry
+from typing import Any, Dict, List, Callable
 from functools import partial
+import torch
 
 
 class BatchFilter:
+    """
+    Factory for sample selection functions, which map an `InferenceResultBatch` to a boolean mask of the selected samples.
+    The masks are tensors on the batch's device, such that indexing the batch tensors with them (e.g., within `LPLoss`)
+    neither requires a device to host synchronisation nor a round trip through Python lists.
+
+    Selection functions can be composed from configs via `get_selection_fun`, e.g.,
+    {"key": "AND", "params": {"selection_fun_configs": [{"key": "CLASS", "params": {...}}, {"key": "TAG_RANGE", "params": {...}}]}}.
+    """
+    class SelectionFunKeys:
+        CLASS = "CLASS"
+        TAG_RANGE = "TAG_RANGE"
+        PREDICTION_THRESHOLD = "PREDICTION_THRESHOLD"
+        AND = "AND"
+        OR = "OR"
 
     @staticmethod
     def _class_filter_selection_fun(inference_batch_result: InferenceResultBatch, selected_class: int,
-                                    target_subscription_key: str) -> List[bool]:
-        return (inference_batch_result.targets[target_subscription_key] == selected_class).tolist()
+                                    target_subscription_key: str) -> torch.Tensor:
+        return inference_batch_result.targets[target_subscription_key] == selected_class
+
+    @staticmethod
+    def _tag_range_selection_fun(inference_batch_result: InferenceResultBatch, min_tag: Any, max_tag: Any) -> torch.Tensor:
+        tags = inference_batch_result.tags
+        mask = torch.ones(tags.shape, dtype=torch.bool, device=tags.device)
+        if min_tag is not None:
+            mask &= tags >= min_tag
+        if max_tag is not None:
+            mask &= tags < max_tag
+        return mask
+
+    @staticmethod
+    def _prediction_threshold_selection_fun(inference_batch_result: InferenceResultBatch, prediction_subscription_key: str,
+                                            threshold: float, above: bool) -> torch.Tensor:
+        predictions = inference_batch_result.get_predictions(prediction_subscription_key)
+        if predictions.dim() > 1:
+            # multi-class predictions are thresholded by their maximum score
+            predictions = predictions.flatten(start_dim=1).max(dim=1).values
+        return predictions >= threshold if above else predictions < threshold
+
+    @staticmethod
+    def _composite_selection_fun(inference_batch_result: InferenceResultBatch,
+                                 selection_funs: List[Callable[[InferenceResultBatch], torch.Tensor]],
+                                 combine_fun: Callable[[torch.Tensor, torch.Tensor], torch.Tensor]) -> torch.Tensor:
+        mask = selection_funs[0](inference_batch_result)
+        for selection_fun in selection_funs[1:]:
+            mask = combine_fun(mask, selection_fun(inference_batch_result))
+        return mask
 
     @staticmethod
-    def get_class_selection_fun(target_subscription_key: str, selected_class: int = None) -> Callable[[InferenceResultBatch], List[bool]]:
+    def get_class_selection_fun(target_subscription_key: str, selected_class: int = None) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Selects the samples of the given class.
+
+        :params:
+            target_subscription_key (str): Key of the targets.
+            selected_class (int): Class to be selected.
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
         sample_selection_fun = partial(BatchFilter._class_filter_selection_fun,
                                        selected_class=selected_class,
                                        target_subscription_key=target_subscription_key)
         return sample_selection_fun
+
+    @staticmethod
+    def get_tag_range_selection_fun(min_tag: Any = None, max_tag: Any = None) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Selects the samples whose tags are within [min_tag, max_tag).
+
+        :params:
+            min_tag (Any): Inclusive lower bound or None, if not bounded.
+            max_tag (Any): Exclusive upper bound or None, if not bounded.
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
+        return partial(BatchFilter._tag_range_selection_fun, min_tag=min_tag, max_tag=max_tag)
+
+    @staticmethod
+    def get_prediction_threshold_selection_fun(prediction_subscription_key: str, threshold: float,
+                                               above: bool = True) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Selects the samples whose prediction is at least (or, if not `above`, below) the threshold. Predictions with more than
+        one value per sample are thresholded by their maximum value.
+
+        :params:
+            prediction_subscription_key (str): Key of the predictions.
+            threshold (float): Threshold on the predictions.
+            above (bool): Whether to select the samples above or below the threshold.
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
+        return partial(BatchFilter._prediction_threshold_selection_fun, prediction_subscription_key=prediction_subscription_key,
+                       threshold=threshold, above=above)
+
+    @staticmethod
+    def get_and_selection_fun(selection_fun_configs: List[Dict[str, Any]]) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Selects the samples selected by all of the configured selection functions.
+
+        :params:
+            selection_fun_configs (List[Dict[str, Any]]): Configs of the selection functions (see `get_selection_fun`).
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
+        selection_funs = [BatchFilter.get_selection_fun(config) for config in selection_fun_configs]
+        return partial(BatchFilter._composite_selection_fun, selection_funs=selection_funs, combine_fun=torch.logical_and)
+
+    @staticmethod
+    def get_or_selection_fun(selection_fun_configs: List[Dict[str, Any]]) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Selects the samples selected by any of the configured selection functions.
+
+        :params:
+            selection_fun_configs (List[Dict[str, Any]]): Configs of the selection functions (see `get_selection_fun`).
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
+        selection_funs = [BatchFilter.get_selection_fun(config) for config in selection_fun_configs]
+        return partial(BatchFilter._composite_selection_fun, selection_funs=selection_funs, combine_fun=torch.logical_or)
+
+    @staticmethod
+    def get_selection_fun_registry() -> ClassRegistry:
+        registry = ClassRegistry()
+        default_mapping = {
+            BatchFilter.SelectionFunKeys.CLASS: BatchFilter.get_class_selection_fun,
+            BatchFilter.SelectionFunKeys.TAG_RANGE: BatchFilter.get_tag_range_selection_fun,
+            BatchFilter.SelectionFunKeys.PREDICTION_THRESHOLD: BatchFilter.get_prediction_threshold_selection_fun,
+            BatchFilter.SelectionFunKeys.AND: BatchFilter.get_and_selection_fun,
+            BatchFilter.SelectionFunKeys.OR: BatchFilter.get_or_selection_fun
+        }
+        for key, selection_fun_factory in default_mapping.items():
+            registry.add_class(key, selection_fun_factory)
+        return registry
+
+    @staticmethod
+    def get_selection_fun(selection_fun_config: Dict[str, Any]) -> Callable[[InferenceResultBatch], torch.Tensor]:
+        """
+        Builds a selection function from its config.
+
+        :params:
+            selection_fun_config (Dict[str, Any]): Config with the registry `key` of the selection function and its `params`.
+        :returns:
+            Callable[[InferenceResultBatch], torch.Tensor]: Selection function.
+        """
+        return BatchFilter.get_selection_fun_registry().get_instance(selection_fun_config["key"], **selection_fun_config.get("params", {}))
@@ -0,0 +1,59 @@
+from typing import Any, Tuple
+import os
+import pickle
+import tempfile
+import warnings
+
+
+class ComponentCache:
+    """
+    Persists built components within a directory, keyed by their component hash (see `ComponentFactory.get_component_hash`).
+    Only components of memoizable constructables, i.e., pure data components such as dataset iterators, are cached,
+    such that the jobs of a grid search build them once and load them afterwards.
+
+    Note, that the hash covers the configs of the component and its requirements, but not the contents of the underlying
+    data, i.e., the cache directory has to be cleared when the data changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_component_path(self, component_hash: str) -> str:
+        return os.path.join(self.directory, f"component_{component_hash}.pkl")
+
+    def get(self, component_hash: str) -> Tuple[bool, Any]:
+        """
+        Loads the component with the given hash.
+        :params:
+            component_hash (str): Hash of the component.
+
+        :returns:
+            Tuple[bool, Any]: Whether the component was cached and the component itself.
+        """
+        component_path = self.get_component_path(component_hash)
+        if not os.path.isfile(component_path):
+            return False, None
+        with open(component_path, "rb") as fp:
+            return True, pickle.load(fp)
+
+    def put(self, component_hash: str, component: Any):
+        """
+        Persists the component. Components that cannot be pickled are skipped with a warning.
+        :params:
+            component_hash (str): Hash of the component.
+            component (Any): Built component.
+        """
+        # write to a temporary file first, as the jobs of a grid search might build the same component concurrently
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".pkl")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(component, fp)
+            os.replace(tmp_path, self.get_component_path(component_hash))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            warnings.warn(f"Component {component_hash} could not be cached: {e}")
+        finally:
+            # the temporary file is left behind on any failure, including the ones that are not caught (e.g., OSError)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
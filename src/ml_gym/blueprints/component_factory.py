@@ -1,4 +1,7 @@
 import copy
+import hashlib
+import json
+import numpy as np
 from typing import Dict, Any, List, Type, Union
 from collections import namedtuple
 from dataclasses import dataclass, field
@@ -12,7 +15,8 @@ from ml_gym.blueprints.constructables import AccelerateEvalComponentConstructabl
     FilteredLabelsIteratorConstructable, FeatureEncodedIteratorConstructable, CombinedDatasetIteratorConstructable, \
     DataCollatorConstructable, PredictionPostProcessingRegistryConstructable, TrainComponentConstructable, EvalComponentConstructable, \
     IteratorViewConstructable, OneHotEncodedTargetsIteratorConstructable, InMemoryDatasetIteratorConstructable, \
-    ShuffledDatasetIteratorConstructable, CheckpointingStrategyConstructable, CheckpointingRegistryConstructable
+    MMapDatasetIteratorConstructable, StreamingDatasetIteratorConstructable, ShuffledDatasetIteratorConstructable, CheckpointingStrategyConstructable, CheckpointingRegistryConstructable
+from ml_gym.blueprints.component_cache import ComponentCache
 
 
 class Injector:
@@ -81,6 +85,11 @@ class ComponentFactory:
     Each component type can have multiple variants. This relationship is captured by component_factory_registry and
     ComponentVariantsRegistry. The ComponentFactoryRegistry maps a component_key to a ComponentVariantsRegistry.
     The ComponentVariantsRegistry maps a variant key to the concrete ComponentConstructable.
+
+    Components of memoizable constructables (i.e., pure data components like dataset iterators) are memoized by their
+    component hash, which is calculated from the component's config and the hashes of its requirements. Within a single
+    build, such components are built once and shared among all dependents. If a `component_cache_path` is given, they are
+    additionally persisted via a `ComponentCache`, such that the jobs of a grid search reuse them across processes.
     """
 
     class ComponentVariantsRegistry:
@@ -103,8 +112,12 @@ class ComponentFactory:
         def register_variant(self, variant_key: str, component_constructable_type: Type[ComponentConstructable]):
             self.constructables[variant_key] = component_constructable_type
 
-    def __init__(self, injector: Injector = None):
+        def is_memoizable(self, variant_key: str) -> bool:
+            return variant_key in self.constructables and self.constructables[variant_key].memoizable
+
+    def __init__(self, injector: Injector = None, component_cache_path: str = None):
         self.injector = injector
+        self.component_cache = ComponentCache(component_cache_path) if component_cache_path is not None else None
         ComponentVariant = namedtuple('ComponentVariant', ['component_key',
                                                            'variant_key',
                                                            'component_constructable_type'])
@@ -115,6 +128,8 @@ class ComponentFactory:
             ComponentVariant("SPLITTED_DATASET_ITERATORS", "RANDOM", DatasetIteratorSplitsConstructable),
             ComponentVariant("COMBINED_DATASET_ITERATORS", "DEFAULT", CombinedDatasetIteratorConstructable),
             ComponentVariant("IN_MEMORY_DATASET_ITERATORS", "DEFAULT", InMemoryDatasetIteratorConstructable),
+            ComponentVariant("MMAP_DATASET_ITERATORS", "DEFAULT", MMapDatasetIteratorConstructable),
+            ComponentVariant("STREAMING_DATASET_ITERATORS", "DEFAULT", StreamingDatasetIteratorConstructable),
             ComponentVariant("SHUFFLED_DATASET_ITERATORS", "DEFAULT", ShuffledDatasetIteratorConstructable),
             ComponentVariant("FILTERED_LABELS_ITERATOR", "DEFAULT", FilteredLabelsIteratorConstructable),
             ComponentVariant("ONE_HOT_ENCODED_TARGETS_ITERATOR", "DEFAULT", OneHotEncodedTargetsIteratorConstructable),
@@ -193,9 +208,56 @@ class ComponentFactory:
             component_representations[component_representation.name] = component_representation
         return component_representations
 
+    @staticmethod
+    def get_component_hash(component_name: str, component_representation_graph: Dict[str, ComponentRepresentation],
+                           component_hashes: Dict[str, str] = None) -> str:
+        """Calculates the hash of a component from its canonicalised config and the hashes of its requirements.
+
+        Args:
+            component_name (str): Name of the component
+            component_representation_graph (Dict[str, ComponentRepresentation]): Dependency graph of the components
+            component_hashes (Dict[str, str]): Already calculated hashes (component name -> hash)
+
+        Returns:
+            str: Hex digest of the component
+        """
+        if component_hashes is None:
+            component_hashes = {}
+        if component_name not in component_hashes:
+            component_representation = component_representation_graph[component_name]
+            requirements = {name: {"hash": ComponentFactory.get_component_hash(requirement.component_name, component_representation_graph,
+                                                                               component_hashes),
+                                   "subscription": requirement.subscription}
+                            for name, requirement in component_representation.requirements.items()}
+            # the name is part of the hash, as it becomes the identifier of the built component (e.g., within the dataset meta)
+            canonical_representation = {"name": component_representation.name,
+                                        "component_type_key": component_representation.component_type_key,
+                                        "variant_key": component_representation.variant_key,
+                                        "config": component_representation.config,
+                                        "requirements": requirements}
+            try:
+                serialised_representation = json.dumps(canonical_representation, sort_keys=True,
+                                                        default=ComponentFactory._to_json_compatible)
+            except TypeError as e:
+                raise ComponentConstructionError(f"Config of component {component_name} cannot be hashed, "
+                                                 f"as it is not JSON serialisable.") from e
+            component_hashes[component_name] = hashlib.sha256(serialised_representation.encode("utf-8")).hexdigest()
+        return component_hashes[component_name]
+
+    @staticmethod
+    def _to_json_compatible(value: Any) -> Any:
+        # numpy values (e.g., injected split indices) are hashed by their contents, all other values are rejected,
+        # as their string representation is not canonical (e.g., it contains memory addresses or is truncated)
+        if isinstance(value, np.generic):
+            return value.item()
+        elif isinstance(value, np.ndarray):
+            return value.tolist()
+        raise TypeError(f"Value of type {type(value).__name__} is not JSON serialisable.")
+
     def build_components_from_config(self, component_config: Dict, names_of_components_to_construct: List[str]) -> Dict:
         """Builds the components and returns a mapping from component name to component.
-        Note, that dependencies are always rebuilt and not reused!
+        Note, that only the components of memoizable constructables (pure data components) are reused,
+        all other dependencies are rebuilt for each dependent!
 
         Args:
             component_config (Dict): Raw config describing the components and their dependencies
@@ -209,9 +271,21 @@ class ComponentFactory:
             except ValueError as e:
                 raise DependentComponentNotFoundError(f"Could not find component {component_name}.") from e
 
+            component_variants_registry = self.component_factory_registry[component_representation.component_type_key]
+            memoizable = component_variants_registry.is_memoizable(component_representation.variant_key)
+            if memoizable:
+                component_hash = ComponentFactory.get_component_hash(component_name, component_representation_graph, component_hashes)
+                if component_hash in components:
+                    return components[component_hash]
+                if self.component_cache is not None:
+                    is_cached, component = self.component_cache.get(component_hash)
+                    if is_cached:
+                        components[component_hash] = component
+                        return component
+
             # build the requirements
             try:
-                requirement_components = {name: build_component(requirement.component_name, component_representation_graph, {})
+                requirement_components = {name: build_component(requirement.component_name, component_representation_graph, components)
                                           for name, requirement in component_representation.requirements.items()}
             except DependentComponentNotFoundError as dcnf_error:
                 raise ComponentConstructionError(f"Error building requirements for component {component_name}.") from dcnf_error
@@ -220,18 +294,22 @@ class ComponentFactory:
             requirements = {name: Requirement(requirement_components[name], requirement.subscription)
                             for name, requirement in component_representation.requirements.items()}
             # build the requested component
-            component_variants_registry = self.component_factory_registry[component_representation.component_type_key]
             try:
                 component = component_variants_registry.construct(component_representation.variant_key, component_representation.name, component_representation.config, requirements)
             except ComponentConstructionError as cc_error:
                 raise ComponentConstructionError(f"Error constructing {component_representation}") from cc_error
+            if memoizable:
+                components[component_hash] = component
+                if self.component_cache is not None:
+                    self.component_cache.put(component_hash, component)
             return component
 
         # calculate the dependency graph of components
         component_representation_graph = self._calc_dependency_graph(component_config)
+        component_hashes: Dict[str, str] = {}  # maps component name -> component hash
+        memoized_components: Dict[str, Any] = {}  # maps component hash -> memoized component
         # build each component
-        components: Dict[str, Any] = {}  # maps
-        components = {component_name: build_component(component_name, component_representation_graph, {})
+        components = {component_name: build_component(component_name, component_representation_graph, memoized_components)
                       for component_name, component_representation in component_representation_graph.items()
                       if component_name in names_of_components_to_construct}
         return components
@@ -1,6 +1,6 @@
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Union, Type
+from typing import Any, Callable, ClassVar, Dict, List, Union, Type
 from data_stack.dataset.iterator import DatasetIteratorIF
 from data_stack.repository.repository import DatasetRepository
 from abc import abstractmethod, ABC
@@ -15,9 +15,11 @@ from ml_gym.optimizers.lr_schedulers import LRSchedulerAdapter
 from ml_gym.optimizers.optimizer import OptimizerAdapter, OptimizerBundle
 from ml_gym.optimizers.optimizer_factory import OptimizerFactory
 from ml_gym.models.nn.net import NNModel
+from ml_gym.models.nn.compilation import ModelCompiler
 from collections.abc import Mapping
 from ml_gym.registries.class_registry import ClassRegistry
 from ml_gym.gym.trainers.standard_trainer import Trainer, TrainComponent, InferenceComponent
+from ml_gym.gym.mixed_precision_component import MixedPrecisionComponent
 from ml_gym.loss_functions.loss_functions import Loss
 from sklearn.metrics import f1_score, recall_score, precision_score, accuracy_score, balanced_accuracy_score
 from ml_gym.metrics.metrics import Metric, binary_aupr_score, binary_auroc_score
@@ -25,6 +27,7 @@ from ml_gym.metrics.metric_factory import MetricFactory
 from ml_gym.gym.evaluators.evaluator import Evaluator, EvalComponent
 from ml_gym.data_handling.postprocessors.factory import ModelGymInformedIteratorFactory
 from ml_gym.data_handling.postprocessors.collator import Collator
+from ml_gym.data_handling.split_index_store import SplitIndexStore
 from ml_gym.gym.post_processing import PredictPostProcessingIF, SoftmaxPostProcessorImpl, \
     ArgmaxPostProcessorImpl, SigmoidalPostProcessorImpl, DummyPostProcessorImpl, PredictPostProcessing, \
     BinarizationPostProcessorImpl, MaxOrMinPostProcessorImpl
@@ -63,6 +66,9 @@ class ComponentConstructable(ABC):
     component_identifier: str = ""
     constructed: Any = None
     requirements: Dict[str, Requirement] = field(default_factory=dict)
+    # pure data components (e.g., dataset iterators) are fully determined by their config and requirements and never
+    # mutated by their dependents, such that the ComponentFactory can share and cache them (see `ComponentFactory`)
+    memoizable: ClassVar[bool] = False
 
     def construct(self):
         if self.constructed is None:
@@ -90,6 +96,7 @@ class DatasetRepositoryConstructable(ComponentConstructable):
     DatasetRepositoryConstructable class initializes DatasetRepository & StorageConnectorFactory object from datastack library
     to be used for accessing data for models used in MlGym.
     """
+    memoizable: ClassVar[bool] = True
     storage_connector_path: str = ""
 
     def _construct_impl(self) -> DatasetRepository:
@@ -105,6 +112,7 @@ class DatasetIteratorConstructable(ComponentConstructable):
     DatasetIteratorConstructable class is used to make the dataset iterable
     to be used for accessing specific split for models used in MlGym.
     """
+    memoizable: ClassVar[bool] = True
     dataset_identifier: str = ""
     split_configs: Dict[str, Any] = field(default_factory=dict)
 
@@ -128,6 +136,7 @@ class DatasetIteratorSplitsConstructable(ComponentConstructable):
     DatasetIteratorSplitsConstructable class is used to make the dataset iterable.
     to be used for accessing all data splits for models used in MlGym.
     """
+    memoizable: ClassVar[bool] = True
     split_configs: Dict = None
     seed: int = 1
     stratified: bool = False
@@ -145,6 +154,7 @@ class CombinedDatasetIteratorConstructable(ComponentConstructable):
     CombinedDatasetIteratorConstructable class is used to get combined itterators for the dataset by 
     combining iterators from old splits and getting new iterators for new splits.
     """
+    memoizable: ClassVar[bool] = True
     combine_configs: Dict = None
 
     def _construct_impl(self) -> Dict[str, InformedDatasetIteratorIF]:
@@ -160,17 +170,59 @@ class InMemoryDatasetIteratorConstructable(ComponentConstructable):
     """
     InMemoryDatasetIteratorConstructable class is used to load a given iterator into memory to speed up the iteration.
     """
+    memoizable: ClassVar[bool] = True
     def _construct_impl(self) -> Dict[str, InformedDatasetIteratorIF]:
         dataset_iterators_dict = self.get_requirement("iterators")
         return {name: ModelGymInformedIteratorFactory.get_in_memory_iterator(self.component_identifier, iterator)
                 for name, iterator in dataset_iterators_dict.items()}
 
 
+@dataclass
+class MMapDatasetIteratorConstructable(ComponentConstructable):
+    """
+    MMapDatasetIteratorConstructable class is used to serialise the given iterators once into memory-mapped columnar files,
+    which are shared zero-copy among all processes via the page cache.
+    """
+    memoizable: ClassVar[bool] = True
+    storage_path: str = ""
+
+    def _construct_impl(self) -> Dict[str, InformedDatasetIteratorIF]:
+        dataset_iterators_dict = self.get_requirement("iterators")
+        return {name: ModelGymInformedIteratorFactory.get_mmap_iterator(self.component_identifier, iterator, self.storage_path)
+                for name, iterator in dataset_iterators_dict.items()}
+
+
+@dataclass
+class StreamingDatasetIteratorConstructable(ComponentConstructable):
+    """
+    StreamingDatasetIteratorConstructable class is used to stream the applicable splits in chunks with a bounded shuffle buffer,
+    e.g., for datasets that are too large to be sampled randomly.
+    """
+    applicable_splits: List[str] = field(default_factory=list)
+    chunk_size: int = 1024
+    shuffle_buffer_size: int = 0
+    class_weighted_sampling: bool = False
+    label_pos: int = None
+    seeds: Dict[str, Any] = field(default_factory=dict)
+
+    def _construct_impl(self) -> Dict[str, InformedDatasetIteratorIF]:
+        dataset_iterators_dict = self.get_requirement("iterators")
+        return {name: ModelGymInformedIteratorFactory.get_streaming_iterator(self.component_identifier, iterator,
+                                                                             chunk_size=self.chunk_size,
+                                                                             shuffle_buffer_size=self.shuffle_buffer_size,
+                                                                             class_weighted_sampling=self.class_weighted_sampling,
+                                                                             label_pos=self.label_pos,
+                                                                             seed=self.seeds.get(name, 0))
+                if name in self.applicable_splits else iterator
+                for name, iterator in dataset_iterators_dict.items()}
+
+
 @dataclass
 class ShuffledDatasetIteratorConstructable(ComponentConstructable):
     """
     ShuffledDatasetIteratorConstructable class is used to get randomly shuffled iterators usefull for large datasets.
     """
+    memoizable: ClassVar[bool] = True
     seeds: Dict[str, Any] = field(default_factory=dict)
     applicable_splits: List[str] = field(default_factory=list)
 
@@ -186,12 +238,15 @@ class FilteredLabelsIteratorConstructable(ComponentConstructable):
     """
     FilteredLabelsIteratorConstructable class is used to get an iterator which can iterate through filtered labels in the dataset.
     """
+    memoizable: ClassVar[bool] = True
     filtered_labels: List[Any] = field(default_factory=list)
     applicable_splits: List[str] = field(default_factory=list)
+    label_index_path: str = None
 
     def _construct_impl(self) -> Dict[str, DatasetIteratorIF]:
         dataset_iterators_dict = self.get_requirement("iterators")
-        return {name: ModelGymInformedIteratorFactory.get_filtered_labels_iterator(self.component_identifier, iterator, self.filtered_labels)
+        return {name: ModelGymInformedIteratorFactory.get_filtered_labels_iterator(self.component_identifier, iterator, self.filtered_labels,
+                                                                                   self.label_index_path)
                 if name in self.applicable_splits else iterator
                 for name, iterator in dataset_iterators_dict.items()}
 
@@ -200,8 +255,10 @@ class FilteredLabelsIteratorConstructable(ComponentConstructable):
 class IteratorViewConstructable(ComponentConstructable):
     """
     IteratorViewConstructable class is used to create a view on an iterator for accessing elements of a given split only.
+    The indices of a split are either given inline or as a reference into a `SplitIndexStore`, which is resolved on construction.
     """
-    split_indices: Dict[str, List[int]] = field(default_factory=dict)
+    memoizable: ClassVar[bool] = True
+    split_indices: Dict[str, Union[List[int], str]] = field(default_factory=dict)
     view_tags: Dict[str, Any] = field(default_factory=dict)
     applicable_split: str = ""
 
@@ -213,6 +270,8 @@ class IteratorViewConstructable(ComponentConstructable):
         dataset_iterator = self.get_requirement("iterators")[self.applicable_split]
         iterator_views = {}
         for name, indices in self.split_indices.items():
+            if SplitIndexStore.is_reference(indices):
+                indices = SplitIndexStore.resolve(indices)
             partial_selection_fun = partial(IteratorViewConstructable.sample_selection_fun, split_indices=indices)
             iterator_view = ModelGymInformedIteratorFactory.get_iterator_view(self.component_identifier, dataset_iterator,
                                                                               partial_selection_fun, self.view_tags)
@@ -225,6 +284,7 @@ class MappedLabelsIteratorConstructable(ComponentConstructable):
     """
     MappedLabelsIteratorConstructable class is used to get an iterator which can iterate through mapped labels in the dataset.
     """
+    memoizable: ClassVar[bool] = True
     mappings: Dict[str, Union[List[int], int]] = field(default_factory=dict)
     applicable_splits: List[str] = field(default_factory=list)
 
@@ -240,13 +300,18 @@ class FeatureEncodedIteratorConstructable(ComponentConstructable):
     """
     FeatureEncodedIteratorConstructable class is used to get an iterator which can iterate through encoded fetures of a dataset.
     """
+    memoizable: ClassVar[bool] = True
     applicable_splits: List[str] = field(default_factory=list)
     feature_encoding_configs: Dict = field(default_factory=Dict)
+    encoder_cache_path: str = None
+    chunk_size: int = 4096
+    num_workers: int = 0
 
     def _construct_impl(self) -> Dict[str, DatasetIteratorIF]:
         dataset_iterators_dict = self.get_requirement("iterators")
         feature_encoded_iterators = ModelGymInformedIteratorFactory.get_feature_encoded_iterators(
-            self.component_identifier, dataset_iterators_dict, self.feature_encoding_configs)
+            self.component_identifier, dataset_iterators_dict, self.feature_encoding_configs, self.encoder_cache_path,
+            self.chunk_size, self.num_workers)
         return {name: iterator for name, iterator in feature_encoded_iterators.items() if name in self.applicable_splits}
 
 
@@ -256,6 +321,7 @@ class OneHotEncodedTargetsIteratorConstructable(ComponentConstructable):
     OneHotEncodedTargetsIteratorConstructable class is used to get an iterator which can iterate 
     through one hot encoded target vector.
     """
+    memoizable: ClassVar[bool] = True
     applicable_splits: List[str] = field(default_factory=list)
     target_vector_size: int = 0
 
@@ -311,6 +377,11 @@ class DataLoadersConstructable(ComponentConstructable):
     batch_size: int = 1
     sampling_strategies: Dict[str, Any] = field(default_factory=dict)
     drop_last: bool = False
+    num_workers: int = 0
+    pin_memory: bool = False
+    prefetch_factor: int = None
+    persistent_workers: bool = False
+    worker_seed: int = None
 
     def _construct_impl(self) -> DatasetLoader:
         dataset_iterators_dict = self.get_requirement("iterators")
@@ -319,7 +390,12 @@ class DataLoadersConstructable(ComponentConstructable):
                                                               batch_size=self.batch_size,
                                                               collate_fn=collator,
                                                               sampling_strategies=self.sampling_strategies,
-                                                              drop_last=self.drop_last)
+                                                              drop_last=self.drop_last,
+                                                              num_workers=self.num_workers,
+                                                              pin_memory=self.pin_memory,
+                                                              prefetch_factor=self.prefetch_factor,
+                                                              persistent_workers=self.persistent_workers,
+                                                              worker_seed=self.worker_seed)
 
 
 @dataclass
@@ -429,6 +505,8 @@ class MetricFunctionRegistryConstructable(ComponentConstructable):
         PRECISION = "PRECISION"
         AUROC = "AUROC"
         AUPR = "AUPR"
+        BINNED_AUROC = "BINNED_AUROC"
+        BINNED_AUPR = "BINNED_AUPR"
         RECALL_AT_K = "RECALL_AT_K"
         AREA_UNDER_RECALL_AT_K = "AREA_UNDER_RECALL_AT_K"
         BRIER_SCORE = "BRIER_SCORE"
@@ -439,26 +517,32 @@ class MetricFunctionRegistryConstructable(ComponentConstructable):
         metric_fun_registry = ClassRegistry()
         default_mapping: Dict[str, Metric] = {
             MetricFunctionRegistryConstructable.MetricKeys.F1_SCORE:
-                MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.F1_SCORE,
-                                                 metric_fun=f1_score),
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.F1_SCORE,
+                                                           metric_fun=f1_score),
             MetricFunctionRegistryConstructable.MetricKeys.ACCURACY:
-                MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.ACCURACY,
-                                                 metric_fun=accuracy_score),
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.ACCURACY,
+                                                           metric_fun=accuracy_score),
             MetricFunctionRegistryConstructable.MetricKeys.BALANCED_ACCURACY:
-                MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.BALANCED_ACCURACY,
-                                                 metric_fun=balanced_accuracy_score),
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.BALANCED_ACCURACY,
+                                                           metric_fun=balanced_accuracy_score),
             MetricFunctionRegistryConstructable.MetricKeys.RECALL:
-                MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.RECALL,
-                                                 metric_fun=recall_score),
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.RECALL,
+                                                           metric_fun=recall_score),
             MetricFunctionRegistryConstructable.MetricKeys.PRECISION:
-            MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.PRECISION,
-                                             metric_fun=precision_score),
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.PRECISION,
+                                                           metric_fun=precision_score),
             MetricFunctionRegistryConstructable.MetricKeys.AUROC:
                 MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.AUROC,
                                                  metric_fun=binary_auroc_score),
             MetricFunctionRegistryConstructable.MetricKeys.AUPR:
                 MetricFactory.get_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.AUPR,
                                                  metric_fun=binary_aupr_score),
+            MetricFunctionRegistryConstructable.MetricKeys.BINNED_AUROC:
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.BINNED_AUROC,
+                                                           metric_fun=binary_auroc_score, params={"num_bins": 1000}),
+            MetricFunctionRegistryConstructable.MetricKeys.BINNED_AUPR:
+                MetricFactory.get_streaming_sklearn_metric(metric_key=MetricFunctionRegistryConstructable.MetricKeys.BINNED_AUPR,
+                                                           metric_fun=binary_aupr_score, params={"num_bins": 1000}),
             MetricFunctionRegistryConstructable.MetricKeys.RECALL_AT_K:
                 MetricFactory.get_recall_at_k_metric_fun,
             MetricFunctionRegistryConstructable.MetricKeys.AREA_UNDER_RECALL_AT_K:
@@ -509,17 +593,23 @@ class PredictionPostProcessingRegistryConstructable(ComponentConstructable):
 class ModelConstructable(ComponentConstructable):
     """
     ModelConstructable class is used to construct a Neural Net model based on the
-    params in the model registry.
+    params in the model registry. If a `compilation_config` (parameters of the `ModelCompiler`) is given,
+    the forward pass of the model is compiled, e.g., {"compiler": "torch_compile", "backend": "inductor", "mode": "max-autotune"}.
     """
     model_type: str = ""
     model_definition: Dict[str, Any] = field(default_factory=dict)
     seed: int = None
     prediction_publication_keys: Dict[str, str] = field(default_factory=dict)
+    compilation_config: Dict[str, Any] = None
 
     def _construct_impl(self) -> NNModel:
         other_params = {"seed": self.seed} if self.seed is not None else {}
         model_type = self.get_requirement("model_registry")
-        return model_type(**other_params, **self.model_definition, **self.prediction_publication_keys)
+        model = model_type(**other_params, **self.model_definition, **self.prediction_publication_keys)
+        if self.compilation_config is not None:
+            model_hash = ModelCompiler.get_model_hash(self.model_type, self.model_definition, self.prediction_publication_keys)
+            model = ModelCompiler(**self.compilation_config).compile(model, model_hash)
+        return model
 
 
 @dataclass
@@ -531,6 +621,11 @@ class TrainComponentConstructable(ComponentConstructable):
     loss_fun_config: Dict = field(default_factory=dict)
     post_processors_config: List[Dict] = field(default_factory=list)
     show_progress: bool = False
+    precision: str = MixedPrecisionComponent.Precision.FP32
+    loss_scaler_params: Dict = field(default_factory=dict)
+    gradient_accumulation_steps: int = 1
+    set_grads_to_none: bool = True
+    prefetch_depth: int = 2
 
     def _construct_impl(self) -> TrainComponent:
         prediction_post_processing_registry: ClassRegistry = self.get_requirement("prediction_postprocessing_registry")
@@ -540,7 +635,9 @@ class TrainComponentConstructable(ComponentConstructable):
                           for config in self.post_processors_config]
 
         inference_component = InferenceComponent(no_grad=False)
-        train_component = TrainComponent(inference_component, postprocessors, train_loss_fun)
+        mixed_precision_component = MixedPrecisionComponent(precision=self.precision, loss_scaler_params=self.loss_scaler_params)
+        train_component = TrainComponent(inference_component, postprocessors, train_loss_fun, mixed_precision_component,
+                                         self.gradient_accumulation_steps, self.set_grads_to_none, self.prefetch_depth)
         return train_component
 
 
@@ -604,6 +701,7 @@ class EvalComponentConstructable(ComponentConstructable):
     cpu_prediction_subscription_keys: List[str] = field(default_factory=list)
     metrics_computation_config: List[Dict] = None
     loss_computation_config: List[Dict] = None
+    prefetch_depth: int = 2
 
     def _construct_impl(self) -> EvalComponent:
         dataset_loaders: Dict[str, DatasetLoader] = self.get_requirement("data_loaders")
@@ -630,7 +728,8 @@ class EvalComponentConstructable(ComponentConstructable):
         inference_component = InferenceComponent(no_grad=True)
         eval_component = EvalComponent(inference_component, postprocessors_dict, metric_funs, loss_funs, dataset_loaders,
                                        self.show_progress, self.cpu_target_subscription_keys, self.cpu_prediction_subscription_keys,
-                                       self.metrics_computation_config, self.loss_computation_config)
+                                       self.metrics_computation_config, self.loss_computation_config,
+                                       prefetch_depth=self.prefetch_depth)
         return eval_component
 
 
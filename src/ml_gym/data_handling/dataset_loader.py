@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
-from itertools import chain
+from contextlib import contextmanager
+from copy import copy
+from itertools import chain, islice
 from ml_gym.error_handling.exception import SamplerNotFoundError
 from torch.utils.data import DataLoader
-from torch.utils.data.sampler import RandomSampler, WeightedRandomSampler, Sampler, SequentialSampler
-from typing import Callable, Dict, Any
+from torch.utils.data.sampler import RandomSampler, WeightedRandomSampler, Sampler, SequentialSampler, BatchSampler
+from typing import Callable, Dict, Any, Iterator, List
 from data_stack.dataset.iterator import InformedDatasetIteratorIF
-from collections import Counter
+import numpy as np
+import random
 import torch
+from ml_gym.batching.batch import TorchDeviceMixin
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.data_handling.iterators import BatchedFetch, BatchedFetchDatasetIterator
+from ml_gym.data_handling.streaming import StreamingDatasetIterator
+from ml_gym.gym.stateful_components import StatefulComponent
 from ml_gym.data_handling.postprocessors.collator import Collator
 from enum import Enum
 from accelerate.data_loader import DataLoaderShard
@@ -53,7 +61,9 @@ class DatasetLoaderFactory:
 
     @staticmethod
     def get_splitted_data_loaders(dataset_splits: Dict[str, InformedDatasetIteratorIF], batch_size: int, collate_fn: Callable = None,
-                                  drop_last: bool = False, sampling_strategies: Dict[str, Any] = None) -> Dict[str, "DatasetLoader"]:
+                                  drop_last: bool = False, sampling_strategies: Dict[str, Any] = None, num_workers: int = 0,
+                                  pin_memory: bool = False, prefetch_factor: int = None, persistent_workers: bool = False,
+                                  worker_seed: int = None) -> Dict[str, "DatasetLoader"]:
         """
         Get the spliited data based on the sampling stratergy.
         :params:
@@ -62,13 +72,21 @@ class DatasetLoaderFactory:
                 collate_fn (Callable): TO DO
                 drop_last (bool): TO DO
                 sampling_strategies (Dict[str, Any]): What type of sampling stratergy to be used for the splits.
+                    Streamed splits (`StreamingDatasetIterator`) are sampled by the stream itself.
+                num_workers (int): Number of worker processes used for loading and collating the batches.
+                pin_memory (bool): Whether the batches are copied into pinned memory before being returned.
+                prefetch_factor (int): Number of batches loaded in advance by each worker.
+                persistent_workers (bool): Whether the worker processes are kept alive between epochs.
+                worker_seed (int): Seed from which the seeds of the worker processes are derived.
 
         :return:
             data_loaders (Dict[str, "DatasetLoader"]): Data loaded based on the splits and sampling stratergy.
         """
         data_loaders = {}
         for split_name, dataset_split in dataset_splits.items():
-            if split_name in sampling_strategies:
+            if isinstance(dataset_split, StreamingDatasetIterator):
+                sampler = None
+            elif split_name in sampling_strategies:
                 config = sampling_strategies[split_name]
                 strategy = SamplerFactory.SamplingStrategies[sampling_strategies[split_name]["strategy"]]
                 config.pop("strategy")
@@ -86,7 +104,12 @@ class DatasetLoaderFactory:
                                                      batch_size=batch_size,
                                                      sampler=sampler,
                                                      collate_fn=collate_fn,
-                                                     drop_last=drop_last)
+                                                     drop_last=drop_last,
+                                                     num_workers=num_workers,
+                                                     pin_memory=pin_memory,
+                                                     prefetch_factor=prefetch_factor,
+                                                     persistent_workers=persistent_workers,
+                                                     worker_seed=worker_seed)
         return data_loaders
 
     @staticmethod
@@ -104,22 +127,25 @@ class SamplerFactory:
         IN_ORDER = "in_order"
 
     @staticmethod
-    def get_weighted_sampler(dataset: InformedDatasetIteratorIF, label_pos: int = 2, seed: int = 0) -> Sampler:
+    def get_weighted_sampler(dataset: InformedDatasetIteratorIF, label_pos: int = 2, seed: int = 0,
+                             label_index_path: str = None) -> Sampler:
         # """Returns a WeightedRandomSampler by counting the tags (sic!) over all samples.
         # Note, we don't count over targets as they might e.g., be one hot encoded.
 
         # Args:
         #     dataset (InformedDatasetIteratorIF): Iterator to calculate the sampler from
+        #     label_index_path (str): Optional directory for persisting the label index (see `LabelIndex`)
 
         # Returns:
         #     [WeightedRandomSampler]: Instance of WeightedRandomSampler.
         # """
         rnd_generator = torch.Generator().manual_seed(seed) if seed is not None else None
-        # get the class weights
-        target_counts = Counter([int(sample[label_pos]) for sample in dataset])  # uses generator expression
-        target_tuples = [(k, v) for k, v in sorted(target_counts.items(), key=lambda item: item[0])]
-        class_weights = {target_key: 1./target_count for target_key, target_count in target_tuples}
-        sample_weights = [class_weights[sample[label_pos]] for sample in dataset]
+        # get the class weights via the label column, so that the samples themselves don't have to be materialised twice
+        labels = LabelIndex.get_labels(dataset, label_pos, label_index_path)
+        _, class_ids = np.unique(labels, return_inverse=True)
+        class_ids = class_ids.reshape(-1)
+        class_weights = 1. / np.bincount(class_ids)
+        sample_weights = torch.from_numpy(class_weights[class_ids])
         sampler = WeightedRandomSampler(weights=sample_weights, num_samples=len(dataset), generator=rnd_generator)
         return sampler
 
@@ -162,13 +188,191 @@ class DatsetLoaderMetaInfoIF(ABC):
         raise NotImplementedError
 
 
-class DatasetLoader(DatsetLoaderMetaInfoIF, DataLoader):
+class ResumableBatchSampler(Sampler, StatefulComponent):
+    """
+    Wraps the batch sampler of a `DatasetLoader` and tracks the random generator state of the underlying sampler at the
+    beginning of each pass, i.e., each iteration over the loader. Given this state, any pass can be regenerated
+    and started at an arbitrary batch, while only the indices (and not the samples) of the skipped batches are drawn.
+
+    Iterations within `untracked_passes` (e.g., the evaluation of the train split) are neither counted as passes
+    nor do they advance the generator, such that only the training passes have to be regenerated.
+    """
+
+    def __init__(self, batch_sampler: BatchSampler):
+        self.batch_sampler = batch_sampler
+        self.num_passes = 0
+        # generator state at the beginning of pass `_recorded_pass`
+        self._recorded_pass = 0
+        self._pass_generator_state: torch.Tensor = self._get_generator_state()
+        self._start_batch = 0
+        self._tracks_passes = True
+
+    @property
+    def _generator(self) -> torch.Generator:
+        return getattr(self.batch_sampler.sampler, "generator", None)
+
+    def _get_generator_state(self) -> torch.Tensor:
+        return self._generator.get_state() if self._generator is not None else None
+
+    def __len__(self) -> int:
+        return len(self.batch_sampler)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        if not self._tracks_passes:
+            return iter(self.batch_sampler)
+        self._recorded_pass = self.num_passes
+        self._pass_generator_state = self._get_generator_state()
+        self.num_passes += 1
+        start_batch, self._start_batch = self._start_batch, 0
+        return islice(iter(self.batch_sampler), start_batch, None)
+
+    @contextmanager
+    def untracked_passes(self):
+        """
+        Within the context, iterations are not counted as passes and the generator state is restored afterwards.
+        """
+        generator_state = self._get_generator_state()
+        self._tracks_passes = False
+        try:
+            yield
+        finally:
+            self._tracks_passes = True
+            if generator_state is not None:
+                self._generator.set_state(generator_state)
+
+    def resume(self, num_passes: int, start_batch: int):
+        """
+        Prepares the next iteration to regenerate the pass `num_passes` (0-based) and to start it at batch `start_batch`.
+        The generator is restored from the recorded pass and the passes in between are replayed on index level.
+        :params:
+            num_passes (int): Number of passes completed before the resumed pass.
+            start_batch (int): Batch index within the resumed pass to start at.
+        """
+        if self._generator is not None:
+            if num_passes < self._recorded_pass:
+                raise ValueError(f"Cannot resume pass {num_passes}, as the generator state was recorded at pass {self._recorded_pass}.")
+            if self._pass_generator_state is not None:
+                self._generator.set_state(self._pass_generator_state)
+            for _ in range(num_passes - self._recorded_pass):
+                for _ in self.batch_sampler:
+                    pass
+        self.num_passes = num_passes
+        self._recorded_pass = num_passes
+        self._pass_generator_state = self._get_generator_state()
+        self._start_batch = start_batch
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"num_passes": self.num_passes, "recorded_pass": self._recorded_pass,
+                "pass_generator_state": self._pass_generator_state}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.num_passes = state["num_passes"]
+        self._recorded_pass = state["recorded_pass"]
+        self._pass_generator_state = state["pass_generator_state"]
+
+
+class DatasetLoader(DatsetLoaderMetaInfoIF, DataLoader, StatefulComponent):
     """
     Data Set loader class. Uses the torch class DataLaoder to load data for mlgym model which is iterable.
+
+    If `num_workers` > 0, the batches are loaded and collated within worker processes. The collator then always
+    collates on the CPU and the batches are moved to the loader's `device` within the main process,
+    as tensors must not be created on accelerators inside the worker processes.
+
+    For streamed datasets (`StreamingDatasetIterator`), the loader advances the stream's epoch before each iteration.
+    The workers receive a copy of the stream per iteration, therefore `persistent_workers` is not supported for streams.
+
+    The loader can be resumed at any batch (see `resume`) without loading the preceding batches. For map-style datasets,
+    the sampler's generator state is tracked by a `ResumableBatchSampler`, which is checkpointed as part of the loader's state.
+    Streams are resumed by seeking to the corresponding stream offset. With workers, streams can only be resumed at the
+    beginning of a pass, as the batches of the workers are interleaved. Iterations that are not part of the training
+    (e.g., the evaluation of the train split) have to run within `untracked_passes`, as otherwise they would be counted
+    as passes.
     """
     def __init__(self, dataset_iterator: InformedDatasetIteratorIF, batch_size: int, sampler: Sampler,
-                 collate_fn: Collator = None, drop_last: bool = False):
-        super().__init__(dataset=dataset_iterator, sampler=sampler, batch_size=batch_size, collate_fn=collate_fn, drop_last=drop_last)
+                 collate_fn: Collator = None, drop_last: bool = False, num_workers: int = 0, pin_memory: bool = False,
+                 prefetch_factor: int = None, persistent_workers: bool = False, worker_seed: int = None):
+        # if any iterator within the stack can post process whole batches, the DataLoader fetches the index batches at once
+        if BatchedFetch.is_supported(dataset_iterator):
+            dataset_iterator = BatchedFetchDatasetIterator(dataset_iterator)
+        device = collate_fn.device if isinstance(collate_fn, Collator) else None
+        if num_workers > 0 and isinstance(collate_fn, Collator):
+            # the collator is shared among the loaders, so the workers get their own CPU bound copy
+            collate_fn = copy(collate_fn)
+            collate_fn.device = torch.device("cpu")
+        worker_params = {}
+        if num_workers > 0:
+            is_stream = isinstance(dataset_iterator, StreamingDatasetIterator)
+            worker_params = {"prefetch_factor": prefetch_factor, "persistent_workers": persistent_workers and not is_stream,
+                             "worker_init_fn": DatasetLoader._seed_worker,
+                             "generator": torch.Generator().manual_seed(worker_seed) if worker_seed is not None else None}
+        super().__init__(dataset=dataset_iterator, sampler=sampler, batch_size=batch_size, collate_fn=collate_fn, drop_last=drop_last,
+                         num_workers=num_workers, pin_memory=pin_memory, **worker_params)
+        self._device = device
+        self._resumable_batch_sampler = ResumableBatchSampler(self.batch_sampler) \
+            if not isinstance(dataset_iterator, StreamingDatasetIterator) and self.batch_sampler is not None else None
+
+    @property
+    def _index_sampler(self):
+        resumable_batch_sampler = getattr(self, "_resumable_batch_sampler", None)
+        return resumable_batch_sampler if resumable_batch_sampler is not None else super()._index_sampler
+
+    def resume(self, num_passes: int, start_batch: int):
+        """
+        Prepares the next iteration to continue the pass `num_passes` (0-based) at batch `start_batch`, as if the loader
+        had been iterated `num_passes` times and `start_batch` batches had been drawn from the current pass.
+        :params:
+            num_passes (int): Number of passes completed before the resumed pass.
+            start_batch (int): Batch index within the resumed pass to start at.
+        """
+        if isinstance(self.dataset, StreamingDatasetIterator):
+            if self.num_workers > 0 and start_batch > 0:
+                # the workers read disjoint blocks of the stream and the batches are interleaved per worker,
+                # i.e., the batch index does not translate to a single stream offset
+                raise ValueError(f"Cannot resume a stream at batch {start_batch} with {self.num_workers} workers, "
+                                 "streams can only be resumed within a pass without workers.")
+            self.dataset.set_stream_position(epoch=num_passes, stream_offset=start_batch*self.batch_size)
+        else:
+            self._resumable_batch_sampler.resume(num_passes=num_passes, start_batch=start_batch)
+
+    @contextmanager
+    def untracked_passes(self):
+        """
+        Iterations within the context neither count as passes nor advance the sampler's generator or the stream's epoch,
+        i.e., the loader state is the same as before entering the context.
+        """
+        if isinstance(self.dataset, StreamingDatasetIterator):
+            epoch, stream_offset = self.dataset.get_stream_position()
+            try:
+                yield
+            finally:
+                self.dataset.set_stream_position(epoch=epoch, stream_offset=stream_offset)
+        elif self._resumable_batch_sampler is not None:
+            with self._resumable_batch_sampler.untracked_passes():
+                yield
+        else:
+            yield
+
+    def get_state(self) -> Dict[str, Any]:
+        return self._resumable_batch_sampler.get_state() if self._resumable_batch_sampler is not None else {}
+
+    def set_state(self, state: Dict[str, Any]):
+        if self._resumable_batch_sampler is not None and state:
+            self._resumable_batch_sampler.set_state(state)
+
+    @staticmethod
+    def _seed_worker(worker_id: int):
+        # torch seeds each worker with base_seed + worker_id, we derive the seeds of numpy and random from it
+        worker_seed = torch.initial_seed() % 2**32
+        np.random.seed(worker_seed)
+        random.seed(worker_seed)
+
+    def __iter__(self):
+        if isinstance(self.dataset, StreamingDatasetIterator):
+            self.dataset.begin_epoch()
+        if self.num_workers == 0 or self._device is None or self._device == torch.device("cpu"):
+            return super().__iter__()
+        return (batch.to(self._device) if isinstance(batch, TorchDeviceMixin) else batch for batch in super().__iter__())
 
     @property
     def dataset_name(self) -> str:
@@ -180,11 +384,15 @@ class DatasetLoader(DatsetLoaderMetaInfoIF, DataLoader):
 
     @property
     def device(self) -> torch.device:
-        return self.collate_fn.device
+        # without workers, the collator places the batches and might be shared with (and moved by) other loaders
+        if self.num_workers == 0 and isinstance(self.collate_fn, Collator):
+            return self.collate_fn.device
+        return self._device
 
     @device.setter
     def device(self, d: torch.device):
-        if self.collate_fn is not None:
+        self._device = d
+        if self.collate_fn is not None and self.num_workers == 0:
             self.collate_fn.device = d
 
 
@@ -0,0 +1,92 @@
+from typing import Any, Dict, Set
+from data_stack.dataset.iterator import DatasetIteratorIF, DatasetIteratorView, InformedDatasetIterator
+from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+import hashlib
+import json
+import numpy as np
+import torch
+
+
+class IteratorIdentity:
+    """
+    Identity of an iterator chain, used as key of the artefacts persisted for a dataset (e.g., memory-mapped copies,
+    label indices and fitted encoders). The identity covers the dataset meta (identifier, name, tag and sample positions),
+    the length and the indices of all views along the iterator chain as well as the configs of the post processors, such
+    that, e.g., the folds of a cross validation or differently label-mapped copies of a dataset are told apart. Note, that
+    the identity does not cover the sample contents, i.e., persisted artefacts have to be cleared when the underlying data
+    changes.
+    """
+
+    @staticmethod
+    def get_identity(iterator: DatasetIteratorIF) -> Dict[str, Any]:
+        """
+        Calculates the identity of the iterator and all its underlying iterators.
+        :params:
+            iterator (DatasetIteratorIF): Iterator whose identity is to be calculated.
+
+        :returns:
+            identity (Dict[str, Any]): JSON serialisable identity of the iterator.
+        """
+        identity = {"type": type(iterator).__name__, "length": len(iterator)}
+        dataset_meta = getattr(iterator, "dataset_meta", None)
+        if dataset_meta is not None:
+            identity.update({"identifier": dataset_meta.identifier,
+                             "dataset_name": dataset_meta.dataset_name,
+                             "dataset_tag": dataset_meta.dataset_tag,
+                             "sample_pos": dataset_meta.sample_pos,
+                             "target_pos": dataset_meta.target_pos,
+                             "tag_pos": dataset_meta.tag_pos})
+        if isinstance(iterator, DatasetIteratorView):
+            identity["indices"] = IteratorIdentity._get_array_hash(np.ascontiguousarray(iterator.indices, dtype=np.int64))
+        if isinstance(iterator, PostProcessedDatasetIterator):
+            identity["post_processor"] = IteratorIdentity._get_config(iterator._post_processor, set())
+        # informed iterators expose the underlying iterators of the iterator they wrap, i.e., skip it
+        underlying_iterators = [iterator._dataset_iterator] if isinstance(iterator, InformedDatasetIterator) else iterator.underlying_iterators
+        identity["underlying_iterators"] = [IteratorIdentity.get_identity(underlying_iterator)
+                                            for underlying_iterator in underlying_iterators]
+        return identity
+
+    @staticmethod
+    def get_hash(identity: Dict[str, Any]) -> str:
+        """
+        Calculates the hex digest of an identity.
+        :params:
+            identity (Dict[str, Any]): JSON serialisable identity.
+
+        :returns:
+            key (str): Hex digest of the identity.
+        """
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_array_hash(array: np.ndarray) -> str:
+        return hashlib.sha256(array.tobytes()).hexdigest()
+
+    @staticmethod
+    def _get_config(value: Any, visited_ids: Set[int]) -> Any:
+        # converts the attributes of a post processor into a JSON serialisable representation, objects are represented by
+        # their type and attributes (instead of their repr, which might contain memory addresses)
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        elif isinstance(value, np.generic):
+            return value.item()
+        elif isinstance(value, np.ndarray) and value.dtype != object:
+            return {"dtype": str(value.dtype), "shape": list(value.shape),
+                    "data": IteratorIdentity._get_array_hash(np.ascontiguousarray(value))}
+        elif isinstance(value, torch.Tensor):
+            return IteratorIdentity._get_config(value.detach().cpu().numpy(), visited_ids)
+        elif id(value) in visited_ids:
+            return type(value).__qualname__
+        visited_ids = visited_ids | {id(value)}
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return [IteratorIdentity._get_config(element, visited_ids) for element in value]
+        elif isinstance(value, dict):
+            return {str(key): IteratorIdentity._get_config(element, visited_ids) for key, element in value.items()}
+        elif isinstance(value, (set, frozenset)):
+            # sets are ordered by the JSON representation of their elements, as the iteration order is not deterministic
+            return sorted((IteratorIdentity._get_config(element, visited_ids) for element in value),
+                          key=lambda element: json.dumps(element, sort_keys=True))
+        elif hasattr(value, "__dict__"):
+            return {"type": f"{type(value).__module__}.{type(value).__qualname__}",
+                    "attributes": IteratorIdentity._get_config(vars(value), visited_ids)}
+        return type(value).__qualname__
@@ -1,6 +1,53 @@
-from data_stack.dataset.iterator import DatasetIteratorIF
-from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf
-from typing import List
+from data_stack.dataset.iterator import DatasetIteratorIF, DatasetIteratorView, InformedDatasetIterator, InformedDatasetIteratorIF
+from data_stack.dataset.meta import DatasetMetaIF
+from ml_gym.data_handling.postprocessors.postprocessor import PostProcessorIf, BatchPostProcessorIf
+from typing import Any, List, Tuple
+
+
+class BatchedFetch:
+    """
+    Fetches a batch of samples from an iterator stack. Iterators providing a `__getitems__` method (e.g., `PostProcessedDatasetIterator`)
+    are asked for the whole batch at once. Views and informed iterators are resolved down to their wrapped iterators, all other
+    iterators are accessed sample by sample.
+    """
+
+    @staticmethod
+    def get_items(iterator: DatasetIteratorIF, indices: List[int]) -> List[Tuple[Any]]:
+        """
+        Get the samples at the given indices.
+        :params:
+            iterator (DatasetIteratorIF): Iterator to fetch the samples from.
+            indices (List[int]): Indices of the samples.
+
+        :returns:
+            samples (List[Tuple[Any]]): Samples at the given indices.
+        """
+        if hasattr(iterator, "__getitems__"):
+            return iterator.__getitems__(indices)
+        elif isinstance(iterator, DatasetIteratorView) and BatchedFetch.is_supported(iterator):
+            view_indices = iterator.indices
+            return BatchedFetch.get_items(iterator.underlying_iterators[0], [view_indices[i] for i in indices])
+        elif isinstance(iterator, InformedDatasetIterator) and BatchedFetch.is_supported(iterator):
+            return BatchedFetch.get_items(iterator._dataset_iterator, indices)
+        return [iterator[i] for i in indices]
+
+    @staticmethod
+    def is_supported(iterator: DatasetIteratorIF) -> bool:
+        """
+        Checks whether the iterator stack contains an iterator that supports batched fetching.
+        :params:
+            iterator (DatasetIteratorIF): Iterator to be checked.
+
+        :returns:
+            bool: True, if batched fetching is supported.
+        """
+        if hasattr(iterator, "__getitems__"):
+            return True
+        elif isinstance(iterator, DatasetIteratorView):
+            return BatchedFetch.is_supported(iterator.underlying_iterators[0])
+        elif isinstance(iterator, InformedDatasetIterator):
+            return BatchedFetch.is_supported(iterator._dataset_iterator)
+        return False
 
 
 class PostProcessedDatasetIterator(DatasetIteratorIF):
@@ -15,6 +62,39 @@ class PostProcessedDatasetIterator(DatasetIteratorIF):
     def __getitem__(self, index: int):
         return self._post_processor.postprocess(self._dataset_iterator[index])
 
+    def __getitems__(self, indices: List[int]) -> List[Tuple[Any]]:
+        samples = BatchedFetch.get_items(self._dataset_iterator, indices)
+        if isinstance(self._post_processor, BatchPostProcessorIf):
+            return self._post_processor.postprocess_batch(samples)
+        return [self._post_processor.postprocess(sample) for sample in samples]
+
     @property
     def underlying_iterators(self) -> List[DatasetIteratorIF]:
         return [self._dataset_iterator]
+
+
+class BatchedFetchDatasetIterator(InformedDatasetIteratorIF):
+    """
+    Thin wrapper around an informed iterator, exposing `__getitems__` to the torch `DataLoader`,
+    such that a whole index batch is fetched and post processed at once.
+    """
+
+    def __init__(self, dataset_iterator: InformedDatasetIteratorIF):
+        self._dataset_iterator = dataset_iterator
+
+    def __len__(self):
+        return len(self._dataset_iterator)
+
+    def __getitem__(self, index: int):
+        return self._dataset_iterator[index]
+
+    def __getitems__(self, indices: List[int]) -> List[Tuple[Any]]:
+        return BatchedFetch.get_items(self._dataset_iterator, indices)
+
+    @property
+    def underlying_iterators(self) -> List[DatasetIteratorIF]:
+        return [self._dataset_iterator]
+
+    @property
+    def dataset_meta(self) -> DatasetMetaIF:
+        return self._dataset_iterator.dataset_meta
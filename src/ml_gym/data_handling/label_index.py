@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from weakref import WeakKeyDictionary
+from data_stack.dataset.iterator import DatasetIteratorIF, DatasetIterator, DatasetIteratorView, InformedDatasetIterator
+from ml_gym.data_handling.iterator_identity import IteratorIdentity
+import os
+import tempfile
+import numpy as np
+import torch
+
+
+class LabelProviderIF(ABC):
+    """
+    Interface for iterators that can provide the label column at a given sample position
+    without materialising (and post-processing) every single sample.
+    """
+
+    @abstractmethod
+    def get_labels(self, label_pos: int) -> np.ndarray:
+        raise NotImplementedError
+
+
+class LabelColumnIterator(DatasetIterator, LabelProviderIF):
+    """
+    Lightweight iterator exposing only the label column of another iterator. The label is placed at `label_pos`
+    of each returned sample, so that label-based consumers (e.g., splitters) can run on it without touching the
+    original samples.
+    """
+
+    def __init__(self, labels: np.ndarray, label_pos: int):
+        self._labels = labels
+        self._label_pos = label_pos
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __getitem__(self, index: int):
+        return (None, ) * self._label_pos + (self._labels[index], )
+
+    @property
+    def underlying_iterators(self) -> List[DatasetIteratorIF]:
+        return []
+
+    def get_labels(self, label_pos: int) -> np.ndarray:
+        return self._labels
+
+
+class LabelIndex:
+    """
+    LabelIndex resolves the labels of an iterator as a NumPy array. Iterators implementing `LabelProviderIF` are asked
+    directly, for all other iterators the labels are read in a single pass and cached for the lifetime of the iterator.
+
+    If a `cache_path` is given, the label columns of informed iterators are additionally persisted as `.npy` files,
+    keyed by the identity of the iterator chain (see `IteratorIdentity`), which covers the dataset meta and the label
+    mapping configs of the upstream iterators, and the label position. Repeated runs on the same dataset then read the
+    labels from disk instead of scanning the iterator. Note, that the key does not cover the sample contents, i.e., the
+    cache directory has to be cleared when the underlying data changes.
+    """
+    _cache: "WeakKeyDictionary[DatasetIteratorIF, Dict[int, np.ndarray]]" = WeakKeyDictionary()
+
+    @staticmethod
+    def get_labels(iterator: DatasetIteratorIF, label_pos: int, cache_path: str = None) -> np.ndarray:
+        """
+        Get the labels of the iterator.
+        :params:
+                iterator (DatasetIteratorIF): Iterator whose labels are to be returned.
+                label_pos (int): Position of the label within a sample.
+                cache_path (str): Optional directory used for persisting the label index across runs.
+
+        :returns:
+            labels (np.ndarray): Array of length len(iterator) containing the label of each sample.
+        """
+        provided_labels = LabelIndex._get_provided_labels(iterator, label_pos)
+        if provided_labels is not None:
+            return provided_labels
+        iterator_cache = LabelIndex._cache.setdefault(iterator, {})
+        if label_pos not in iterator_cache:
+            iterator_cache[label_pos] = LabelIndex._get_persisted_labels(iterator, label_pos, cache_path)
+        return iterator_cache[label_pos]
+
+    @staticmethod
+    def _get_provided_labels(iterator: DatasetIteratorIF, label_pos: int) -> Optional[np.ndarray]:
+        # resolves label providers wrapped by informed iterators and views
+        if isinstance(iterator, LabelProviderIF):
+            return np.asarray(iterator.get_labels(label_pos))
+        elif isinstance(iterator, InformedDatasetIterator):
+            return LabelIndex._get_provided_labels(iterator._dataset_iterator, label_pos)
+        elif isinstance(iterator, DatasetIteratorView):
+            labels = LabelIndex._get_provided_labels(iterator.underlying_iterators[0], label_pos)
+            return labels[np.asarray(iterator.indices, dtype=np.int64)] if labels is not None else None
+        return None
+
+    @staticmethod
+    def get_label_iterator(iterator: DatasetIteratorIF, label_pos: int, cache_path: str = None) -> LabelColumnIterator:
+        """
+        Get an iterator that only contains the labels of the given iterator at position `label_pos`.
+        :params:
+                iterator (DatasetIteratorIF): Iterator whose labels are to be returned.
+                label_pos (int): Position of the label within a sample.
+                cache_path (str): Optional directory used for persisting the label index across runs.
+
+        :returns:
+            LabelColumnIterator: Iterator over the label column.
+        """
+        return LabelColumnIterator(LabelIndex.get_labels(iterator, label_pos, cache_path), label_pos)
+
+    @staticmethod
+    def build_labels(iterator: DatasetIteratorIF, label_pos: int) -> np.ndarray:
+        """
+        Reads the labels of the iterator in a single pass.
+        :params:
+                iterator (DatasetIteratorIF): Iterator whose labels are to be read.
+                label_pos (int): Position of the label within a sample.
+
+        :returns:
+            labels (np.ndarray): Array of length len(iterator) containing the label of each sample.
+        """
+        labels = [iterator[i][label_pos] for i in range(len(iterator))]
+        return np.array([label.item() if isinstance(label, (torch.Tensor, np.ndarray)) else label for label in labels])
+
+    @staticmethod
+    def get_index_key(iterator: DatasetIteratorIF, label_pos: int) -> Optional[str]:
+        """
+        Calculates the key of the persisted label index from the identity of the iterator chain and the label position.
+        :params:
+                iterator (DatasetIteratorIF): Iterator whose label index key is to be calculated.
+                label_pos (int): Position of the label within a sample.
+
+        :returns:
+            key (str): Hex digest identifying the label index or None, if the iterator does not provide any dataset meta.
+        """
+        dataset_meta = getattr(iterator, "dataset_meta", None)
+        if dataset_meta is None:
+            return None
+        return IteratorIdentity.get_hash({"iterator": IteratorIdentity.get_identity(iterator), "label_pos": label_pos})
+
+    @staticmethod
+    def _get_persisted_labels(iterator: DatasetIteratorIF, label_pos: int, cache_path: str = None) -> np.ndarray:
+        key = LabelIndex.get_index_key(iterator, label_pos) if cache_path is not None else None
+        if key is None:
+            return LabelIndex.build_labels(iterator, label_pos)
+        index_path = os.path.join(cache_path, f"labels_{key}.npy")
+        if os.path.isfile(index_path):
+            labels = np.load(index_path, allow_pickle=False)
+            if len(labels) == len(iterator):
+                return labels
+        labels = LabelIndex.build_labels(iterator, label_pos)
+        if labels.dtype != object:
+            LabelIndex._save(labels, cache_path, index_path)
+        return labels
+
+    @staticmethod
+    def _save(labels: np.ndarray, cache_path: str, index_path: str):
+        # write to a temporary file first, as multiple processes might build the same index concurrently
+        os.makedirs(cache_path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path, suffix=".npy")
+        with os.fdopen(fd, "wb") as fp:
+            np.save(fp, labels, allow_pickle=False)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def clear_cache():
+        LabelIndex._cache.clear()
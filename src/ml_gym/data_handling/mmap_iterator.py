@@ -0,0 +1,209 @@
+from typing import Any, Dict, List, Tuple
+from data_stack.dataset.iterator import DatasetIteratorIF, DatasetIterator
+from ml_gym.data_handling.label_index import LabelProviderIF
+from ml_gym.error_handling.exception import DataIntegrityError
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import torch
+import tqdm
+
+
+class MMapColumnWriter:
+    """
+    Writes one sample position (column) of an iterator into a flat binary file. The values of all samples are appended
+    as C-contiguous arrays, while the shape of each value is tracked. If all values share the same shape, the file can be mapped
+    as a single array of shape [num_samples, *sample_shape]. Otherwise, the values are ragged along their first dimension
+    and are located via an offsets array.
+    """
+    KIND_TORCH = "torch"
+    KIND_NUMPY = "numpy"
+    KIND_PYTHON = "python"
+    KIND_STRING = "str"
+    KIND_NONE = "none"
+
+    def __init__(self, directory: str, position: int):
+        self.position = position
+        self.data_path = os.path.join(directory, f"column_{position}.bin")
+        self.offsets_path = os.path.join(directory, f"column_{position}_offsets.npy")
+        self._fp = open(self.data_path, "wb")
+        self.kind: str = None
+        self.dtype: np.dtype = None
+        self.sample_shape: Tuple[int] = None
+        self.trailing_shape: Tuple[int] = None
+        self.is_ragged = False
+        self._row_counts: List[int] = []
+
+    def _to_array(self, value: Any) -> Tuple[str, np.ndarray]:
+        if isinstance(value, torch.Tensor):
+            return MMapColumnWriter.KIND_TORCH, value.detach().cpu().numpy()
+        elif isinstance(value, np.ndarray):
+            return MMapColumnWriter.KIND_NUMPY, value
+        elif isinstance(value, str):
+            return MMapColumnWriter.KIND_STRING, np.frombuffer(value.encode("utf-8"), dtype=np.uint8)
+        elif value is None:
+            return MMapColumnWriter.KIND_NONE, None
+        elif isinstance(value, (bool, int, float, np.generic)):
+            return MMapColumnWriter.KIND_PYTHON, np.asarray(value)
+        raise DataIntegrityError(f"Values of type {type(value)} at sample position {self.position} cannot be memory mapped.")
+
+    def append(self, value: Any):
+        kind, array = self._to_array(value)
+        if self.kind is None:
+            self.kind = kind
+            self.dtype = array.dtype if array is not None else None
+            self.sample_shape = array.shape if array is not None else None
+            self.trailing_shape = array.shape[1:] if array is not None and array.ndim > 0 else ()
+        elif kind != self.kind or (array is not None and array.dtype != self.dtype):
+            raise DataIntegrityError(f"Sample position {self.position} contains mixed types ({self.kind}, {self.dtype}) and "
+                                     f"({kind}, {array.dtype if array is not None else None}).")
+        if array is None:
+            return
+        if array.shape != self.sample_shape:
+            if array.ndim == 0 or len(self.sample_shape) == 0 or array.shape[1:] != self.trailing_shape:
+                raise DataIntegrityError(f"Values at sample position {self.position} can only be ragged along their first dimension.")
+            self.is_ragged = True
+        self._row_counts.append(array.shape[0] if array.ndim > 0 else 1)
+        self._fp.write(np.ascontiguousarray(array).tobytes())
+
+    def close(self) -> Dict[str, Any]:
+        self._fp.close()
+        if self.kind == MMapColumnWriter.KIND_STRING:
+            self.is_ragged = True
+        if self.is_ragged:
+            offsets = np.zeros(len(self._row_counts) + 1, dtype=np.int64)
+            np.cumsum(self._row_counts, out=offsets[1:])
+            np.save(self.offsets_path, offsets)
+        return {"kind": self.kind,
+                "dtype": self.dtype.str if self.dtype is not None else None,
+                "sample_shape": list(self.sample_shape) if self.sample_shape is not None else None,
+                "trailing_shape": list(self.trailing_shape) if self.trailing_shape is not None else None,
+                "is_ragged": self.is_ragged,
+                "num_rows": int(sum(self._row_counts))}
+
+
+class MMapDatasetIterator(DatasetIterator, LabelProviderIF):
+    """
+    Map-style iterator on a memory-mapped columnar dataset file written by `MMapDatasetIterator.write`.
+    The columns are opened copy-on-write, such that all processes reading the same dataset share its pages via the page cache
+    and samples are returned as zero-copy views.
+    """
+    META_FILE_NAME = "meta.json"
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        with open(os.path.join(directory, MMapDatasetIterator.META_FILE_NAME), "r") as fp:
+            meta = json.load(fp)
+        self._length: int = meta["length"]
+        self._columns: List[Dict[str, Any]] = meta["columns"]
+        self._data: List[np.ndarray] = None
+        self._offsets: List[np.ndarray] = None
+
+    def _open(self):
+        self._data, self._offsets = [], []
+        for position, column in enumerate(self._columns):
+            data, offsets = None, None
+            if column["kind"] != MMapColumnWriter.KIND_NONE:
+                shape = (column["num_rows"], *column["trailing_shape"]) if column["is_ragged"] \
+                    else (self._length, *column["sample_shape"])
+                data_path = os.path.join(self._directory, f"column_{position}.bin")
+                if np.prod(shape) > 0:
+                    data = np.memmap(data_path, dtype=np.dtype(column["dtype"]), mode="c", shape=shape)
+                else:
+                    data = np.zeros(shape, dtype=np.dtype(column["dtype"]))
+            if column["is_ragged"]:
+                offsets = np.load(os.path.join(self._directory, f"column_{position}_offsets.npy"), mmap_mode="r")
+            self._data.append(data)
+            self._offsets.append(offsets)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index: int):
+        if index >= self._length or index < -self._length:
+            raise IndexError(f"Index {index} out of bounds for dataset of length {self._length}.")
+        if self._data is None:
+            self._open()
+        return tuple([self._get_value(position, index) for position in range(len(self._columns))])
+
+    def _get_value(self, position: int, index: int) -> Any:
+        column = self._columns[position]
+        kind = column["kind"]
+        if kind == MMapColumnWriter.KIND_NONE:
+            return None
+        data = self._data[position]
+        if column["is_ragged"]:
+            offsets = self._offsets[position]
+            value = data[offsets[index]:offsets[index + 1]]
+        else:
+            value = data[index]
+        if kind == MMapColumnWriter.KIND_TORCH:
+            return torch.from_numpy(np.asarray(value))
+        elif kind == MMapColumnWriter.KIND_NUMPY:
+            return np.asarray(value)
+        elif kind == MMapColumnWriter.KIND_STRING:
+            return value.tobytes().decode("utf-8")
+        return value.item()
+
+    def get_labels(self, label_pos: int) -> np.ndarray:
+        column = self._columns[label_pos]
+        if column["is_ragged"] or column["kind"] == MMapColumnWriter.KIND_NONE or len(column["sample_shape"]) > 0:
+            return np.array([self._get_value(label_pos, i) for i in range(self._length)])
+        if self._data is None:
+            self._open()
+        return np.asarray(self._data[label_pos])
+
+    @property
+    def underlying_iterators(self) -> List[DatasetIteratorIF]:
+        return []
+
+    def __getstate__(self):
+        # the memory maps are reopened lazily, instead of being pickled (e.g., when spawning data loader workers)
+        state = self.__dict__.copy()
+        state["_data"] = None
+        state["_offsets"] = None
+        return state
+
+    @staticmethod
+    def is_written(directory: str) -> bool:
+        return os.path.isfile(os.path.join(directory, MMapDatasetIterator.META_FILE_NAME))
+
+    @staticmethod
+    def write(iterator: DatasetIteratorIF, directory: str):
+        """
+        Serialises the fully materialised iterator into a memory-mappable columnar directory.
+        The dataset is written to a temporary directory first and moved into place afterwards, such that concurrent
+        writers (e.g., multiple gym processes) never observe partially written datasets.
+        :params:
+            iterator (DatasetIteratorIF): Iterator to be serialised.
+            directory (str): Target directory.
+        """
+        parent_directory = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent_directory, exist_ok=True)
+        tmp_directory = tempfile.mkdtemp(dir=parent_directory)
+        try:
+            writers: List[MMapColumnWriter] = None
+            length = len(iterator)
+            for i in tqdm.tqdm(range(length), desc="Writing memory mapped dataset"):
+                sample = iterator[i]
+                if writers is None:
+                    writers = [MMapColumnWriter(tmp_directory, position) for position in range(len(sample))]
+                if len(sample) != len(writers):
+                    raise DataIntegrityError(f"Sample {i} has {len(sample)} positions instead of {len(writers)}.")
+                for writer, value in zip(writers, sample):
+                    writer.append(value)
+            columns = [writer.close() for writer in writers] if writers is not None else []
+            with open(os.path.join(tmp_directory, MMapDatasetIterator.META_FILE_NAME), "w") as fp:
+                json.dump({"length": length, "columns": columns}, fp)
+            try:
+                os.rename(tmp_directory, directory)
+            except OSError:
+                # another process has written the dataset in the meantime
+                if not MMapDatasetIterator.is_written(directory):
+                    raise
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            raise
@@ -0,0 +1,83 @@
+from typing import Dict, Optional
+from data_stack.dataset.iterator import DatasetIteratorIF
+from ml_gym.data_handling.iterator_identity import IteratorIdentity
+from ml_gym.data_handling.postprocessors.feature_encoder import Encoder
+from ml_gym.data_handling.postprocessors.postprocessor import FeatureEncoderPostProcessor
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+
+class EncoderCache:
+    """
+    Persists the fitted encoders of a `FeatureEncoderPostProcessor` within a directory, such that the jobs of a grid search
+    (or a warm start) sharing the same train splits and feature encoding configs fit the encoders only once.
+
+    The encoders are content-addressed, i.e., keyed by the sample position, the feature encoding configs (including the
+    encoder classes) and the identity of each train split (see `IteratorIdentity`), such that, e.g., the folds of a cross
+    validation are told apart. Note, that the key does not cover the sample contents, i.e., the cache directory has to be
+    cleared when the underlying data changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def fit(self, post_processor: FeatureEncoderPostProcessor, iterators: Dict[str, DatasetIteratorIF]):
+        """
+        Loads the encoders of the post processor from the cache or, if not cached yet, fits and persists them.
+        :params:
+            post_processor (FeatureEncoderPostProcessor): Post processor whose encoders are to be fitted.
+            iterators (Dict[str, DatasetIteratorIF]): Dictionary mapping from split name to iterator.
+        """
+        key = EncoderCache.get_cache_key(post_processor, iterators)
+        encoders = self.load(key)
+        if encoders is not None:
+            post_processor.set_encoders(encoders, iterators)
+        else:
+            post_processor.fit(iterators)
+            self.save(key, post_processor.encoders)
+
+    def get_encoders_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"encoders_{key}.pkl")
+
+    def load(self, key: str) -> Optional[Dict[int, Encoder]]:
+        encoders_path = self.get_encoders_path(key)
+        if not os.path.isfile(encoders_path):
+            return None
+        with open(encoders_path, "rb") as fp:
+            return pickle.load(fp)
+
+    def save(self, key: str, encoders: Dict[int, Encoder]):
+        # write to a temporary file first, as the jobs of a grid search might fit the same encoders concurrently
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".pkl")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(encoders, fp)
+            os.replace(tmp_path, self.get_encoders_path(key))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def get_cache_key(post_processor: FeatureEncoderPostProcessor, iterators: Dict[str, DatasetIteratorIF]) -> str:
+        """
+        Calculates the key of the encoders from the feature encoding configs and the identity of the train splits.
+        :params:
+            post_processor (FeatureEncoderPostProcessor): Post processor whose encoders are to be cached.
+            iterators (Dict[str, DatasetIteratorIF]): Dictionary mapping from split name to iterator.
+
+        :returns:
+            key (str): Hex digest identifying the fitted encoders.
+        """
+        configs = []
+        for config in post_processor.feature_encoding_configs:
+            encoder_class = post_processor.feature_encoder_mapping[config["feature_type"]]
+            configs.append({**config, "encoder_class": f"{encoder_class.__module__}.{encoder_class.__qualname__}"})
+        train_splits = sorted({config["train_split"] for config in post_processor.feature_encoding_configs})
+        identity = {"sample_position": post_processor.sample_position,
+                    "feature_encoding_configs": configs,
+                    "train_splits": {split_name: IteratorIdentity.get_identity(iterators[split_name]) for split_name in train_splits}}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
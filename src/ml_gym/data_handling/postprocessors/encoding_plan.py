@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Tuple
+from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, ContinuousEncoder, Encoder
+import numpy as np
+
+
+class FeatureEncodingPlan:
+    """
+    Precompiled encoding plan of a fitted `FeatureEncoderPostProcessor`.
+    The plan assigns each input column a fixed slice within the encoded output vector and
+    bundles the encoder parameters, such that a whole batch of samples is encoded with a handful
+    of NumPy operations instead of one `transform` call per value.
+
+    Columns without an encoder are passed through, i.e., they keep their position relative to the encoded columns.
+    Encoders other than `CategoricalEncoder` and `ContinuousEncoder` fall back to their `transform` method.
+    """
+    class CategoricalColumn:
+        def __init__(self, column: int, offset: int, encoder: CategoricalEncoder):
+            self.column = column
+            self.offset = offset
+            self.encoder = encoder
+
+        def get_codes(self, values: np.ndarray) -> np.ndarray:
+            try:
+                return self.encoder.get_codes(values)
+            except KeyError as e:
+                raise KeyError(f"Column {self.column}: {e.args[0]}") from e
+
+    def __init__(self, encoders: Dict[int, Encoder], num_columns: int):
+        self.num_columns = num_columns
+        self.categorical_columns: List[FeatureEncodingPlan.CategoricalColumn] = []
+        self.generic_columns: List[Tuple[int, int, int, Encoder]] = []  # (column, offset, width, encoder)
+        continuous_columns, continuous_offsets, means, scales = [], [], [], []
+        passthrough_columns, passthrough_offsets = [], []
+        offset = 0
+        for column in range(num_columns):
+            encoder = encoders.get(column, None)
+            if encoder is None:
+                passthrough_columns.append(column)
+                passthrough_offsets.append(offset)
+                width = 1
+            elif isinstance(encoder, CategoricalEncoder):
+                self.categorical_columns.append(FeatureEncodingPlan.CategoricalColumn(column, offset, encoder))
+                width = encoder.get_output_size()
+            elif isinstance(encoder, ContinuousEncoder):
+                continuous_columns.append(column)
+                continuous_offsets.append(offset)
+                means.append(encoder.mean)
+                scales.append(encoder.scale)
+                width = 1
+            else:
+                width = encoder.get_output_size()
+                self.generic_columns.append((column, offset, width, encoder))
+            offset += width
+        self.output_size = offset
+        self.passthrough_columns = np.array(passthrough_columns, dtype=np.int64)
+        self.passthrough_offsets = np.array(passthrough_offsets, dtype=np.int64)
+        self.continuous_columns = np.array(continuous_columns, dtype=np.int64)
+        self.continuous_offsets = np.array(continuous_offsets, dtype=np.int64)
+        self.means = np.array(means, dtype=np.float64)
+        self.scales = np.array(scales, dtype=np.float64)
+
+    def encode_batch(self, inputs: Any) -> np.ndarray:
+        """
+        Encodes a batch of sample inputs.
+        :params:
+            inputs (Any): Array-like of shape [batch_size, num_columns].
+        :returns:
+            encoded (np.ndarray): Encoded float64 array of shape [batch_size, output_size].
+        """
+        inputs = np.asarray(inputs)
+        batch_size = len(inputs)
+        encoded = np.zeros((batch_size, self.output_size), dtype=np.float64)
+        if len(self.passthrough_columns) > 0:
+            encoded[:, self.passthrough_offsets] = inputs[:, self.passthrough_columns]
+        if len(self.continuous_columns) > 0:
+            encoded[:, self.continuous_offsets] = (inputs[:, self.continuous_columns].astype(np.float64) - self.means) / self.scales
+        rows = np.arange(batch_size)
+        for categorical_column in self.categorical_columns:
+            codes = categorical_column.get_codes(inputs[:, categorical_column.column])
+            if categorical_column.encoder.one_hot:
+                encoded[rows, categorical_column.offset + codes] = 1
+            else:
+                encoded[:, categorical_column.offset] = codes
+        for column, offset, width, encoder in self.generic_columns:
+            encoded[:, offset:offset + width] = np.asarray(encoder.transform(inputs[:, column])).reshape(batch_size, width)
+        return encoded
+
+    def encode(self, sample_input: Any) -> np.ndarray:
+        """
+        Encodes a single sample input.
+        :params:
+            sample_input (Any): Array-like of shape [num_columns].
+        :returns:
+            encoded (np.ndarray): Encoded float64 array of shape [output_size].
+        """
+        return self.encode_batch(np.asarray(sample_input)[np.newaxis])[0]
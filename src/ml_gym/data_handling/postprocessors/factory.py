@@ -1,11 +1,19 @@
 from typing import Any, Dict, List, Callable
 from data_stack.dataset.iterator import DatasetIteratorIF, CombinedDatasetIterator
 from ml_gym.data_handling.postprocessors.postprocessor import LabelMapperPostProcessor, FeatureEncoderPostProcessor, OneHotEncodedTargetPostProcessor
+from ml_gym.data_handling.postprocessors.encoder_cache import EncoderCache
 from ml_gym.data_handling.iterators import PostProcessedDatasetIterator
+from ml_gym.data_handling.iterator_identity import IteratorIdentity
 from data_stack.dataset.meta import MetaFactory
 from data_stack.dataset.factory import InformedDatasetFactory
 from data_stack.dataset.iterator import InformedDatasetIteratorIF
 from data_stack.dataset.splitter import SplitterFactory
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.data_handling.mmap_iterator import MMapDatasetIterator
+from ml_gym.data_handling.streaming import StreamingDatasetIterator
+from ml_gym.error_handling.exception import DataIntegrityError
+import numpy as np
+import os
 
 
 class ModelGymInformedIteratorFactory(InformedDatasetFactory):
@@ -33,18 +41,20 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
 
     @staticmethod
     def get_filtered_labels_iterator(identifier: str, iterator: InformedDatasetIteratorIF,
-                                     filtered_labels: List[Any]) -> InformedDatasetIteratorIF:
+                                     filtered_labels: List[Any], label_index_path: str = None) -> InformedDatasetIteratorIF:
         """
         Get the iterator that can iterate through filtered labels in the dataset.
         :params:
                 identifier (str): Tag used as an identifier for the dataset.
                 iterator (InformedDatasetIteratorIF): Dataset Iterator Interface object.
                 filtered_labels (List[Any]): List of filtered labels in the dataset.
+                label_index_path (str): Optional directory for persisting the label index (see `LabelIndex`).
 
         :return:
             InformedDatasetIteratorIF: Initialized Interface containing dataset iterators.
         """
-        valid_indices = [i for i in range(len(iterator)) if iterator[i][iterator.dataset_meta.target_pos] in filtered_labels]
+        labels = LabelIndex.get_labels(iterator, iterator.dataset_meta.target_pos, label_index_path)
+        valid_indices = np.flatnonzero(np.isin(labels, filtered_labels)).tolist()
         meta = MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta, identifier=identifier)
         return InformedDatasetFactory.get_dataset_iterator_view(iterator, meta, valid_indices)
 
@@ -69,21 +79,29 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
 
     @staticmethod
     def get_feature_encoded_iterators(identifier: str, iterators: Dict[str, InformedDatasetIteratorIF],
-                                      feature_encoding_configs: Dict[str, List[Any]]) -> Dict[str, DatasetIteratorIF]:
+                                      feature_encoding_configs: Dict[str, List[Any]], encoder_cache_path: str = None,
+                                      chunk_size: int = 4096, num_workers: int = 0) -> Dict[str, DatasetIteratorIF]:
         """
         Get the iterator which can iterate through encoded fetures of a dataset.
         :params:
                 identifier (str): Tag used as an identifier for the dataset.
                 iterators (Dict[str, InformedDatasetIteratorIF]): Dictionary mapping from iterator_name -> split_name -> iterator
                 feature_encoding_configs (Dict[str, List[Any]]): Dictionary containing feature encoding configs.
+                encoder_cache_path (str): Optional directory for persisting the fitted encoders (see `EncoderCache`).
+                chunk_size (int): Number of samples read at once when fitting the encoders.
+                num_workers (int): Number of processes fitting the encoders (0 for fitting within the main process).
 
         :return:
              Dict[str, DatasetIteratorIF]: Dictionary containing name of iterator and intialzied DatasetIteratorIF object.
         """
         sample_position = list(iterators.items())[0][1].dataset_meta.sample_pos
         feature_encoder_post_processor = FeatureEncoderPostProcessor(
-            sample_position=sample_position, feature_encoding_configs=feature_encoding_configs)
-        feature_encoder_post_processor.fit(iterators)
+            sample_position=sample_position, feature_encoding_configs=feature_encoding_configs, chunk_size=chunk_size,
+            num_workers=num_workers)
+        if encoder_cache_path is not None:
+            EncoderCache(encoder_cache_path).fit(feature_encoder_post_processor, iterators)
+        else:
+            feature_encoder_post_processor.fit(iterators)
         return {name: InformedDatasetFactory.get_dataset_iterator(PostProcessedDatasetIterator(iterator, feature_encoder_post_processor),
                                                                   MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta,
                                                                                                              identifier=identifier))
@@ -188,6 +206,59 @@ class ModelGymInformedIteratorFactory(InformedDatasetFactory):
         meta = MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta, identifier=identifier)
         return InformedDatasetFactory.get_in_memory_dataset_iterator(iterator, meta)
 
+    @staticmethod
+    def get_mmap_iterator(identifier: str, iterator: InformedDatasetIteratorIF, storage_path: str) -> InformedDatasetIteratorIF:
+        """
+        Get iterator on a memory-mapped columnar copy of the given iterator. The copy is written once to `storage_path`
+        and shared by all processes reading it. The copy is identified by the iterator's dataset meta and a hash of the
+        identity of its iterator chain (see `IteratorIdentity`), such that, e.g., differently post-processed iterators
+        get their own copies. The storage path still has to be cleared when the underlying data changes.
+
+        params:
+               identifier (str): Tag used as an identifier for the dataset.
+               iterator (InformedDatasetIteratorIF): Dataset Iterator Interface object.
+               storage_path (str): Directory the memory-mapped datasets are stored in.
+
+        :return:
+            InformedDatasetIteratorIF:  intialzied InformedDatasetIteratorIF object on the memory-mapped dataset.
+        """
+        dataset_meta = iterator.dataset_meta
+        iterator_hash = IteratorIdentity.get_hash(IteratorIdentity.get_identity(iterator))
+        directory = os.path.join(storage_path,
+                                 f"{dataset_meta.identifier}_{dataset_meta.dataset_name}_{dataset_meta.dataset_tag}_{iterator_hash}")
+        if not MMapDatasetIterator.is_written(directory):
+            MMapDatasetIterator.write(iterator, directory)
+        mmap_iterator = MMapDatasetIterator(directory)
+        if len(mmap_iterator) != len(iterator):
+            raise DataIntegrityError(f"Memory-mapped dataset at {directory} has length {len(mmap_iterator)} instead of {len(iterator)}.")
+        meta = MetaFactory.get_dataset_meta_from_existing(dataset_meta, identifier=identifier)
+        return InformedDatasetFactory.get_dataset_iterator(mmap_iterator, meta)
+
+    @staticmethod
+    def get_streaming_iterator(identifier: str, iterator: InformedDatasetIteratorIF, chunk_size: int = 1024,
+                               shuffle_buffer_size: int = 0, class_weighted_sampling: bool = False, label_pos: int = None,
+                               seed: int = 0) -> StreamingDatasetIterator:
+        """
+        Get a stream over the given iterator. The samples are read sequentially in chunks and shuffled (or class-weighted
+        resampled) within a bounded buffer only, instead of accessing the dataset randomly.
+
+        params:
+               identifier (str): Tag used as an identifier for the dataset.
+               iterator (InformedDatasetIteratorIF): Dataset Iterator Interface object.
+               chunk_size (int): Number of samples read at once.
+               shuffle_buffer_size (int): Number of samples shuffled together. No shuffling, if 0.
+               class_weighted_sampling (bool): Whether each buffer is resampled with class-balanced weights.
+               label_pos (int): Position of the label within a sample. Defaults to the target position of the dataset.
+               seed (int): Random seed.
+
+        :return:
+            StreamingDatasetIterator: Stream over the iterator.
+        """
+        meta = MetaFactory.get_dataset_meta_from_existing(iterator.dataset_meta, identifier=identifier)
+        return StreamingDatasetIterator(shards=[iterator], dataset_meta=meta, chunk_size=chunk_size,
+                                        shuffle_buffer_size=shuffle_buffer_size, class_weighted_sampling=class_weighted_sampling,
+                                        label_pos=label_pos, seed=seed)
+
     @staticmethod
     def get_shuffled_iterator(identifier: str, iterator: InformedDatasetIteratorIF, seed: int) -> InformedDatasetIteratorIF:
         """
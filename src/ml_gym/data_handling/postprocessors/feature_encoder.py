@@ -1,7 +1,6 @@
 from abc import ABC, abstractmethod
 import numpy as np
-from typing import Dict
-from sklearn.preprocessing import StandardScaler
+from typing import Any, Dict, List
 
 
 class Encoder(ABC):
@@ -17,48 +16,280 @@ class Encoder(ABC):
     def get_output_size(self) -> int:
         raise NotImplementedError
 
+    @classmethod
+    def fit_columns(cls, values: np.ndarray) -> List["Encoder"]:
+        """
+        Fits one encoder per column of a 2-D array.
+
+        :params:
+            values (np.ndarray): Array of shape [num_samples, num_columns].
+        :returns:
+            encoders (List[Encoder]): Fitted encoder for each column.
+        """
+        encoders = [cls() for _ in range(values.shape[1])]
+        for column, encoder in enumerate(encoders):
+            encoder.fit(values=values[:, column])
+        return encoders
+
+    # The following methods allow to fit the encoders of many columns in a single, chunked pass over a dataset:
+    # the sufficient statistics of each chunk are computed (possibly in another process), merged and finally turned
+    # into fitted encoders. By default, the statistics are the values themselves, i.e., encoders that do not override
+    # these methods still require all values of their columns to be held in memory.
+
+    @classmethod
+    def get_column_statistics(cls, values: np.ndarray) -> Any:
+        """
+        Computes the sufficient statistics for fitting the encoders of a chunk of columns.
+
+        :params:
+            values (np.ndarray): Chunk of shape [num_samples, num_columns].
+        :returns:
+            statistics (Any): Picklable statistics of the chunk.
+        """
+        return values
+
+    @classmethod
+    def merge_column_statistics(cls, statistics: Any, other_statistics: Any) -> Any:
+        """
+        Merges the statistics of two chunks.
+
+        :params:
+            statistics (Any): Statistics of the first chunk.
+            other_statistics (Any): Statistics of the second chunk.
+        :returns:
+            statistics (Any): Merged statistics.
+        """
+        return np.concatenate([statistics, other_statistics])
+
+    @classmethod
+    def from_column_statistics(cls, statistics: Any) -> List["Encoder"]:
+        """
+        Creates the fitted encoders from the merged statistics.
+
+        :params:
+            statistics (Any): Statistics of all chunks.
+        :returns:
+            encoders (List[Encoder]): Fitted encoder for each column.
+        """
+        return cls.fit_columns(statistics)
+
 
 class CategoricalEncoder(Encoder):
-    def __init__(self):
+    """
+    Encodes categorical values either as one-hot vectors or as integer codes, i.e., the position of the value within the
+    sorted unique values seen during fit. Numeric values are resolved via a binary search on the sorted values (or a dense
+    lookup table for small non-negative integers), all other values via their string representation.
+    """
+    # non-negative integer categories up to this value are resolved via a dense lookup table
+    MAX_DENSE_LOOKUP_SIZE = 2**16
+
+    def __init__(self, one_hot: bool = True):
         super().__init__()
-        self.all_values: set = None
+        self.one_hot = one_hot
+        self.all_values: np.ndarray = None
         self.value_to_ix: Dict[str, int] = None
         self.ix_to_value: Dict[int, str] = None
+        self._dense_lookup: np.ndarray = None
 
     def fit(self, values: np.ndarray):
-        self.all_values = np.unique(values.flatten())
+        self.all_values = np.unique(np.asarray(values).flatten())
         self.value_to_ix = {str(value): ix for ix, value in enumerate(self.all_values)}
         self.ix_to_value = {ix: str(value) for ix, value in enumerate(self.all_values)}
+        self._dense_lookup = None
+        if self.all_values.dtype.kind in "iub" and len(self.all_values) > 0 and self.all_values.min() >= 0 \
+                and self.all_values.max() < CategoricalEncoder.MAX_DENSE_LOOKUP_SIZE:
+            self._dense_lookup = np.full(int(self.all_values.max()) + 1, -1, dtype=np.int64)
+            self._dense_lookup[self.all_values] = np.arange(len(self.all_values))
 
-    def transform(self, values: np.ndarray) -> np.ndarray:
-        def to_one_hot(value):
-            encoded = np.zeros(len(self.all_values))
-            encoded[self.value_to_ix[str(value)]] = 1
-            return encoded
+    @classmethod
+    def get_column_statistics(cls, values: np.ndarray) -> List[np.ndarray]:
+        return [np.unique(values[:, column]) for column in range(values.shape[1])]
+
+    @classmethod
+    def merge_column_statistics(cls, statistics: List[np.ndarray], other_statistics: List[np.ndarray]) -> List[np.ndarray]:
+        return [np.union1d(unique_values, other_unique_values) for unique_values, other_unique_values in zip(statistics, other_statistics)]
+
+    @classmethod
+    def from_column_statistics(cls, statistics: List[np.ndarray]) -> List["CategoricalEncoder"]:
+        encoders = [cls() for _ in statistics]
+        for encoder, unique_values in zip(encoders, statistics):
+            encoder.fit(values=unique_values)
+        return encoders
+
+    def get_codes(self, values: np.ndarray) -> np.ndarray:
+        """
+        Get the integer code of each value.
 
+        :params:
+            values (np.ndarray): Values to be encoded.
+        :returns:
+            codes (np.ndarray): int64 array of shape [num_values].
+        """
         if self.all_values is None:
             raise Exception("Please call fit() before transform()")
+        values = np.asarray(values).flatten()
+        if self._dense_lookup is not None and values.dtype.kind in "iub":
+            in_range = (values >= 0) & (values < len(self._dense_lookup))
+            codes = np.full(len(values), -1, dtype=np.int64)
+            codes[in_range] = self._dense_lookup[values[in_range]]
+        elif values.dtype.kind in "iufb" and self.all_values.dtype.kind in "iufb" and len(self.all_values) > 0:
+            codes = np.minimum(np.searchsorted(self.all_values, values), len(self.all_values) - 1)
+            codes[self.all_values[codes] != values] = -1
+            if values.dtype.kind == "f" and self.all_values.dtype.kind == "f" and np.isnan(self.all_values[-1]):
+                # NaN is not equal to itself, hence, it is mapped to its category (sorted last by np.unique) explicitly
+                codes[np.isnan(values)] = len(self.all_values) - 1
+        else:
+            codes = np.array([self.value_to_ix.get(str(value), -1) for value in values], dtype=np.int64)
+        if (codes < 0).any():
+            raise KeyError(f"Categorical value(s) {np.unique(values[codes < 0]).tolist()} were not seen during fit.")
+        return codes
 
-        transformed = np.array([to_one_hot(value) for value in values.flatten()])
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        codes = self.get_codes(values)
+        if not self.one_hot:
+            return codes[:, np.newaxis]
+        transformed = np.zeros((len(codes), len(self.all_values)))
+        transformed[np.arange(len(codes)), codes] = 1
         return transformed
 
     def get_output_size(self) -> int:
-        return len(self.all_values)
+        return len(self.all_values) if self.one_hot else 1
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # encoders persisted by previous versions only encode one-hot and have no lookup table
+        self.__dict__.update({"one_hot": True, "_dense_lookup": None, **state})
+
+
+class CategoricalCodesEncoder(CategoricalEncoder):
+    """
+    Encodes categorical values as integer codes instead of one-hot vectors.
+    """
+
+    def __init__(self):
+        super().__init__(one_hot=False)
+
+
+class StreamingMoments:
+    """
+    Running count, mean and sum of squared deviations (M2) of each column. Chunks are merged via the parallel update
+    of Chan et al., such that the moments of arbitrarily large datasets are computed in a single pass.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean: np.ndarray = None
+        self.m2: np.ndarray = None
+
+    def update(self, values: np.ndarray) -> "StreamingMoments":
+        """
+        Updates the moments by a chunk of values.
+
+        :params:
+            values (np.ndarray): Array of shape [num_samples] or [num_samples, num_columns].
+        :returns:
+            self (StreamingMoments): Updated moments.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        chunk = StreamingMoments()
+        chunk.count = len(values)
+        chunk.mean = values.mean(axis=0)
+        chunk.m2 = ((values - chunk.mean)**2).sum(axis=0)
+        return self.merge(chunk)
+
+    def merge(self, other: "StreamingMoments") -> "StreamingMoments":
+        """
+        Merges the moments of another chunk into these moments.
+
+        :params:
+            other (StreamingMoments): Moments of another chunk.
+        :returns:
+            self (StreamingMoments): Merged moments.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count
 
 
 class ContinuousEncoder(Encoder):
+    """
+    Standardises continuous values to zero mean and unit variance. Columns with (numerically) zero variance are only centered.
+    """
+
     def __init__(self):
         super().__init__()
-        self.sklearn_encoder = None
+        self.mean: float = None
+        self.scale: float = None
 
     def fit(self, values: np.ndarray):
-        self.sklearn_encoder = StandardScaler()
-        self.sklearn_encoder.fit(np.expand_dims(values, axis=1))
+        self.set_moments(StreamingMoments().update(np.asarray(values).flatten()))
+
+    def set_moments(self, moments: StreamingMoments):
+        std = np.sqrt(moments.variance)
+        self.mean = float(moments.mean)
+        # standard deviations within the round-off error of the mean are treated as zero (see sklearn's _handle_zeros_in_scale)
+        self.scale = float(std) if std >= 10 * np.finfo(np.float64).eps * max(abs(self.mean), 1.) else 1.
+
+    @classmethod
+    def fit_columns(cls, values: np.ndarray) -> List["ContinuousEncoder"]:
+        moments = StreamingMoments().update(values)
+        return cls.from_moments(moments)
+
+    @classmethod
+    def get_column_statistics(cls, values: np.ndarray) -> StreamingMoments:
+        return StreamingMoments().update(values)
+
+    @classmethod
+    def merge_column_statistics(cls, statistics: StreamingMoments, other_statistics: StreamingMoments) -> StreamingMoments:
+        return statistics.merge(other_statistics)
+
+    @classmethod
+    def from_column_statistics(cls, statistics: StreamingMoments) -> List["ContinuousEncoder"]:
+        return cls.from_moments(statistics)
+
+    @classmethod
+    def from_moments(cls, moments: StreamingMoments) -> List["ContinuousEncoder"]:
+        """
+        Creates one encoder per column of the given moments.
+
+        :params:
+            moments (StreamingMoments): Moments of shape [num_columns].
+        :returns:
+            encoders (List[ContinuousEncoder]): Fitted encoder for each column.
+        """
+        encoders = []
+        for column in range(len(moments.mean)):
+            column_moments = StreamingMoments()
+            column_moments.count, column_moments.mean, column_moments.m2 = moments.count, moments.mean[column], moments.m2[column]
+            encoder = cls()
+            encoder.set_moments(column_moments)
+            encoders.append(encoder)
+        return encoders
 
     def transform(self, values: np.ndarray) -> np.ndarray:
-        if self.sklearn_encoder is None:
+        if self.mean is None:
             raise Exception("Please call fit() before transform()")
-        return self.sklearn_encoder.transform(np.expand_dims(values, axis=1))
+        return ((np.asarray(values, dtype=np.float64) - self.mean) / self.scale).reshape(-1, 1)
 
     def get_output_size(self) -> int:
         return 1
+
+    def __setstate__(self, state: Dict[str, Any]):
+        # encoders persisted by previous versions wrap a fitted sklearn StandardScaler
+        sklearn_encoder = state.pop("sklearn_encoder", None)
+        if sklearn_encoder is not None:
+            state["mean"], state["scale"] = float(sklearn_encoder.mean_[0]), float(sklearn_encoder.scale_[0])
+        self.__dict__.update({"mean": None, "scale": None, **state})
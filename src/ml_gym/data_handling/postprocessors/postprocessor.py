@@ -1,7 +1,10 @@
-from typing import Tuple, Any, Dict, List
+from typing import Tuple, Any, Dict, List, Type
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from data_stack.dataset.iterator import DatasetIteratorIF
-from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, ContinuousEncoder, Encoder
+from ml_gym.data_handling.postprocessors.feature_encoder import CategoricalEncoder, CategoricalCodesEncoder, ContinuousEncoder, Encoder
+from ml_gym.data_handling.postprocessors.encoding_plan import FeatureEncodingPlan
+from ml_gym.error_handling.exception import DataIntegrityError
 import torch
 import numpy as np
 import tqdm
@@ -21,7 +24,18 @@ class FittablePostProcessorIf(PostProcessorIf):
         raise NotImplementedError
 
 
-class LabelMapperPostProcessor(PostProcessorIf):
+class BatchPostProcessorIf(PostProcessorIf):
+    """
+    Optional contract for post processors that can process a whole batch of samples at once.
+    `postprocess_batch` must return the same samples as applying `postprocess` to each sample individually.
+    """
+
+    @abstractmethod
+    def postprocess_batch(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        raise NotImplementedError
+
+
+class LabelMapperPostProcessor(BatchPostProcessorIf):
     """
     This class contains functions which perform Label Matching as a 
     post processing stratergy in the MlGym Job.
@@ -63,21 +77,66 @@ class LabelMapperPostProcessor(PostProcessorIf):
                 sample[self.tag_position] = mapping.new_label
         return tuple(sample)
 
+    def postprocess_batch(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        """
+        Perform the Label Matching postprocess on a batch of samples at once.
+        Numeric labels are mapped vectorized, any other labels fall back to the per sample postprocessing.
+
+        :params:
+            samples (List[Tuple[Any]]): Data samples.
+        :returns:
+            samples (List[Tuple[Any]]): Label matched samples.
+        """
+        if len(samples) == 0:
+            return samples
+        new_labels = np.array([mapping.new_label for mapping in self.mappings])
+        if new_labels.dtype.kind not in "iufb":
+            return [self.postprocess(sample) for sample in samples]
+        positions = [self.target_position, self.tag_position]
+        position_labels = [np.array([sample[position] for sample in samples]) for position in positions]
+        # the fallback has to be decided before any labels are mapped, as the mappings must not be applied twice
+        if any(labels.ndim != 1 or labels.dtype.kind not in "iufb" for labels in position_labels):
+            return [self.postprocess(sample) for sample in samples]
+        samples = [list(sample) for sample in samples]
+        for position, labels in zip(positions, position_labels):
+            # the mappings are applied in order, i.e., a mapped label can be mapped again by a subsequent mapping
+            applied_mapping_ids = np.full(len(labels), -1)
+            for mapping_id, mapping in enumerate(self.mappings):
+                mask = np.isin(labels, mapping.previous_labels)
+                labels = np.where(mask, new_labels[mapping_id], labels)
+                applied_mapping_ids[mask] = mapping_id
+            for i in np.flatnonzero(applied_mapping_ids >= 0):
+                samples[i][position] = self.mappings[applied_mapping_ids[i]].new_label
+        return [tuple(sample) for sample in samples]
+
 
-class FeatureEncoderPostProcessor(FittablePostProcessorIf):
+class FeatureEncoderPostProcessor(FittablePostProcessorIf, BatchPostProcessorIf):
     """
     Class having functions to perform Feature Encoding.
     (It transforms the categorical values of the relevant features into numerical ones.)
+
+    Unless `sequential` is set, the encoders are fitted in a single pass over each train split. The split is read in chunks
+    of `chunk_size` samples, and the sufficient statistics of every configured encoder (see `Encoder.get_column_statistics`)
+    are updated per chunk, such that memory is bounded by the chunk size. If `num_workers` > 0, the chunks are processed
+    by a process pool, which requires the iterators to be picklable.
     """
+    # iterator the chunks are read from within the worker processes of the fitting pool
+    _worker_iterator: DatasetIteratorIF = None
 
-    def __init__(self, sample_position: int, feature_encoding_configs: Dict[str, List[Any]], custom_encoders: Dict[str, Encoder] = None, sequential=False):
+    def __init__(self, sample_position: int, feature_encoding_configs: Dict[str, List[Any]], custom_encoders: Dict[str, Encoder] = None, sequential=False,
+                 chunk_size: int = 4096, num_workers: int = 0):
         self.sample_position = sample_position
         self.feature_encoding_configs = feature_encoding_configs
-        self.feature_encoder_mapping: Dict[str, Encoder] = {"categorical": CategoricalEncoder, "continuous": ContinuousEncoder}
+        self.feature_encoder_mapping: Dict[str, Encoder] = {"categorical": CategoricalEncoder, "categorical_codes": CategoricalCodesEncoder,
+                                                            "continuous": ContinuousEncoder}
         if custom_encoders is not None:
             self.feature_encoder_mapping = {**self.feature_encoder_mapping, **custom_encoders}
         self.encoders: Dict[int, Encoder] = {}
         self.sequential = sequential
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
+        # encoding plans are compiled once per number of input columns
+        self._encoding_plans: Dict[int, FeatureEncodingPlan] = {}
 
     def fit(self, iterators: Dict[str, DatasetIteratorIF]):
 
@@ -102,9 +161,9 @@ class FeatureEncoderPostProcessor(FittablePostProcessorIf):
                     encoders[feature_indice] = encoder
             return encoders
 
-        def fit_parallel(iterators: Dict[str, DatasetIteratorIF]):
+        def fit_chunked(iterators: Dict[str, DatasetIteratorIF]):
             """
-            Parallel encoding.
+            Single pass, chunked encoding.
 
             :params:
                 iterators (Dict[str, DatasetIteratorIF]): Dictionary mapping from iterator_name.
@@ -112,24 +171,93 @@ class FeatureEncoderPostProcessor(FittablePostProcessorIf):
                 encoders (dict): Encoded features.
             """
             encoders = {}
-            for config in tqdm.tqdm(self.feature_encoding_configs, desc="Encoding Progress"):
-                encoder_class = self.feature_encoder_mapping[config["feature_type"]]
-                feature_indices = config["feature_names"]
-                iterator = iterators[config["train_split"]]
-                subset_encoders = [encoder_class() for feature_indice in feature_indices]
-                values = np.stack([row[self.sample_position][feature_indices] for row in iterator])
-
-                for i in range(len(subset_encoders)):
-                    subset_encoders[i].fit(values=values[:, i])
-                    encoders[feature_indices[i]] = subset_encoders[i]
+            configs_by_split: Dict[str, List[Dict[str, Any]]] = {}
+            for config in self.feature_encoding_configs:
+                configs_by_split.setdefault(config["train_split"], []).append(config)
+            for split_name, configs in configs_by_split.items():
+                column_blocks = [(self.feature_encoder_mapping[config["feature_type"]], config["feature_names"]) for config in configs]
+                statistics = self._get_statistics(iterators[split_name], column_blocks)
+                for (encoder_class, feature_indices), block_statistics in zip(column_blocks, statistics):
+                    encoders.update(zip(feature_indices, encoder_class.from_column_statistics(block_statistics)))
             return encoders
 
+        for split_name in {config["train_split"] for config in self.feature_encoding_configs}:
+            if len(iterators[split_name]) == 0:
+                raise DataIntegrityError(f"Feature encoders cannot be fitted on the empty split {split_name}.")
         if self.sequential:
             encoders = fit_sequential(iterators)
         else:
-            encoders = fit_parallel(iterators)
+            encoders = fit_chunked(iterators)
+        self.set_encoders(encoders, iterators)
+
+    def set_encoders(self, encoders: Dict[int, Encoder], iterators: Dict[str, DatasetIteratorIF]):
+        """
+        Sets fitted encoders, e.g., encoders loaded from an `EncoderCache`.
+
+        :params:
+            encoders (Dict[int, Encoder]): Fitted encoder per feature index.
+            iterators (Dict[str, DatasetIteratorIF]): Dictionary mapping from iterator_name.
+        """
         # order the encoders by their keys, as of python 3.6 insertion order equals iteration order
         self.encoders = {name: encoder for name, encoder in sorted(encoders.items(), key=lambda x: x[0])}
+        self._encoding_plans = {}
+        if len(self.feature_encoding_configs) > 0:
+            train_iterator = iterators[self.feature_encoding_configs[0]["train_split"]]
+            if len(train_iterator) > 0:
+                self.get_encoding_plan(len(train_iterator[0][self.sample_position]))
+
+    def _get_statistics(self, iterator: DatasetIteratorIF, column_blocks: List[Tuple[Type[Encoder], List[int]]]) -> List[Any]:
+        chunk_ranges = [(start, min(start + self.chunk_size, len(iterator))) for start in range(0, len(iterator), self.chunk_size)]
+        if self.num_workers > 0:
+            with ProcessPoolExecutor(max_workers=self.num_workers, initializer=FeatureEncoderPostProcessor._init_fitting_worker,
+                                     initargs=(iterator,)) as executor:
+                chunk_statistics = executor.map(FeatureEncoderPostProcessor._get_worker_chunk_statistics, chunk_ranges,
+                                                [self.sample_position] * len(chunk_ranges), [column_blocks] * len(chunk_ranges))
+                return self._merge_statistics(tqdm.tqdm(chunk_statistics, total=len(chunk_ranges), desc="Encoding Progress"),
+                                              column_blocks)
+        chunk_statistics = (FeatureEncoderPostProcessor._get_chunk_statistics(iterator, chunk_range, self.sample_position, column_blocks)
+                            for chunk_range in chunk_ranges)
+        return self._merge_statistics(tqdm.tqdm(chunk_statistics, total=len(chunk_ranges), desc="Encoding Progress"), column_blocks)
+
+    @staticmethod
+    def _merge_statistics(chunk_statistics, column_blocks: List[Tuple[Type[Encoder], List[int]]]) -> List[Any]:
+        statistics = None
+        for chunk in chunk_statistics:
+            if statistics is None:
+                statistics = chunk
+            else:
+                statistics = [encoder_class.merge_column_statistics(block_statistics, other_block_statistics)
+                              for (encoder_class, _), block_statistics, other_block_statistics in zip(column_blocks, statistics, chunk)]
+        return statistics
+
+    @staticmethod
+    def _get_chunk_statistics(iterator: DatasetIteratorIF, chunk_range: Tuple[int, int], sample_position: int,
+                              column_blocks: List[Tuple[Type[Encoder], List[int]]]) -> List[Any]:
+        inputs = np.stack([np.asarray(iterator[i][sample_position]) for i in range(*chunk_range)])
+        return [encoder_class.get_column_statistics(inputs[:, feature_indices]) for encoder_class, feature_indices in column_blocks]
+
+    @staticmethod
+    def _init_fitting_worker(iterator: DatasetIteratorIF):
+        FeatureEncoderPostProcessor._worker_iterator = iterator
+
+    @staticmethod
+    def _get_worker_chunk_statistics(chunk_range: Tuple[int, int], sample_position: int,
+                                     column_blocks: List[Tuple[Type[Encoder], List[int]]]) -> List[Any]:
+        return FeatureEncoderPostProcessor._get_chunk_statistics(FeatureEncoderPostProcessor._worker_iterator, chunk_range,
+                                                                 sample_position, column_blocks)
+
+    def get_encoding_plan(self, num_columns: int) -> FeatureEncodingPlan:
+        """
+        Get the compiled encoding plan for samples with `num_columns` input columns.
+
+        :params:
+            num_columns (int): Number of columns of the sample input.
+        :returns:
+            plan (FeatureEncodingPlan): Compiled encoding plan.
+        """
+        if num_columns not in self._encoding_plans:
+            self._encoding_plans[num_columns] = FeatureEncodingPlan(self.encoders, num_columns)
+        return self._encoding_plans[num_columns]
 
     def postprocess(self, sample: Tuple[Any]) -> Tuple[Any]:
         """
@@ -144,10 +272,25 @@ class FeatureEncoderPostProcessor(FittablePostProcessorIf):
             return sample
         sample = list(sample)  # need to make this a list because index assignment is not possible with tuples
         sample_input: torch.Tensor = sample[self.sample_position]
-        sample[self.sample_position] = torch.from_numpy(np.hstack([self.encoders[pos].transform(np.array([val])).flatten()
-                                                                   if pos in self.encoders.keys() else val for pos, val in enumerate(sample_input)]))
+        sample[self.sample_position] = torch.from_numpy(self.get_encoding_plan(len(sample_input)).encode(sample_input))
         return tuple(sample)
 
+    def postprocess_batch(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        """
+        Perform the Feature Encoding postprocess on a batch of samples at once.
+
+        :params:
+            samples (List[Tuple[Any]]): Data samples of equal input length.
+        :returns:
+            samples (List[Tuple[Any]]): Feature Encoded samples. The encoded inputs are views on a single batch tensor.
+        """
+        if not self.encoders or len(samples) == 0:
+            return samples
+        sample_inputs = np.stack([np.asarray(sample[self.sample_position]) for sample in samples])
+        encoded_inputs = torch.from_numpy(self.get_encoding_plan(sample_inputs.shape[1]).encode_batch(sample_inputs))
+        return [sample[:self.sample_position] + (encoded_inputs[i], ) + sample[self.sample_position + 1:]
+                for i, sample in enumerate(map(tuple, samples))]
+
     def get_output_pattern(self):
         rep = ""
         lower = 0
@@ -157,7 +300,7 @@ class FeatureEncoderPostProcessor(FittablePostProcessorIf):
         return rep
 
 
-class OneHotEncodedTargetPostProcessor(PostProcessorIf):
+class OneHotEncodedTargetPostProcessor(BatchPostProcessorIf):
     """
     Class having functions to perform One Hot Encoding of Targets.
     """
@@ -180,3 +323,20 @@ class OneHotEncodedTargetPostProcessor(PostProcessorIf):
         sample_list = list(sample)
         sample_list[self.target_position] = target_vector
         return tuple(sample_list)
+
+    def postprocess_batch(self, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        """
+        Perform the One Hot Encoding of Targets postprocess on a batch of samples at once.
+
+        :params:
+            samples (List[Tuple[Any]]): Data samples.
+        :returns:
+            samples (List[Tuple[Any]]): One Hot Encoded samples. The target vectors are views on a single batch tensor.
+        """
+        if len(samples) == 0:
+            return samples
+        targets = torch.as_tensor(np.array([sample[self.target_position] for sample in samples]), dtype=torch.long)
+        target_vectors = torch.zeros(len(samples), self.target_vector_size)
+        target_vectors[torch.arange(len(samples)), targets] = 1
+        return [tuple(sample[:self.target_position]) + (target_vectors[i], ) + tuple(sample[self.target_position + 1:])
+                for i, sample in enumerate(samples)]
@@ -0,0 +1,113 @@
+from functools import partial
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Any, Callable, Iterable, Iterator
+import torch
+from ml_gym.batching.batch import TorchDeviceMixin
+
+
+class BatchPrefetcher:
+    """
+    Background prefetch stage, which iterates the batches (i.e., assembles them within the loader) and starts their transfer
+    to the device within a thread. Up to `depth` batches are kept ready in a bounded queue, such that the computations on the
+    current batch do not wait for the Python-side batch assembly. The items of the iterable are either batches or tuples
+    containing batches, e.g., the `(batch_id, batch)` tuples of the trainer.
+
+    Batches are not prefetched across epoch boundaries, as the loader state is checkpointed at the end of each epoch:
+    After the last batch of an epoch (see `is_epoch_end_fun`), the thread pauses until the consumer has processed this batch.
+    """
+    # polling interval of the thread, when the queue is full, to notice that the consumer stopped early
+    _put_timeout = 0.1
+
+    class _ProducerError:
+        def __init__(self, exception: BaseException):
+            self.exception = exception
+
+    class _EndOfIteration:
+        pass
+
+    def __init__(self, iterable: Iterable, device: torch.device = None, depth: int = 2,
+                 is_epoch_end_fun: Callable[[Any], bool] = None):
+        """
+        :params:
+               iterable (Iterable): Iterable of batches or tuples containing batches.
+               device (torch.device): Device the batches are transferred to or None, if the batches are not transferred.
+               depth (int): Maximum number of prefetched batches.
+               is_epoch_end_fun (Callable[[Any], bool]): Tells whether an item is the last one of an epoch.
+        """
+        self.iterable = iterable
+        self.device = device
+        self.depth = depth
+        self.is_epoch_end_fun = is_epoch_end_fun
+
+    def __len__(self) -> int:
+        return len(self.iterable)
+
+    def _apply_to_batches(self, item: Any, apply_fun: Callable[[TorchDeviceMixin], TorchDeviceMixin]) -> Any:
+        if isinstance(item, TorchDeviceMixin):
+            return apply_fun(item)
+        elif isinstance(item, tuple):
+            return tuple(self._apply_to_batches(element, apply_fun) for element in item)
+        return item
+
+    def _start_transfer(self, item: Any) -> Any:
+        if self.device is None:
+            return item
+        return self._apply_to_batches(item, partial(TorchDeviceMixin.to_async, device=self.device))
+
+    def _await_transfer(self, item: Any) -> Any:
+        if self.device is None:
+            return item
+        return self._apply_to_batches(item, TorchDeviceMixin.await_ready)
+
+    def _is_epoch_end(self, item: Any) -> bool:
+        return self.is_epoch_end_fun is not None and self.is_epoch_end_fun(item)
+
+    def _put(self, queue: Queue, item: Any, stop_event: Event) -> bool:
+        while not stop_event.is_set():
+            try:
+                queue.put(item, timeout=BatchPrefetcher._put_timeout)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce(self, queue: Queue, stop_event: Event, resume_event: Event):
+        try:
+            for item in self.iterable:
+                if not self._put(queue, self._start_transfer(item), stop_event):
+                    return
+                if self._is_epoch_end(item):
+                    resume_event.wait()
+                    resume_event.clear()
+                if stop_event.is_set():
+                    return
+            self._put(queue, BatchPrefetcher._EndOfIteration(), stop_event)
+        except BaseException as e:
+            self._put(queue, BatchPrefetcher._ProducerError(e), stop_event)
+
+    def __iter__(self) -> Iterator[Any]:
+        queue = Queue(maxsize=self.depth)
+        stop_event, resume_event = Event(), Event()
+        thread = Thread(target=self._produce, args=(queue, stop_event, resume_event), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = queue.get()
+                if isinstance(item, BatchPrefetcher._EndOfIteration):
+                    return
+                elif isinstance(item, BatchPrefetcher._ProducerError):
+                    raise item.exception
+                yield self._await_transfer(item)
+                if self._is_epoch_end(item):
+                    resume_event.set()
+        finally:
+            # unblocks the thread, if the consumer stopped early (e.g., due to early stopping)
+            stop_event.set()
+            resume_event.set()
+            while thread.is_alive():
+                try:
+                    queue.get(timeout=BatchPrefetcher._put_timeout)
+                except Empty:
+                    pass
+            thread.join()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Union
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+
+class SplitIndexStore:
+    """
+    Stores the indices of dataset splits (e.g., the folds of a cross validation) as NumPy arrays within a directory.
+    Instead of the full index lists, experiment configs only contain a reference string to the stored array,
+    which is resolved when the iterator view is constructed (see `IteratorViewConstructable`).
+
+    The arrays are content-addressed, i.e., identical splits are stored only once and references stay valid across
+    grid searches sharing the same store.
+    """
+    REFERENCE_PREFIX = "split_index_store://"
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def get_index_id(indices: np.ndarray) -> str:
+        return hashlib.sha256(np.ascontiguousarray(indices, dtype=np.int64).tobytes()).hexdigest()[:32]
+
+    def put(self, indices: Union[List[int], np.ndarray]) -> str:
+        """
+        Stores the split indices.
+        :params:
+            indices (Union[List[int], np.ndarray]): Indices of the split.
+
+        :returns:
+            reference (str): Reference to the stored indices.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        index_path = os.path.join(self.directory, f"{SplitIndexStore.get_index_id(indices)}.npy")
+        if not os.path.isfile(index_path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    np.save(fp, indices, allow_pickle=False)
+                os.replace(tmp_path, index_path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        return f"{SplitIndexStore.REFERENCE_PREFIX}{index_path}"
+
+    @staticmethod
+    def is_reference(value: Any) -> bool:
+        return isinstance(value, str) and value.startswith(SplitIndexStore.REFERENCE_PREFIX)
+
+    @staticmethod
+    def resolve(reference: str) -> np.ndarray:
+        """
+        Loads the split indices for the given reference.
+        :params:
+            reference (str): Reference returned by `put`.
+
+        :returns:
+            indices (np.ndarray): Indices of the split.
+        """
+        return np.load(reference[len(SplitIndexStore.REFERENCE_PREFIX):], allow_pickle=False)
+
+    @staticmethod
+    def get_split_indices_config(split_indices: Dict[str, Union[List[int], np.ndarray]],
+                                 split_index_store: "SplitIndexStore" = None) -> Dict[str, Union[List[int], str]]:
+        """
+        Converts the split indices into config entries, i.e., references into the given store or,
+        if no store is given, inline index lists.
+        :params:
+            split_indices (Dict[str, Union[List[int], np.ndarray]]): Indices per split name.
+            split_index_store (SplitIndexStore): Store for the indices.
+
+        :returns:
+            split_indices_config (Dict[str, Union[List[int], str]]): Config entries per split name.
+        """
+        if split_index_store is not None:
+            return {name: split_index_store.put(indices) for name, indices in split_indices.items()}
+        return {name: np.asarray(indices, dtype=np.int64).tolist() for name, indices in split_indices.items()}
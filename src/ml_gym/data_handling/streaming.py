@@ -0,0 +1,185 @@
+from collections.abc import Sized
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+from data_stack.dataset.iterator import DatasetIteratorIF
+from data_stack.dataset.meta import DatasetMetaIF
+from torch.utils.data import IterableDataset, get_worker_info
+from ml_gym.data_handling.iterators import BatchedFetch
+from ml_gym.data_handling.label_index import LabelIndex
+import numpy as np
+
+
+class ShardReader:
+    """
+    Reads a single shard sequentially in chunks. Map-style shards (`DatasetIteratorIF`) are read via batched fetches and
+    can be positioned in O(1). Any other iterable shard is read lazily, i.e., skipping samples requires reading them.
+    """
+
+    def __init__(self, shard: Union[DatasetIteratorIF, Iterable], chunk_size: int):
+        self._shard = shard
+        self._chunk_size = chunk_size
+        self._is_map_style = isinstance(shard, DatasetIteratorIF)
+        self._position = 0
+        self._iterator: Iterator = None if self._is_map_style else iter(shard)
+
+    def skip(self, num_samples: int) -> int:
+        """
+        Skips up to `num_samples` samples and returns the number of samples actually skipped.
+        """
+        if self._is_map_style:
+            num_skipped = min(num_samples, len(self._shard) - self._position)
+        else:
+            num_skipped = sum(1 for _ in islice(self._iterator, num_samples))
+        self._position += num_skipped
+        return num_skipped
+
+    def read(self, num_samples: int) -> List[Tuple[Any]]:
+        """
+        Reads up to `num_samples` samples in chunks of `chunk_size`.
+        """
+        samples = []
+        while len(samples) < num_samples:
+            chunk_size = min(self._chunk_size, num_samples - len(samples))
+            if self._is_map_style:
+                chunk_size = min(chunk_size, len(self._shard) - self._position)
+                chunk = BatchedFetch.get_items(self._shard, list(range(self._position, self._position + chunk_size))) \
+                    if chunk_size > 0 else []
+            else:
+                chunk = list(islice(self._iterator, chunk_size))
+            if len(chunk) == 0:
+                break
+            self._position += len(chunk)
+            samples.extend(chunk)
+        return samples
+
+
+class StreamingDatasetIterator(IterableDataset):
+    """
+    Iterable dataset streaming the samples of one or more shards, e.g., for corpora that do not fit into memory or cannot be
+    accessed randomly at reasonable cost.
+
+    The stream of an epoch is the concatenation of all shards (optionally in a shuffled order) and is processed in blocks of
+    `shuffle_buffer_size` samples (or `chunk_size` samples, if shuffling is disabled). Each block is
+        - shuffled within the bounded buffer, or
+        - resampled with replacement such that each class occurring in the block is drawn with equal probability
+          (approximate class-weighted sampling, as the class frequencies are estimated per block),
+    using a random generator seeded by (seed, epoch, block id). Therefore, the stream is fully determined by the seed,
+    the epoch and the stream offset, which allows to deterministically resume a stream from a recorded offset by seeking
+    to the offset's block instead of replaying the stream.
+
+    If the stream is consumed by multiple data loader workers, the blocks are distributed round-robin among the workers.
+    Stream offsets refer to the single-process order of the stream.
+    """
+
+    def __init__(self, shards: List[Union[DatasetIteratorIF, Iterable]], dataset_meta: DatasetMetaIF, chunk_size: int = 1024,
+                 shuffle_buffer_size: int = 0, shuffle_shards: bool = False, class_weighted_sampling: bool = False,
+                 label_pos: int = None, seed: int = 0, num_samples: int = None):
+        self._shards = shards
+        self._dataset_meta = dataset_meta
+        self.chunk_size = chunk_size
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.shuffle_shards = shuffle_shards
+        self.class_weighted_sampling = class_weighted_sampling
+        self.label_pos = label_pos if label_pos is not None else dataset_meta.target_pos
+        self.seed = seed
+        self._num_samples = num_samples
+        self.epoch = 0
+        self.stream_offset = 0
+        self._next_epoch = 0
+        self._next_stream_offset = 0
+
+    @property
+    def dataset_meta(self) -> DatasetMetaIF:
+        return self._dataset_meta
+
+    @property
+    def block_size(self) -> int:
+        return self.shuffle_buffer_size if self.shuffle_buffer_size > 0 else self.chunk_size
+
+    def __len__(self) -> int:
+        if self._num_samples is not None:
+            return self._num_samples
+        if all(isinstance(shard, Sized) for shard in self._shards):
+            return sum(len(shard) for shard in self._shards)
+        raise TypeError("The length of a stream over unsized shards has to be specified via `num_samples`.")
+
+    def set_stream_position(self, epoch: int, stream_offset: int = 0):
+        """
+        Sets the position the stream starts from with the next iteration.
+        :params:
+            epoch (int): Epoch of the stream.
+            stream_offset (int): Number of samples of the epoch that have already been consumed.
+        """
+        self._next_epoch = epoch
+        self._next_stream_offset = stream_offset
+
+    def get_stream_position(self) -> Tuple[int, int]:
+        """
+        Returns the position the stream starts from with the next iteration.
+        :returns:
+            Tuple[int, int]: Epoch and stream offset of the next iteration.
+        """
+        return self._next_epoch, self._next_stream_offset
+
+    def begin_epoch(self):
+        """
+        Called within the main process before each iteration. Fixes the epoch and offset of the upcoming iteration, such
+        that the data loader workers, which operate on copies of the stream, iterate the same epoch.
+        """
+        self.epoch = self._next_epoch
+        self.stream_offset = self._next_stream_offset
+        self._next_epoch = self.epoch + 1
+        self._next_stream_offset = 0
+
+    def _get_shard_order(self) -> List[int]:
+        if self.shuffle_shards:
+            return np.random.default_rng([self.seed, self.epoch]).permutation(len(self._shards)).tolist()
+        return list(range(len(self._shards)))
+
+    def _iter_raw_blocks(self, start_block_id: int, block_filter) -> Iterator[Tuple[int, List[Tuple[Any]]]]:
+        readers = (ShardReader(self._shards[i], self.chunk_size) for i in self._get_shard_order())
+        reader = next(readers, None)
+        block_id = 0
+        while reader is not None:
+            load_block = block_id >= start_block_id and block_filter(block_id)
+            remaining = self.block_size
+            samples = []
+            while remaining > 0 and reader is not None:
+                if load_block:
+                    chunk = reader.read(remaining)
+                    samples.extend(chunk)
+                    num_consumed = len(chunk)
+                else:
+                    num_consumed = reader.skip(remaining)
+                remaining -= num_consumed
+                if remaining > 0:
+                    reader = next(readers, None)
+            if remaining == self.block_size:
+                break
+            if load_block:
+                yield block_id, samples
+            block_id += 1
+
+    def _process_block(self, block_id: int, samples: List[Tuple[Any]]) -> List[Tuple[Any]]:
+        if self.class_weighted_sampling:
+            rnd_generator = np.random.default_rng([self.seed, self.epoch, block_id])
+            labels = LabelIndex.build_labels(samples, self.label_pos)
+            _, class_ids = np.unique(labels, return_inverse=True)
+            class_ids = class_ids.reshape(-1)
+            sample_weights = 1. / np.bincount(class_ids)[class_ids]
+            indices = rnd_generator.choice(len(samples), size=len(samples), replace=True, p=sample_weights / sample_weights.sum())
+        elif self.shuffle_buffer_size > 0:
+            indices = np.random.default_rng([self.seed, self.epoch, block_id]).permutation(len(samples))
+        else:
+            return samples
+        return [samples[i] for i in indices]
+
+    def __iter__(self) -> Iterator[Tuple[Any]]:
+        worker_info = get_worker_info()
+        num_workers, worker_id = (worker_info.num_workers, worker_info.id) if worker_info is not None else (1, 0)
+        start_block_id = self.stream_offset // self.block_size
+        for block_id, samples in self._iter_raw_blocks(start_block_id, lambda block_id: block_id % num_workers == worker_id):
+            samples = self._process_block(block_id, samples)
+            if block_id == start_block_id:
+                samples = samples[self.stream_offset - start_block_id * self.block_size:]
+            yield from samples
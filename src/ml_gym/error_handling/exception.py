@@ -174,3 +174,13 @@ class PipelineDetailsCreationError(Exception):
 class ModelCardFetchError(Exception):
     """Raised when an error occurs during fetching model card."""
     pass
+
+
+class PrecisionPolicyError(Exception):
+    """Raised when an unknown or unsupported precision policy is requested."""
+    pass
+
+
+class ModelCompilationError(Exception):
+    """Raised when a model cannot be compiled with the requested compiler."""
+    pass
@@ -4,10 +4,11 @@ from ml_gym.gym.evaluators.evaluator import AbstractEvaluator
 from ml_gym.gym.post_processing import PredictPostProcessingIF
 from ml_gym.persistency.logging import ExperimentStatusLogger
 import torch
-from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch
+from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch, InferenceResultBatchAccumulator, \
+    InferenceResultBatchOffloader, InferenceResultBatchSelector
 from ml_gym.data_handling.dataset_loader import DatasetLoader
 from ml_gym.gym.inference_component import InferenceComponent
-from ml_gym.metrics.metrics import Metric
+from ml_gym.metrics.metrics import Metric, StreamingMetric
 from ml_gym.models.nn.net import NNModel
 from ml_gym.loss_functions.loss_functions import Loss
 from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
@@ -49,7 +50,8 @@ class AccelerateEvalComponent:
     def __init__(self, inference_component: InferenceComponent, post_processors: Dict[str, PredictPostprocessingComponent], metrics: List[Metric],
                  loss_funs: Dict[str, Loss], dataset_loaders: Dict[str, DatasetLoader],
                  cpu_target_subscription_keys: List[str] = None, cpu_prediction_subscription_keys: List[Union[str, List]] = None,
-                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None):
+                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None,
+                 offload_bulk_size: int = 8):
         self.loss_funs = loss_funs
         self.inference_component = inference_component
         # maps split names to postprocessors
@@ -58,6 +60,10 @@ class AccelerateEvalComponent:
         self.dataset_loaders = dataset_loaders
         self.cpu_target_subscription_keys = cpu_target_subscription_keys
         self.cpu_prediction_subscription_keys = cpu_prediction_subscription_keys
+        # the cpu subscriptions are compiled once into access paths, which are applied to every batch
+        self.cpu_subscription_selector = InferenceResultBatchSelector(cpu_target_subscription_keys, cpu_prediction_subscription_keys)
+        # number of batches whose cpu subscriptions are transferred at once
+        self.offload_bulk_size = offload_bulk_size
         # determines which metrics are applied to which splits (metric_key to split list)
         self.metrics_computation_config = None if metrics_computation_config is None else {
             m["metric_tag"]: m["applicable_splits"] for m in metrics_computation_config}
@@ -111,8 +117,27 @@ class AccelerateEvalComponent:
         else:
             split_loss_funs = self.loss_funs
 
+        # select metrics for split
+        if self.metrics_computation_config is not None:
+            metric_tags = [metric_tag for metric_tag, applicable_splits in self.metrics_computation_config.items()
+                           if split_name in applicable_splits]
+            split_metrics = [
+                metric for metric in self.metrics if metric.tag in metric_tags]
+        else:
+            split_metrics = self.metrics
+        # streaming metrics are updated batch-wise, such that the predictions and targets only need to be
+        # accumulated for the remaining metrics
+        streaming_metrics = [metric for metric in split_metrics if isinstance(metric, StreamingMetric)]
+        for metric in streaming_metrics:
+            metric.reset()
+        accumulate_results = len(streaming_metrics) < len(split_metrics)
+
         batch_losses = []
-        inference_result_batches_cpu = []
+        # the cpu subscriptions are transferred in bulk and copied into buffers preallocated for the entire split
+        inference_result_offloader = InferenceResultBatchOffloader(
+            selector=self.cpu_subscription_selector,
+            accumulator=InferenceResultBatchAccumulator(initial_capacity=len(dataset_loader.dataset)),
+            device=torch.device("cpu"), bulk_size=self.offload_bulk_size)
         num_batches = len(dataset_loader)
         processed_batches = 0
         for batch in dataset_loader:
@@ -132,11 +157,10 @@ class AccelerateEvalComponent:
                 irb_filtered_gathered, split_loss_funs)
             batch_losses.append(batch_loss)
 
-            irb_filtered = irb_filtered_gathered.split_results(predictions_keys=self.cpu_prediction_subscription_keys,
-                                                               target_keys=self.cpu_target_subscription_keys,
-                                                               device=torch.device("cpu"))
-
-            inference_result_batches_cpu.append(irb_filtered)
+            self._update_streaming_metrics(irb_filtered_gathered, streaming_metrics)
+            if accumulate_results:
+                # the offload overlaps with the forward pass of the subsequent batches
+                inference_result_offloader.append(irb_filtered_gathered)
             processed_batches += 1
             splits = list(self.dataset_loaders.keys())
             if accelerator.is_main_process:
@@ -147,21 +171,14 @@ class AccelerateEvalComponent:
                                              current_split=split_name)
 
         # calc metrics
-        try:
-            prediction_batch = InferenceResultBatch.combine(
-                inference_result_batches_cpu)
-        except BatchStateError as e:
-            raise EvaluationError(
-                f"Error combining inference result batch on split {split_name}.") from e
+        prediction_batch = None
+        if accumulate_results:
+            try:
+                prediction_batch = inference_result_offloader.combine()
+            except BatchStateError as e:
+                raise EvaluationError(
+                    f"Error combining inference result batch on split {split_name}.") from e
 
-        # select metrics for split
-        if self.metrics_computation_config is not None:
-            metric_tags = [metric_tag for metric_tag, applicable_splits in self.metrics_computation_config.items()
-                           if split_name in applicable_splits]
-            split_metrics = [
-                metric for metric in self.metrics if metric.tag in metric_tags]
-        else:
-            split_metrics = self.metrics
         metric_scores = self._calculate_metric_scores(
             prediction_batch, split_metrics)
 
@@ -217,7 +234,7 @@ class AccelerateEvalComponent:
         Calcualtion of metric scores on the splits of data set.
 
         :params:
-               inference_batch (InferenceResultBatch): Prediction performed on the model.
+               inference_batch (InferenceResultBatch): Prediction performed on the model. Only required for the non-streaming metrics.
                split_metrics (List[Metric]): Metrics for each split of data.
         :returns:
             metric_scores (Dict[str, List[float]]): Metric scores for splits.
@@ -225,12 +242,29 @@ class AccelerateEvalComponent:
         metric_scores = {}
         for metric in split_metrics:
             try:
-                metric_scores[metric.tag] = [metric(inference_batch)]
+                if isinstance(metric, StreamingMetric):
+                    metric_scores[metric.tag] = [metric.compute()]
+                else:
+                    metric_scores[metric.tag] = [metric(inference_batch)]
             except Exception as e:
                 raise MetricCalculationError(
                     f"Error during calculation of metric {metric.tag}") from e
         return metric_scores
 
+    def _update_streaming_metrics(self, inference_batch: InferenceResultBatch, streaming_metrics: List[StreamingMetric]):
+        """
+        Updates the states of the streaming metrics with the batch.
+
+        :params:
+               inference_batch (InferenceResultBatch): Prediction performed on the model.
+               streaming_metrics (List[StreamingMetric]): Streaming metrics of the split.
+        """
+        for metric in streaming_metrics:
+            try:
+                metric.update(inference_batch)
+            except Exception as e:
+                raise MetricCalculationError(f"Error during update of metric {metric.tag}") from e
+
     def _calculate_loss_scores(self, forward_batch: InferenceResultBatch, split_loss_funs: Dict[str, Loss]) -> Dict[str, List[float]]:
         """
         Calcualtion of loss scores on the splits of data set.
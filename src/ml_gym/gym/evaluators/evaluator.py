@@ -1,14 +1,17 @@
 from abc import abstractmethod
+from contextlib import nullcontext
 from enum import Enum
 from typing import Any, Callable, Dict, List, Union
 from ml_gym.gym.post_processing import PredictPostProcessingIF
 from ml_gym.persistency.logging import ExperimentStatusLogger
 import torch
-from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch
+from ml_gym.batching.batch import DatasetBatch, EvaluationBatchResult, InferenceResultBatch, InferenceResultBatchAccumulator, \
+    InferenceResultBatchOffloader, InferenceResultBatchSelector
 from ml_gym.data_handling.dataset_loader import DatasetLoader
+from ml_gym.data_handling.prefetching import BatchPrefetcher
 from ml_gym.gym.inference_component import InferenceComponent
 from ml_gym.gym.stateful_components import StatefulComponent
-from ml_gym.metrics.metrics import Metric
+from ml_gym.metrics.metrics import Metric, StreamingMetric
 from ml_gym.models.nn.net import NNModel
 from ml_gym.loss_functions.loss_functions import Loss
 import tqdm
@@ -51,7 +54,8 @@ class EvalComponent(EvalComponentIF):
     def __init__(self, inference_component: InferenceComponent, post_processors: Dict[str, PredictPostprocessingComponent], metrics: List[Metric],
                  loss_funs: Dict[str, Loss], dataset_loaders: Dict[str, DatasetLoader], show_progress: bool = False,
                  cpu_target_subscription_keys: List[str] = None, cpu_prediction_subscription_keys: List[Union[str, List]] = None,
-                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None):
+                 metrics_computation_config: List[Dict] = None, loss_computation_config: List[Dict] = None,
+                 offload_bulk_size: int = 8, prefetch_depth: int = 2):
         self.loss_funs = loss_funs
         self.inference_component = inference_component
         # maps split names to postprocessors
@@ -61,6 +65,12 @@ class EvalComponent(EvalComponentIF):
         self.show_progress = show_progress
         self.cpu_target_subscription_keys = cpu_target_subscription_keys
         self.cpu_prediction_subscription_keys = cpu_prediction_subscription_keys
+        # the cpu subscriptions are compiled once into access paths, which are applied to every batch
+        self.cpu_subscription_selector = InferenceResultBatchSelector(cpu_target_subscription_keys, cpu_prediction_subscription_keys)
+        # number of batches whose cpu subscriptions are transferred at once
+        self.offload_bulk_size = offload_bulk_size
+        # number of batches assembled and transferred ahead in the background, 0 disables the prefetching
+        self.prefetch_depth = prefetch_depth
         # determines which metrics are applied to which splits (metric_key to split list)
         self.metrics_computation_config = None if metrics_computation_config is None else {
             m["metric_tag"]: m["applicable_splits"] for m in metrics_computation_config}
@@ -83,6 +93,8 @@ class EvalComponent(EvalComponentIF):
         :returns:
             evaluation_result (List[EvaluationBatchResult]): Evaluation results of batches trained on.
         """
+        # the model is placed once per evaluation instead of per batch
+        model = model.to(device)
         return [self.evaluate_dataset_split(model, device, split_name, loader, epoch_result_callback_fun, batch_processed_callback_fun) for split_name, loader in self.dataset_loaders.items()]
 
     def evaluate_dataset_split(self, model: NNModel, device: torch.device, split_name: str,
@@ -103,7 +115,8 @@ class EvalComponent(EvalComponentIF):
             evaluation_result (EvaluationBatchResult): Evaluation results of batches trained on.
         """
         dataset_loader.device = device
-        dataset_loader_iterator = tqdm.tqdm(dataset_loader, desc=f"Evaluating {dataset_loader.dataset_name} - {split_name}") if self.show_progress else dataset_loader
+        dataset_loader_iterator = BatchPrefetcher(dataset_loader, device=device, depth=self.prefetch_depth) if self.prefetch_depth > 0 else dataset_loader
+        dataset_loader_iterator = tqdm.tqdm(dataset_loader_iterator, desc=f"Evaluating {dataset_loader.dataset_name} - {split_name}") if self.show_progress else dataset_loader_iterator
         post_processors = self.post_processors[split_name] + self.post_processors["default"]
 
         # calc losses
@@ -114,32 +127,6 @@ class EvalComponent(EvalComponentIF):
         else:
             split_loss_funs = self.loss_funs
 
-        batch_losses = []
-        inference_result_batches_cpu = []
-        num_batches = len(dataset_loader_iterator)
-        processed_batches = 0
-        for batch in dataset_loader_iterator:
-            inference_result_batch = self.forward_batch(dataset_batch=batch, model=model, device=device, postprocessors=post_processors)
-            batch_loss = self._calculate_loss_scores(inference_result_batch, split_loss_funs)
-            batch_losses.append(batch_loss)
-            irb_filtered = inference_result_batch.split_results(predictions_keys=self.cpu_prediction_subscription_keys,
-                                                                target_keys=self.cpu_target_subscription_keys,
-                                                                device=torch.device("cpu"))
-            inference_result_batches_cpu.append(irb_filtered)
-            processed_batches += 1
-            splits = [d.dataset_tag for _, d in self.dataset_loaders.items()]
-            batch_processed_callback_fun(status="evaluation",
-                                         num_batches=num_batches,
-                                         current_batch=processed_batches,
-                                         splits=splits,
-                                         current_split=dataset_loader.dataset_tag)
-
-        # calc metrics
-        try:
-            prediction_batch = InferenceResultBatch.combine(inference_result_batches_cpu)
-        except BatchStateError as e:
-            raise EvaluationError(f"Error combining inference result batch on split {split_name}.") from e
-
         # select metrics for split
         if self.metrics_computation_config is not None:
             metric_tags = [metric_tag for metric_tag, applicable_splits in self.metrics_computation_config.items()
@@ -147,6 +134,48 @@ class EvalComponent(EvalComponentIF):
             split_metrics = [metric for metric in self.metrics if metric.tag in metric_tags]
         else:
             split_metrics = self.metrics
+        # streaming metrics are updated batch-wise, such that the predictions and targets only need to be
+        # accumulated for the remaining metrics
+        streaming_metrics = [metric for metric in split_metrics if isinstance(metric, StreamingMetric)]
+        for metric in streaming_metrics:
+            metric.reset()
+        accumulate_results = len(streaming_metrics) < len(split_metrics)
+
+        batch_losses = []
+        # the cpu subscriptions are transferred in bulk and copied into buffers preallocated for the entire split
+        inference_result_offloader = InferenceResultBatchOffloader(
+            selector=self.cpu_subscription_selector,
+            accumulator=InferenceResultBatchAccumulator(initial_capacity=len(dataset_loader.dataset)),
+            device=torch.device("cpu"), bulk_size=self.offload_bulk_size)
+        num_batches = len(dataset_loader_iterator)
+        processed_batches = 0
+        # the train split is shared with the trainer, hence, its evaluation must not count as a training pass
+        untracked_passes = dataset_loader.untracked_passes() if isinstance(dataset_loader, DatasetLoader) else nullcontext()
+        with untracked_passes:
+            for batch in dataset_loader_iterator:
+                inference_result_batch = self.forward_batch(dataset_batch=batch, model=model, device=device, postprocessors=post_processors)
+                batch_loss = self._calculate_loss_scores(inference_result_batch, split_loss_funs)
+                batch_losses.append(batch_loss)
+                self._update_streaming_metrics(inference_result_batch, streaming_metrics)
+                if accumulate_results:
+                    # the offload overlaps with the forward pass of the subsequent batches
+                    inference_result_offloader.append(inference_result_batch)
+                processed_batches += 1
+                splits = [d.dataset_tag for _, d in self.dataset_loaders.items()]
+                batch_processed_callback_fun(status="evaluation",
+                                             num_batches=num_batches,
+                                             current_batch=processed_batches,
+                                             splits=splits,
+                                             current_split=dataset_loader.dataset_tag)
+
+        # calc metrics
+        prediction_batch = None
+        if accumulate_results:
+            try:
+                prediction_batch = inference_result_offloader.combine()
+            except BatchStateError as e:
+                raise EvaluationError(f"Error combining inference result batch on split {split_name}.") from e
+
         metric_scores = self._calculate_metric_scores(prediction_batch, split_metrics)
 
         # aggregate losses
@@ -191,7 +220,6 @@ class EvalComponent(EvalComponentIF):
         :returns:
             inference_result_batch (InferenceResultBatch): Prediction performed on the model.
         """
-        model = model.to(device)
         dataset_batch.to(device)
         inference_result_batch = self.inference_component.predict(model, dataset_batch, postprocessors)
         return inference_result_batch
@@ -201,7 +229,7 @@ class EvalComponent(EvalComponentIF):
         Calcualtion of metric scores on the splits of data set.
 
         :params:
-               inference_batch (InferenceResultBatch): Prediction performed on the model.
+               inference_batch (InferenceResultBatch): Prediction performed on the model. Only required for the non-streaming metrics.
                split_metrics (List[Metric]): Metrics for each split of data.
 
         :returns:
@@ -210,11 +238,28 @@ class EvalComponent(EvalComponentIF):
         metric_scores = {}
         for metric in split_metrics:
             try:
-                metric_scores[metric.tag] = [metric(inference_batch)]
+                if isinstance(metric, StreamingMetric):
+                    metric_scores[metric.tag] = [metric.compute()]
+                else:
+                    metric_scores[metric.tag] = [metric(inference_batch)]
             except Exception as e:
                 raise MetricCalculationError(f"Error during calculation of metric {metric.tag}") from e
         return metric_scores
 
+    def _update_streaming_metrics(self, inference_batch: InferenceResultBatch, streaming_metrics: List[StreamingMetric]):
+        """
+        Updates the states of the streaming metrics with the batch.
+
+        :params:
+               inference_batch (InferenceResultBatch): Prediction performed on the model.
+               streaming_metrics (List[StreamingMetric]): Streaming metrics of the split.
+        """
+        for metric in streaming_metrics:
+            try:
+                metric.update(inference_batch)
+            except Exception as e:
+                raise MetricCalculationError(f"Error during update of metric {metric.tag}") from e
+
     def _calculate_loss_scores(self, forward_batch: InferenceResultBatch, split_loss_funs: Dict[str, Loss]) -> Dict[str, List[float]]:
         """
         Calcualtion of loss scores on the splits of data set.
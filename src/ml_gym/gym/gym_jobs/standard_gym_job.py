@@ -89,6 +89,8 @@ class StandardGymJob(AbstractGymJob):
         :params:
             device (torch.device): torch device either CPUs or a specified GPU
         """
+        # the model is placed on the device once per job, before its parameters are registered with the optimizer
+        self.model = self.model.to(device)
         self.optimizer.register_model_params(model_params=dict(self.model.named_parameters()))
         self.lr_scheduler.register_optimizer(optimizer=self.optimizer)
 
@@ -122,8 +124,6 @@ class StandardGymJob(AbstractGymJob):
             model_state = torch.load(model_state_buffer, map_location=device)
             self.model.load_state_dict(model_state)
 
-            self.model = self.model.to(device)
-
             optimizer_state_buffer = self.gs_api_client.get_checkpoint_resource(grid_search_id=self.grid_search_id,
                                                                                 experiment_id=self.experiment_id,
                                                                                 checkpoint_id=self.warm_start_epoch,
@@ -0,0 +1,115 @@
+from contextlib import nullcontext
+from typing import Any, ContextManager, Dict
+import torch
+from ml_gym.error_handling.exception import PrecisionPolicyError
+from ml_gym.gym.stateful_components import StatefulComponent
+from ml_gym.optimizers.optimizer import OptimizerAdapter, OptimizerBundle
+
+
+class MixedPrecisionComponent(StatefulComponent):
+    """
+    Precision policy of the training. The forward pass and the loss calculation run under autocast for the precisions
+    bf16 and fp16. For fp16, the loss is additionally scaled dynamically by a `torch.amp.GradScaler` to prevent
+    underflowing gradients. The state of the scaler (i.e., the current scale) is part of the component's state, such that
+    warm starts resume with the correct scale.
+    """
+
+    class Precision:
+        FP32 = "fp32"
+        BF16 = "bf16"
+        FP16 = "fp16"
+
+    _autocast_dtypes = {Precision.BF16: torch.bfloat16, Precision.FP16: torch.float16}
+
+    def __init__(self, precision: str = Precision.FP32, loss_scaler_params: Dict[str, Any] = None):
+        """
+        :params:
+               precision (str): One of fp32, bf16 and fp16.
+               loss_scaler_params (Dict[str, Any]): Parameters of the `torch.amp.GradScaler` used for fp16,
+                   e.g., `init_scale` and `growth_interval`.
+        """
+        if precision not in [MixedPrecisionComponent.Precision.FP32, MixedPrecisionComponent.Precision.BF16,
+                             MixedPrecisionComponent.Precision.FP16]:
+            raise PrecisionPolicyError(f"Precision {precision} is not supported.")
+        self.precision = precision
+        self.loss_scaler_params = loss_scaler_params if loss_scaler_params is not None else {}
+        # the scaler is created for the device of the training, the checkpointed state is loaded into it on creation
+        self._loss_scaler: "torch.amp.GradScaler" = None
+        self._loss_scaler_state: Dict[str, Any] = None
+
+    @property
+    def uses_autocast(self) -> bool:
+        return self.precision != MixedPrecisionComponent.Precision.FP32
+
+    @property
+    def uses_loss_scaling(self) -> bool:
+        return self.precision == MixedPrecisionComponent.Precision.FP16
+
+    def _get_loss_scaler(self, device: torch.device) -> "torch.amp.GradScaler":
+        if self._loss_scaler is None:
+            if hasattr(torch.amp, "GradScaler"):
+                self._loss_scaler = torch.amp.GradScaler(device.type, **self.loss_scaler_params)
+            else:
+                # torch < 2.3 only provides the CUDA scaler, which disables itself on other devices
+                self._loss_scaler = torch.cuda.amp.GradScaler(**self.loss_scaler_params)
+            if self._loss_scaler_state is not None:
+                self._loss_scaler.load_state_dict(self._loss_scaler_state)
+                self._loss_scaler_state = None
+        return self._loss_scaler
+
+    def autocast(self, device: torch.device) -> ContextManager:
+        """
+        Returns the autocast context of the forward pass and the loss calculation.
+
+        :params:
+               device (torch.device): Device of the training.
+
+        :returns:
+            ContextManager: Autocast context or a no-op context for fp32.
+        """
+        if not self.uses_autocast:
+            return nullcontext()
+        return torch.autocast(device_type=device.type, dtype=MixedPrecisionComponent._autocast_dtypes[self.precision])
+
+    def backward(self, loss: torch.Tensor, device: torch.device):
+        """
+        Computes the gradients of the (scaled) loss.
+
+        :params:
+               loss (torch.Tensor): Scalar loss.
+               device (torch.device): Device of the training.
+        """
+        if self.uses_loss_scaling:
+            loss = self._get_loss_scaler(device).scale(loss)
+        loss.backward()
+
+    def step(self, optimizer: OptimizerAdapter, device: torch.device):
+        """
+        Performs an optimizer step. For fp16, the gradients are unscaled beforehand, steps with infinite or NaN gradients
+        are skipped and the scale is updated afterwards.
+
+        :params:
+               optimizer (OptimizerAdapter): Optimizer of the model.
+               device (torch.device): Device of the training.
+        """
+        if not self.uses_loss_scaling:
+            optimizer.step()
+            return
+        loss_scaler = self._get_loss_scaler(device)
+        optimizers = optimizer.optimizers.values() if isinstance(optimizer, OptimizerBundle) else [optimizer]
+        for sub_optimizer in optimizers:
+            loss_scaler.step(sub_optimizer)
+        loss_scaler.update()
+
+    def get_state(self) -> Dict[str, Any]:
+        if self._loss_scaler is not None:
+            return {"loss_scaler": self._loss_scaler.state_dict()}
+        return {"loss_scaler": self._loss_scaler_state} if self._loss_scaler_state is not None else {}
+
+    def set_state(self, state: Dict[str, Any]):
+        if "loss_scaler" not in state:
+            return
+        if self._loss_scaler is not None:
+            self._loss_scaler.load_state_dict(state["loss_scaler"])
+        else:
+            self._loss_scaler_state = state["loss_scaler"]
@@ -14,7 +14,7 @@ class StatefulComponent(ABC):
         for attr in dir(self):
             if attr.startswith('__'):
                 continue
-            if self._is_stateful_attribute(attr):
+            if self._is_stateful_attribute(attr) and str(attr) in state:
                 attr_reference = getattr(self, attr)
                 attr_reference.set_state(state[str(attr)])
             elif self._is_list_attribute(attr) and str(attr) in state:
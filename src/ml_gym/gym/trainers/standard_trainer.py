@@ -1,14 +1,17 @@
 from itertools import chain
-from typing import Iterable, List, Callable
+from typing import Iterable, List, Callable, Tuple
 from ml_gym.loss_functions.loss_functions import Loss
 from ml_gym.models.nn.net import NNModel
 from ml_gym.data_handling.dataset_loader import DatasetLoader
+from ml_gym.data_handling.prefetching import BatchPrefetcher
 import torch
 from ml_gym.batching.batch import DatasetBatch
 from ml_gym.gym.inference_component import InferenceComponent
+from ml_gym.gym.mixed_precision_component import MixedPrecisionComponent
 from ml_gym.gym.stateful_components import StatefulComponent
 from ml_gym.optimizers.optimizer import OptimizerAdapter
 from ml_gym.gym.post_processing import PredictPostProcessingIF
+from functools import partial
 import numpy as np
 
 
@@ -18,32 +21,69 @@ class TrainComponent(StatefulComponent):
     """
 
     def __init__(self, inference_component: InferenceComponent, post_processors: List[PredictPostProcessingIF],
-                 loss_fun: Loss):
+                 loss_fun: Loss, mixed_precision_component: MixedPrecisionComponent = None, gradient_accumulation_steps: int = 1,
+                 set_grads_to_none: bool = True, prefetch_depth: int = 2):
+        """
+        :params:
+               inference_component (InferenceComponent): Performs the forward pass.
+               post_processors (List[PredictPostProcessingIF]): Post processors applied to the predictions.
+               loss_fun (Loss): Train loss function.
+               mixed_precision_component (MixedPrecisionComponent): Precision policy, fp32 if not given.
+               gradient_accumulation_steps (int): Number of batches whose gradients are accumulated per optimizer step.
+               set_grads_to_none (bool): Whether the gradients are released instead of zeroed before each optimizer step.
+               prefetch_depth (int): Number of batches assembled and transferred ahead in the background (see
+                   `BatchPrefetcher`). 0 disables the background prefetching.
+        """
         self.loss_fun = loss_fun
         self.inference_component = inference_component
         self.post_processors = post_processors
+        self.mixed_precision_component = mixed_precision_component if mixed_precision_component is not None else MixedPrecisionComponent()
+        self.gradient_accumulation_steps = gradient_accumulation_steps
+        self.set_grads_to_none = set_grads_to_none
+        self.prefetch_depth = prefetch_depth
 
-    def _train_batch(self, batch: DatasetBatch, model: NNModel, optimizer: OptimizerAdapter, device: torch.device):
+    def _train_batch(self, batch: DatasetBatch, model: NNModel, optimizer: OptimizerAdapter, device: torch.device,
+                     accumulation_step: int = 0, num_accumulation_steps: int = 1):
         """
-        Train torch NN Model with a batch.
+        Train torch NN Model with a batch. With gradient accumulation, the gradients are reset before the first
+        and the optimizer steps after the last batch of the accumulation. The model is expected to be placed on the
+        device already (see `train`).
 
         :params:
                batch (DatasetBatch): Train Dataset
                model (NNModel): Torch Neural Network module.
                optimizer (OptimizerAdapter): Object of OptimizerAdapter used to initaite optimizer for model.
                device (torch.device): Torch device either CPUs or a specified GPU.
+               accumulation_step (int): Index of the batch within the gradient accumulation.
+               num_accumulation_steps (int): Number of batches whose gradients are accumulated.
 
         :returns:
             model (NNModel): Torch Neural Network module.
         """
-        model = model.to(device)
         batch.to(device)
-        model.zero_grad()
-        loss = self.calc_loss(model, batch)
-        loss.sum().backward()
-        optimizer.step()
+        if accumulation_step == 0:
+            model.zero_grad(set_to_none=self.set_grads_to_none)
+        if num_accumulation_steps == 1 and not self.mixed_precision_component.uses_autocast:
+            # fast path for fp32 without gradient accumulation
+            loss = self.calc_loss(model, batch)
+            loss.sum().backward()
+            optimizer.step()
+            return model
+        with self.mixed_precision_component.autocast(device):
+            loss = self.calc_loss(model, batch)
+        # the gradients of the accumulated batches are averaged
+        self.mixed_precision_component.backward(loss.sum() / num_accumulation_steps, device)
+        if accumulation_step == num_accumulation_steps - 1:
+            self.mixed_precision_component.step(optimizer, device)
         return model
 
+    def _get_accumulation_step(self, batch_id: int, num_batches_per_epoch: int) -> Tuple[int, int]:
+        # gradients are not accumulated across epoch boundaries, i.e., the last accumulation of an epoch may be shorter
+        batch_index = batch_id % num_batches_per_epoch
+        accumulation_start = batch_index - batch_index % self.gradient_accumulation_steps
+        num_accumulation_steps = min(self.gradient_accumulation_steps, num_batches_per_epoch - accumulation_start)
+        return batch_index - accumulation_start, num_accumulation_steps
+
     @staticmethod
     def _prepare_data_loader_stack(dataloader: DatasetLoader, num_epochs: int, initial_epoch: int,
                                    num_batches_per_epoch: int) -> Iterable:
@@ -59,13 +99,23 @@ class TrainComponent(StatefulComponent):
             np.ceil(num_total_batches/len(dataloader))) - skip_num_dataloaders
 
         data_loaders = chain(*([dataloader]*num_dataloaders))
-        data_loader_iterable = iter(
-            zip(range(num_total_batches), data_loaders))
 
-        # fast forward to the batch index that we left off in case of a warm start
-        for _ in range(current_batch_index):
-            next(data_loader_iterable)
-        return data_loader_iterable
+        if isinstance(dataloader, DatasetLoader):
+            # in case of a warm start, the loader directly continues at the batch index that we left off,
+            # such that the skipped batches are never loaded
+            dataloader.resume(num_passes=skip_num_dataloaders, start_batch=current_batch_index)
+        else:
+            # fast forward to the batch index that we left off in case of a warm start
+            for _ in range(current_batch_index):
+                next(data_loaders)
+
+        # batch ids are relative to the initial epoch
+        num_remaining_batches = num_total_batches - initial_epoch * num_batches_per_epoch
+        return iter(zip(range(num_remaining_batches), data_loaders))
+
+    @staticmethod
+    def _is_epoch_end(item: Tuple[int, DatasetBatch], num_batches_per_epoch: int) -> bool:
+        return (item[0] + 1) % num_batches_per_epoch == 0
 
     def train(self, model: NNModel, optimizer: OptimizerAdapter, dataloader: DatasetLoader, device: torch.device,
               batch_done_callback_fun: Callable, epoch_done_callback_fun: Callable,
@@ -87,6 +137,8 @@ class TrainComponent(StatefulComponent):
         :returns:
             model (NNModel): Torch Neural Network module.
         """
+        # the model is placed once instead of per batch, as `Module.to` walks all parameters and buffers
+        model = model.to(device)
         model.train()
         num_batches_per_epoch = num_batches_per_epoch if num_batches_per_epoch is not None else len(
             dataloader)
@@ -94,12 +146,17 @@ class TrainComponent(StatefulComponent):
                                                                         num_epochs=num_epochs,
                                                                         initial_epoch=initial_epoch,
                                                                         num_batches_per_epoch=num_batches_per_epoch)
+        if self.prefetch_depth > 0:
+            dataloader_iterable = BatchPrefetcher(dataloader_iterable, device=device, depth=self.prefetch_depth,
+                                                  is_epoch_end_fun=partial(TrainComponent._is_epoch_end,
+                                                                           num_batches_per_epoch=num_batches_per_epoch))
 
         for batch_id, batch in dataloader_iterable:
             current_epoch = initial_epoch + \
                 int(batch_id / num_batches_per_epoch)
-            model = self._train_batch(
-                batch=batch, model=model, optimizer=optimizer, device=device)
+            accumulation_step, num_accumulation_steps = self._get_accumulation_step(batch_id, num_batches_per_epoch)
+            model = self._train_batch(batch=batch, model=model, optimizer=optimizer, device=device,
+                                      accumulation_step=accumulation_step, num_accumulation_steps=num_accumulation_steps)
 
             batch_done_callback_fun(status="train",
                                     num_batches=num_batches_per_epoch,
@@ -133,9 +190,10 @@ class TrainComponent(StatefulComponent):
         return loss
 
 
-class Trainer:
+class Trainer(StatefulComponent):
     """
     Trainer class contains functions used to train the torch Neural Net model on CPU.
+    The state of the train loader (see `DatasetLoader.get_state`) is checkpointed along with the train component.
     """
 
     def __init__(self, train_component: TrainComponent, train_loader: DatasetLoader):
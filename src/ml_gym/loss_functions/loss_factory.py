@@ -10,7 +10,8 @@ class LossFactory:
 
     @staticmethod
     def get_lp_loss(target_subscription_key: str, prediction_subscription_key: str, root: int = 1, exponent: int = 2,
-                    class_selection_fun_params: Dict = None, average_batch_loss: bool = True, tag: str = "") -> Loss:
+                    class_selection_fun_params: Dict = None, average_batch_loss: bool = True, tag: str = "",
+                    sample_selection_fun_config: Dict = None) -> Loss:
         """
         Get Lp Loss object from params. 
 
@@ -22,12 +23,16 @@ class LossFactory:
                class_selection_fun_params (Dict): TO DO
                average_batch_loss (bool): Average Loss value for the batch of data.
                tag (str): Label to be tagged with the loss object. 
+               sample_selection_fun_config (Dict): Config of a sample selection function (see `BatchFilter.get_selection_fun`).
 
         :returns:
             LPLoss: Object of LPLoss.
         """
-        sample_selection_fun = BatchFilter.get_class_selection_fun(
-            **class_selection_fun_params) if class_selection_fun_params is not None else None
+        if sample_selection_fun_config is not None:
+            sample_selection_fun = BatchFilter.get_selection_fun(sample_selection_fun_config)
+        else:
+            sample_selection_fun = BatchFilter.get_class_selection_fun(
+                **class_selection_fun_params) if class_selection_fun_params is not None else None
         return LPLoss(target_subscription_key, prediction_subscription_key, root, exponent, sample_selection_fun, tag, average_batch_loss)
 
     # @staticmethod
@@ -3,7 +3,7 @@ import torch
 import torch.nn as nn
 from ml_gym.loss_functions.loss_scaler import MeanScaler
 from ml_gym.batching.batch import InferenceResultBatch
-from typing import List, Callable
+from typing import Hashable, List, Callable, Tuple
 from ml_gym.gym.stateful_components import StatefulComponent
 import torch.nn.functional as F
 from ml_gym.error_handling.exception import InvalidTensorFormatError
@@ -39,12 +39,44 @@ class Loss(ABC):
         raise NotImplementedError
 
 
-class LPLoss(Loss):
+class GatheringLossMixin(ABC):
+    """
+    Splits the loss calculation into gathering the targets and predictions from the batch and calculating the loss from
+    the gathered tensors. Loss terms of a `MultiLoss` with the same gathering key gather the tensors only once.
+    """
+    # dtype the targets are converted to while gathering, None if the targets are not converted
+    target_dtype: torch.dtype = None
+
+    def get_gathering_key(self) -> Hashable:
+        return self.target_subscription_key, self.prediction_subscription_key, self.target_dtype
+
+    def gather(self, inference_result_batch: InferenceResultBatch) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Gathers the targets and predictions of the loss.
+
+        :params:
+            inference_result_batch (InferenceResultBatch): Batch of targets and predictions.
+        :returns:
+            Tuple[torch.Tensor, torch.Tensor]: Targets and predictions.
+        """
+        t = inference_result_batch.get_targets(self.target_subscription_key)
+        p = inference_result_batch.get_predictions(self.prediction_subscription_key)
+        return t if self.target_dtype is None else t.to(self.target_dtype), p
+
+    @abstractmethod
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+    def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
+        return self.calc_loss_from_tensors(*self.gather(inference_result_batch))
+
+
+class LPLoss(GatheringLossMixin, Loss):
     """
     TO DO
     """
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, root: int = 1, exponent: int = 2,
-                 sample_selection_fun: Callable[[InferenceResultBatch], List[bool]] = None,
+                 sample_selection_fun: Callable[[InferenceResultBatch], torch.Tensor] = None,
                  tag: str = "", average_batch_loss: bool = True, avg_per_feature_loss: bool = False):
         super().__init__(tag)
         self.root = root
@@ -55,10 +87,12 @@ class LPLoss(Loss):
         self.average_batch_loss = average_batch_loss
         self.avg_per_feature_loss = avg_per_feature_loss
 
-    def __call__(self, forward_batch: InferenceResultBatch) -> torch.Tensor:
+    def get_gathering_key(self) -> Hashable:
+        return super().get_gathering_key() + (self.sample_selection_fun,)
+
+    def gather(self, forward_batch: InferenceResultBatch) -> Tuple[torch.Tensor, torch.Tensor]:
         # here: predictions are reconstructions and targets are the input vectors
-        t = forward_batch.get_targets(self.target_subscription_key)
-        p = forward_batch.get_predictions(self.prediction_subscription_key)
+        t, p = super().gather(forward_batch)
         if t.shape != p.shape:
             raise InvalidTensorFormatError
 
@@ -66,6 +100,9 @@ class LPLoss(Loss):
             sample_selection_mask = self.sample_selection_fun(forward_batch)
             t = t[sample_selection_mask]
             p = p[sample_selection_mask]
+        return t, p
+
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
         loss_values = (torch.sum((p - t).abs() ** self.exponent, dim=1) ** (1 / self.root))
         if self.average_batch_loss:
             loss_values = torch.sum(loss_values)/len(loss_values)
@@ -98,10 +135,11 @@ class LPLoss(Loss):
     #     self.scaler.train(loss_tensor)
 
 
-class CrossEntropyLoss(Loss):
+class CrossEntropyLoss(GatheringLossMixin, Loss):
     """
     Class to perform Cross Entropy Loss on parameters.
     """
+    target_dtype = torch.long
 
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, tag: str = "", average_batch_loss: bool = True):
         super().__init__(tag)
@@ -109,40 +147,39 @@ class CrossEntropyLoss(Loss):
         self.prediction_subscription_key: str = prediction_subscription_key
         self.average_batch_loss = average_batch_loss
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
         # the targets tensor has each target in a separate tensor torch.Tensor([[1], [2], ..., [1]).
         # For the CrossEntropyLoss API we need them to be squeezed torch.Tensor([1, 2, ..., 1])
-        t = inference_result_batch.get_targets(self.target_subscription_key).long()
-        p = inference_result_batch.get_predictions(self.prediction_subscription_key)
         loss_values = nn.CrossEntropyLoss(reduction="none")(p, t.flatten())
         if self.average_batch_loss:
             loss_values = torch.sum(loss_values)/len(loss_values)
         return loss_values
 
 
-class NLLLoss(Loss):
+class NLLLoss(GatheringLossMixin, Loss):
     """The negative log likelihood loss.
     NOTE: Obtaining log-probabilities in a neural network is easily achieved by adding a LogSoftmax layer 
     in the last layer of your network. Here, we already did this implicitly in the loss function. 
     Therefore, this loss function is equivalent to CrossEntropyLoss"""
+    target_dtype = torch.long
 
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, tag: str = ""):
         super().__init__(tag)
         self.target_subscription_key: str = target_subscription_key
         self.prediction_subscription_key: str = prediction_subscription_key
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
-        t = inference_result_batch.get_targets(self.target_subscription_key).long()
-        p = inference_result_batch.get_predictions(self.prediction_subscription_key)
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
         p = F.log_softmax(p, dim=1)
         loss_values = nn.NLLLoss(reduction="none")(p, t)
         return loss_values
 
 
-class BCEWithLogitsLoss(Loss):
+class BCEWithLogitsLoss(GatheringLossMixin, Loss):
     """
     Class to perform BCE With Logits Loss (cross entropy loss that comes inside a sigmoid function) from parameters.
     """
+    target_dtype = torch.float
+
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, tag: str = "", average_batch_loss: bool = True,
                  flatten_predictions: bool = False):
         super().__init__(tag)
@@ -152,11 +189,7 @@ class BCEWithLogitsLoss(Loss):
         self.flatten_predictions = flatten_predictions
         self.loss_fun = nn.BCEWithLogitsLoss(reduction="none")
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
-        t = inference_result_batch.get_targets(
-            self.target_subscription_key).float()  # .flatten()
-        p = inference_result_batch.get_predictions(
-            self.prediction_subscription_key)  # .flatten()
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
         if self.flatten_predictions:
             p = p.flatten()
         loss_values = self.loss_fun(p, t)
@@ -165,9 +198,10 @@ class BCEWithLogitsLoss(Loss):
         return loss_values
 
 
-class BCELoss(Loss):
+class BCELoss(GatheringLossMixin, Loss):
     """ NOTE, that this loss is numerically less stable than BCEWithLogitsLoss
     """
+    target_dtype = torch.float
 
     def __init__(self, target_subscription_key: str, prediction_subscription_key: str, tag: str = "", average_batch_loss: bool = True):
         super().__init__(tag)
@@ -175,10 +209,7 @@ class BCELoss(Loss):
         self.prediction_subscription_key: str = prediction_subscription_key
         self.average_batch_loss = average_batch_loss
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> torch.Tensor:
-        t = inference_result_batch.get_targets(
-            self.target_subscription_key).float()  # .flatten()
-        p = inference_result_batch.get_predictions(self.prediction_subscription_key)  # .flatten()
+    def calc_loss_from_tensors(self, t: torch.Tensor, p: torch.Tensor) -> torch.Tensor:
         loss_values = nn.BCELoss(reduction="none")(p, t)
         if self.average_batch_loss:
             loss_values = torch.sum(loss_values)/len(loss_values)
@@ -1,7 +1,7 @@
 from abc import abstractmethod
 import torch
 from ml_gym.gym.stateful_components import StatefulComponent
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 class Scaler(StatefulComponent):
@@ -10,14 +10,38 @@ class Scaler(StatefulComponent):
     def train(self, loss: torch.Tensor):
         raise NotImplementedError
 
+    @abstractmethod
+    def warm_up(self, loss: torch.Tensor):
+        """
+        Accumulates the statistics of the loss of a warm-up batch.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish_warmup(self):
+        """
+        Trains the scaler on the statistics accumulated by `warm_up`.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def scale(self, tensor: torch.Tensor) -> torch.Tensor:
         raise NotImplementedError
 
+    def get_scale_factor(self) -> Optional[float]:
+        """
+        Returns the factor, if the scaling is a multiplication by a constant factor, such that the scaling of multiple loss
+        terms can be fused into a single operation (see `MultiLoss`), or None otherwise.
+        """
+        return None
+
 
 class MeanScaler(Scaler):
     def __init__(self):
         self._mean = 1
+        # running statistics of the warm-up losses, which are accumulated in place instead of keeping the loss tensors
+        self._warmup_loss_sum: torch.Tensor = None
+        self._warmup_loss_count = 0
 
     @property
     def mean(self) -> float:
@@ -33,6 +57,23 @@ class MeanScaler(Scaler):
     def train(self, loss: torch.Tensor):
         self._mean = torch.mean(loss).item()
 
+    def warm_up(self, loss: torch.Tensor):
+        loss = loss.detach()
+        if self._warmup_loss_sum is None:
+            self._warmup_loss_sum = torch.zeros((), dtype=torch.float64, device=loss.device)
+        # the sum stays on the device of the loss, i.e., the warm-up does not synchronise with the host
+        self._warmup_loss_sum.add_(loss.sum(dtype=torch.float64))
+        self._warmup_loss_count += loss.numel()
+
+    def finish_warmup(self):
+        if self._warmup_loss_count > 0:
+            self._mean = (self._warmup_loss_sum / self._warmup_loss_count).item()
+        self._warmup_loss_sum = None
+        self._warmup_loss_count = 0
+
+    def get_scale_factor(self) -> Optional[float]:
+        return 1 / self._mean if self._mean != 0 else None
+
     def get_state(self) -> Dict[str, Any]:
         state = super().get_state()
         state["mean"] = self.mean
@@ -52,3 +93,12 @@ class NoScaler(Scaler):
 
     def train(self, loss: torch.Tensor):
         pass
+
+    def warm_up(self, loss: torch.Tensor):
+        pass
+
+    def finish_warmup(self):
+        pass
+
+    def get_scale_factor(self) -> Optional[float]:
+        return 1.0
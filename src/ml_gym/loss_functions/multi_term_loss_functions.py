@@ -1,5 +1,5 @@
-from typing import List
-from ml_gym.loss_functions.loss_functions import Loss, LossWarmupMixin
+from typing import Hashable, List, Tuple
+from ml_gym.loss_functions.loss_functions import GatheringLossMixin, Loss, LossWarmupMixin
 from ml_gym.loss_functions.loss_scaler import Scaler
 from ml_gym.batching.batch import InferenceResultBatch
 import torch
@@ -8,32 +8,38 @@ import torch
 class MultiLoss(LossWarmupMixin, Loss):
     """
     Multi Term Loss Function Class.
+
+    In the fused mode, loss terms with the same gathering key (see `GatheringLossMixin`) gather their targets and predictions
+    only once and the scaling and weighting of the loss terms is applied as a single operation on the stacked loss tensors,
+    if all scalers scale by a constant factor.
     """
     def __init__(self, tag: str, scalers: List[Scaler],
-                 loss_terms: List[Loss], loss_weights: List[float]):
+                 loss_terms: List[Loss], loss_weights: List[float], fused: bool = True):
         LossWarmupMixin.__init__(self)
         Loss.__init__(self, tag)
         self.loss_terms = loss_terms
         self.scalers = scalers
         self.loss_weights = loss_weights
-        self.warmup_losses = []
+        self.fused = fused
+        # factors of the fused scaling and weighting along with their device, dtype and values
+        self._loss_factors: Tuple[Hashable, torch.Tensor] = None
 
-    # def warm_up(self, forward_batch: InferenceResultBatch) -> torch.Tensor:
-    #     loss_tensors = self._calc_loss(forward_batch)
-    #     self.warmup_losses.append(loss_tensors)
-    #     for loss_term in self.loss_terms:
-    #         if isinstance(loss_term, LossWarmupMixin):
-    #             loss_term.warm_up(forward_batch)
-    #     return torch.cat(loss_tensors).sum()
+    def warm_up(self, forward_batch: InferenceResultBatch) -> torch.Tensor:
+        loss_tensors = self._calc_loss(forward_batch)
+        for scaler, loss_tensor in zip(self.scalers, loss_tensors):
+            scaler.warm_up(loss_tensor)
+        for loss_term in self.loss_terms:
+            if isinstance(loss_term, LossWarmupMixin):
+                loss_term.warm_up(forward_batch)
+        return torch.stack([loss_tensor.sum() for loss_tensor in loss_tensors]).sum()
 
-    # def finish_warmup(self):
-    #     combined_batch_warmup_losses = [torch.cat(loss_term_loss) for loss_term_loss in zip(*self.warmup_losses)]
-    #     for i in range(len(self.loss_terms)):
-    #         self.scalers[i].train(combined_batch_warmup_losses[i])
+    def finish_warmup(self):
+        for scaler in self.scalers:
+            scaler.finish_warmup()
 
-    #     for loss_term in self.loss_terms:
-    #         if isinstance(loss_term, LossWarmupMixin):
-    #             loss_term.finish_warmup()
+        for loss_term in self.loss_terms:
+            if isinstance(loss_term, LossWarmupMixin):
+                loss_term.finish_warmup()
 
     def _scale(self, loss_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
         return [self.scalers[i].scale(tensor) for i, tensor in enumerate(loss_tensors)]
@@ -42,10 +48,41 @@ class MultiLoss(LossWarmupMixin, Loss):
         return [tensor * self.loss_weights[i] for i, tensor in enumerate(loss_tensors)]
 
     def _calc_loss(self, forward_batch: InferenceResultBatch) -> List[torch.Tensor]:
-        return [loss_term(forward_batch) for loss_term in self.loss_terms]
+        if not self.fused:
+            return [loss_term(forward_batch) for loss_term in self.loss_terms]
+        gathered_tensors = {}
+        loss_tensors = []
+        for loss_term in self.loss_terms:
+            if isinstance(loss_term, GatheringLossMixin):
+                gathering_key = loss_term.get_gathering_key()
+                if gathering_key not in gathered_tensors:
+                    gathered_tensors[gathering_key] = loss_term.gather(forward_batch)
+                loss_tensors.append(loss_term.calc_loss_from_tensors(*gathered_tensors[gathering_key]))
+            else:
+                loss_tensors.append(loss_term(forward_batch))
+        return loss_tensors
+
+    def _get_loss_factors(self, scale_factors: List[float], stacked_loss_tensor: torch.Tensor) -> torch.Tensor:
+        # the factors are only copied to the device, when the scalers or the device change
+        factors = tuple(scale_factor * loss_weight for scale_factor, loss_weight in zip(scale_factors, self.loss_weights))
+        key = (stacked_loss_tensor.device, stacked_loss_tensor.dtype, factors)
+        if self._loss_factors is None or self._loss_factors[0] != key:
+            self._loss_factors = key, torch.tensor(factors, dtype=stacked_loss_tensor.dtype, device=stacked_loss_tensor.device)
+        return self._loss_factors[1]
+
+    def _calc_fused_loss(self, loss_tensors: List[torch.Tensor]) -> torch.Tensor:
+        scale_factors = [scaler.get_scale_factor() for scaler in self.scalers]
+        if any(scale_factor is None for scale_factor in scale_factors):
+            loss_tensors = self._scale(loss_tensors)
+            scale_factors = [1.0] * len(loss_tensors)
+        stacked_loss_tensor = torch.stack(loss_tensors)
+        # weighted sum over the loss terms
+        return torch.tensordot(self._get_loss_factors(scale_factors, stacked_loss_tensor), stacked_loss_tensor, dims=1)
 
     def __call__(self, eval_batch: InferenceResultBatch) -> torch.Tensor:
         loss_tensors = self._calc_loss(eval_batch)
+        if self.fused:
+            return self._calc_fused_loss(loss_tensors)
         loss_tensors = self._scale(loss_tensors)
         loss_tensors = self._apply_loss_weights(loss_tensors)
         loss_tensor = torch.stack(loss_tensors).sum(dim=0)
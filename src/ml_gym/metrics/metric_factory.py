@@ -1,7 +1,7 @@
 from typing import Callable, Dict, Any, List
 from functools import partial
 from ml_gym.metrics.metrics import BinaryClasswiseExpectedCalibrationErrorMetric, PredictionMetric, BrierScoreMetric, \
-    ClassSpecificExpectedCalibrationErrorMetric, RecallAtKMetric, AreaUnderRecallAtKMetric
+    ClassSpecificExpectedCalibrationErrorMetric, RecallAtKMetric, AreaUnderRecallAtKMetric, StreamingPredictionMetric
 
 from ml_gym.batching.batch import InferenceResultBatch
 
@@ -14,6 +14,22 @@ class MetricFactory:
             params = {}
         return partial(PredictionMetric, identifier=metric_key, metric_fun=metric_fun, **params)
 
+    @staticmethod
+    def get_streaming_sklearn_metric(metric_key: str, metric_fun: Callable, params: Dict = None) -> Callable[[InferenceResultBatch], Any]:
+        """
+        Get a streaming sklearn metric, whose state is updated batch-wise during evaluation.
+        :params:
+                metric_key (str): Identifier of the metric.
+                metric_fun (Callable): Metric function supporting the `sample_weight` argument.
+                params (Dict): Default constructor parameters, e.g., `num_bins` for binning the prediction scores.
+
+        :returns:
+            Partially initialized StreamingPredictionMetric.
+        """
+        if params is None:
+            params = {}
+        return partial(StreamingPredictionMetric, identifier=metric_key, metric_fun=metric_fun, **params)
+
     @staticmethod
     def get_brier_score_metric_fun(tag: str,
                                    prediction_subscription_key: str,
@@ -1,10 +1,11 @@
-from typing import Callable, Dict, Any, Union, List
+from collections import Counter
+from typing import Callable, Dict, Any, Union, List, Tuple
 import torch
 from sklearn.metrics import roc_auc_score, average_precision_score, auc
 from ml_gym.batching.batch import InferenceResultBatch
+from ml_gym.error_handling.exception import MetricCalculationError
 from abc import ABC, abstractmethod
 import numpy as np
-from torch import nn
 
 
 def binary_auroc_score(y_true: torch.Tensor, y_pred: torch.Tensor, **params: Dict[str, Any]) -> float:
@@ -55,6 +56,67 @@ class Metric(MetricIF):
         raise NotImplementedError
 
 
+class StreamingMetric(Metric):
+    """
+    Metric that is computed from a compact, mergeable state instead of the predictions and targets of the entire split.
+    The evaluator resets the state at the beginning of each split, updates it with every inference result batch and computes
+    the score at the end. Calling the metric on a batch computes the score of that batch alone and leaves the state untouched.
+    """
+    state: Any = None
+
+    @abstractmethod
+    def _get_initial_state(self) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _update_state(self, state: Any, result_batch: InferenceResultBatch) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _merge_states(self, state: Any, other_state: Any) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _compute_state(self, state: Any) -> Any:
+        raise NotImplementedError
+
+    def _get_state(self) -> Any:
+        return self.state if self.state is not None else self._get_initial_state()
+
+    def reset(self):
+        self.state = None
+
+    def update(self, result_batch: InferenceResultBatch):
+        """
+        Updates the metric state with the given batch.
+
+        :params:
+            result_batch (InferenceResultBatch): Inference result batch, which may reside on any device.
+        """
+        self.state = self._update_state(self._get_state(), result_batch)
+
+    def merge(self, other: "StreamingMetric"):
+        """
+        Merges the state of another instance of this metric, e.g., computed by another worker on a disjoint part of the split.
+
+        :params:
+            other (StreamingMetric): Metric of the same type and configuration.
+        """
+        self.state = self._merge_states(self._get_state(), other._get_state())
+
+    def compute(self) -> Any:
+        """
+        Computes the metric score from the current state.
+
+        :returns:
+            score (Any): Metric score.
+        """
+        return self._compute_state(self._get_state())
+
+    def __call__(self, result_batch: InferenceResultBatch) -> Any:
+        return self._compute_state(self._update_state(self._get_initial_state(), result_batch))
+
+
 class PredictionMetric(Metric):
     """
     Class to get all parameters for calculating Metrics.
@@ -74,7 +136,75 @@ class PredictionMetric(Metric):
         return self.metric_fun(y_true=y_true, y_pred=y_pred, **self.params)
 
 
-class ClassSpecificExpectedCalibrationErrorMetric(Metric):
+class StreamingPredictionMetric(StreamingMetric, PredictionMetric):
+    """
+    Streaming variant of `PredictionMetric` for metric functions supporting `sample_weight`, e.g., the sklearn classification metrics.
+    The state counts the occurrences of each (target, prediction) pair, i.e., it is a confusion matrix for class predictions.
+    If `num_bins` is given, the prediction scores in [0, 1] are quantized to the centers of equally sized bins beforehand,
+    which approximates score based metrics such as AUROC and AUPR at the resolution of the bins.
+
+    Only 1-D targets and predictions are counted. Any other inputs (e.g., multilabel indicator matrices) are accumulated
+    and passed to the metric function as a whole, as done by `PredictionMetric`.
+    """
+
+    def __init__(self, tag: str, identifier: str, target_subscription_key: str, prediction_subscription_key: str,
+                 metric_fun: Callable, params: Dict[str, Any] = None, num_bins: int = None):
+        super().__init__(tag=tag, identifier=identifier, target_subscription_key=target_subscription_key,
+                         prediction_subscription_key=prediction_subscription_key, metric_fun=metric_fun, params=params)
+        self.num_bins = num_bins
+
+    @staticmethod
+    def _is_streamable(tensor: torch.Tensor) -> bool:
+        # column vectors are treated as 1-D, as done by sklearn
+        return tensor.dim() == 1 or (tensor.dim() == 2 and tensor.shape[1] == 1)
+
+    def _get_initial_state(self) -> Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        # pair counts of the streamed batches and the targets and predictions of the accumulated batches
+        return Counter(), []
+
+    def _update_state(self, state: Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]],
+                      result_batch: InferenceResultBatch) -> Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        pair_counts_state, accumulated = state
+        y_true = result_batch.get_targets(self.target_subscription_key)
+        y_pred = result_batch.get_predictions(self.prediction_subscription_key).detach()
+        if not (self._is_streamable(y_true) and self._is_streamable(y_pred)):
+            return pair_counts_state, accumulated + [(y_true.cpu(), y_pred.cpu())]
+        y_true, y_pred = y_true.flatten(), y_pred.flatten()
+        if self.num_bins is not None:
+            bin_indices = (y_pred.clamp(0, 1) * self.num_bins).floor().clamp(max=self.num_bins - 1)
+            y_pred = (bin_indices + 0.5) / self.num_bins
+        # counts the pairs on the device, such that only the distinct pairs are transferred to the host
+        true_values, true_indices = torch.unique(y_true, return_inverse=True)
+        pred_values, pred_indices = torch.unique(y_pred, return_inverse=True)
+        pair_counts = torch.bincount(true_indices * len(pred_values) + pred_indices,
+                                     minlength=len(true_values) * len(pred_values))
+        pair_indices = torch.nonzero(pair_counts).flatten()
+        true_values = true_values[pair_indices // len(pred_values)].tolist()
+        pred_values = pred_values[pair_indices % len(pred_values)].tolist()
+        pair_counts_state = Counter(pair_counts_state)
+        pair_counts_state.update(dict(zip(zip(true_values, pred_values), pair_counts[pair_indices].tolist())))
+        return pair_counts_state, accumulated
+
+    def _merge_states(self, state: Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]],
+                      other_state: Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]]) -> Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        return state[0] + other_state[0], state[1] + other_state[1]
+
+    def _compute_state(self, state: Tuple[Counter, List[Tuple[torch.Tensor, torch.Tensor]]]) -> float:
+        pair_counts_state, accumulated = state
+        if len(accumulated) > 0:
+            if len(pair_counts_state) > 0:
+                raise MetricCalculationError(f"Metric {self.tag} received 1-D and multi-dimensional targets or predictions.")
+            y_true = torch.cat([y_true for y_true, _ in accumulated])
+            y_pred = torch.cat([y_pred for _, y_pred in accumulated])
+            return self.metric_fun(y_true=y_true, y_pred=y_pred, **self.params)
+        pairs = list(pair_counts_state.keys())
+        y_true = np.array([pair[0] for pair in pairs])
+        y_pred = np.array([pair[1] for pair in pairs])
+        sample_weight = np.array([pair_counts_state[pair] for pair in pairs])
+        return self.metric_fun(y_true=y_true, y_pred=y_pred, sample_weight=sample_weight, **self.params)
+
+
+class ClassSpecificExpectedCalibrationErrorMetric(StreamingMetric):
     """
     Class to calculate a Metric having Specific Expected Callibration Error 
     """
@@ -89,35 +219,36 @@ class ClassSpecificExpectedCalibrationErrorMetric(Metric):
         self.bins = np.linspace(0, 1, self.num_bins+1)[1:-1]
         self.sum_up_bins = sum_up_bins
 
-    def _calc_prevalence(self, y_true: torch.Tensor) -> torch.Tensor:
-        # all positive samples / total population (within a single bin)
-        return torch.sum(y_true == self.class_label)/float(len(y_true))
-
-    def _calc_confidence(self, y_pred: torch.Tensor) -> torch.Tensor:
-        # average confidence over all samples
-        return torch.sum(y_pred) / len(y_pred)
-
-    def _calc_calibration_error(self, y_true: torch.Tensor, y_pred: torch.Tensor) -> float:
-        ece_score = torch.abs(self._calc_prevalence(y_true) - self._calc_confidence(y_pred))
-        return float(ece_score)
-
-    def __call__(self, result_batch: InferenceResultBatch) -> Union[float, List[float]]:
-        y_true = result_batch.get_targets(self.target_subscription_key).cpu().flatten()
-        y_pred = result_batch.get_predictions(self.prediction_subscription_key).cpu().flatten()  # confidence for single class
-
-        # bin samples based on prediction confidence
-        bin_indices = np.digitize(y_pred.detach().numpy(), bins=self.bins)
+    def _get_initial_state(self) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        # number of samples, number of positive samples and sum of the confidences per bin
+        return tuple(torch.zeros(self.num_bins, dtype=torch.float64) for _ in range(3))
+
+    def _update_state(self, state: Tuple[torch.Tensor, torch.Tensor, torch.Tensor],
+                      result_batch: InferenceResultBatch) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        y_true = result_batch.get_targets(self.target_subscription_key).flatten()
+        y_pred = result_batch.get_predictions(self.prediction_subscription_key).detach().flatten().double()  # confidence for single class
+
+        # bin samples based on prediction confidence (same binning as np.digitize)
+        bins = torch.as_tensor(self.bins, dtype=torch.float64, device=y_pred.device)
+        bin_indices = torch.bucketize(y_pred, bins, right=True)
+        bin_stats = (torch.bincount(bin_indices, minlength=self.num_bins).double(),
+                     torch.bincount(bin_indices, weights=(y_true == self.class_label).double(), minlength=self.num_bins),
+                     torch.bincount(bin_indices, weights=y_pred, minlength=self.num_bins))
+        return tuple(stat + batch_stat.cpu() for stat, batch_stat in zip(state, bin_stats))
+
+    def _merge_states(self, state: Tuple[torch.Tensor, torch.Tensor, torch.Tensor],
+                      other_state: Tuple[torch.Tensor, torch.Tensor, torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return tuple(stat + other_stat for stat, other_stat in zip(state, other_state))
+
+    def _compute_state(self, state: Tuple[torch.Tensor, torch.Tensor, torch.Tensor]) -> Union[float, List[float]]:
+        bin_counts, bin_positives, bin_confidences = state
+        num_samples = bin_counts.sum()
         ce_scores = []
         bin_weights = []
-        for bin_indice in range(self.num_bins):
-            bin_mask = bin_indices == bin_indice
-            y_pred_bin = y_pred[bin_mask]
-            y_true_bin = y_true[bin_mask]
-            if len(y_pred_bin) > 0:
-                ce_bin_score = self._calc_calibration_error(y_true=y_true_bin, y_pred=y_pred_bin)
-                bin_weight = len(y_pred_bin)/len(y_pred)
-                ce_scores.append(ce_bin_score)
-                bin_weights.append(bin_weight)
+        for bin_count, bin_positive, bin_confidence in zip(bin_counts, bin_positives, bin_confidences):
+            if bin_count > 0:
+                ce_scores.append(float(torch.abs(bin_positive / bin_count - bin_confidence / bin_count)))
+                bin_weights.append(float(bin_count / num_samples))
             else:
                 ce_scores.append(0)
                 bin_weights.append(0)
@@ -128,7 +259,7 @@ class ClassSpecificExpectedCalibrationErrorMetric(Metric):
             return ce_scores
 
 
-class BinaryClasswiseExpectedCalibrationErrorMetric(Metric):
+class BinaryClasswiseExpectedCalibrationErrorMetric(StreamingMetric):
     """
     Class to calculate a Metric having Specific Expected Callibration Error in Binary Classes 
     """
@@ -152,11 +283,21 @@ class BinaryClasswiseExpectedCalibrationErrorMetric(Metric):
                                                                                     class_label=1,
                                                                                     sum_up_bins=True), ]
 
-    def __call__(self, result_batch: InferenceResultBatch) -> float:
-        return np.mean([fun(result_batch) for fun in self.class_specific_ece_funs])
+    def _get_initial_state(self) -> List[Any]:
+        return [fun._get_initial_state() for fun in self.class_specific_ece_funs]
+
+    def _update_state(self, state: List[Any], result_batch: InferenceResultBatch) -> List[Any]:
+        return [fun._update_state(fun_state, result_batch) for fun, fun_state in zip(self.class_specific_ece_funs, state)]
+
+    def _merge_states(self, state: List[Any], other_state: List[Any]) -> List[Any]:
+        return [fun._merge_states(fun_state, other_fun_state)
+                for fun, fun_state, other_fun_state in zip(self.class_specific_ece_funs, state, other_state)]
 
+    def _compute_state(self, state: List[Any]) -> float:
+        return np.mean([fun._compute_state(fun_state) for fun, fun_state in zip(self.class_specific_ece_funs, state)])
 
-class BrierScoreMetric(Metric):
+
+class BrierScoreMetric(StreamingMetric):
     """
     Class to calculate Brier Score (Brier Score is a way to judge and score the accuracy of probabilistic forecasts).
     """
@@ -167,20 +308,33 @@ class BrierScoreMetric(Metric):
         super().__init__(tag=tag, identifier=identifier)
         self.target_subscription_key = target_subscription_key
         self.prediction_subscription_key = prediction_subscription_key
-        self.mse = nn.MSELoss(reduction="mean")
         self.class_label = class_label
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> float:
-        y_true = inference_result_batch.get_targets(self.target_subscription_key).cpu().flatten()
-        y_pred = inference_result_batch.get_predictions(self.prediction_subscription_key).cpu().flatten()
+    def _get_initial_state(self) -> Tuple[torch.Tensor, int]:
+        # sum of squared errors and number of samples
+        return torch.zeros((), dtype=torch.float64), 0
+
+    def _update_state(self, state: Tuple[torch.Tensor, int], inference_result_batch: InferenceResultBatch) -> Tuple[torch.Tensor, int]:
+        y_true = inference_result_batch.get_targets(self.target_subscription_key).flatten()
+        y_pred = inference_result_batch.get_predictions(self.prediction_subscription_key).detach().flatten()
         if self.class_label is not None:
             mask = y_pred == self.class_label
             y_true = y_true[mask]
             y_pred = y_pred[mask]
-        return self.mse(y_pred, y_true).item()
+        squared_error_sum, num_samples = state
+        # the sum stays on the device of the batch, such that the batches are not synchronised with the host
+        batch_squared_error_sum = torch.sum((y_pred.double() - y_true.double()) ** 2)
+        return squared_error_sum.to(batch_squared_error_sum.device) + batch_squared_error_sum, num_samples + len(y_pred)
+
+    def _merge_states(self, state: Tuple[torch.Tensor, int], other_state: Tuple[torch.Tensor, int]) -> Tuple[torch.Tensor, int]:
+        return state[0] + other_state[0].to(state[0].device), state[1] + other_state[1]
 
+    def _compute_state(self, state: Tuple[torch.Tensor, int]) -> float:
+        squared_error_sum, num_samples = state
+        return float(squared_error_sum) / num_samples if num_samples > 0 else float("nan")
 
-class RecallAtKMetric(Metric):
+
+class RecallAtKMetric(StreamingMetric):
     """
     Class to calculate Recall at K score (Recall at k is the proportion of relevant items found in the top-k recommendations).
     """
@@ -201,11 +355,36 @@ class RecallAtKMetric(Metric):
         top_k_class_labels = y_true[y_pred_arg_sorted[:k]]
         return len(top_k_class_labels[top_k_class_labels == self.class_label])
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> List[float]:
-        y_true = inference_result_batch.get_targets(self.target_subscription_key).cpu().flatten()
-        y_pred = inference_result_batch.get_predictions(self.prediction_subscription_key).cpu().flatten()
-
-        num_samples_of_interest = len(y_true[y_true == self.class_label])
+    def _select_top_k(self, y_pred: torch.Tensor, y_true: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        top_k_pred, top_k_indices = torch.topk(y_pred, k=min(max(self.k_vals), len(y_pred)), largest=self.sort_descending)
+        return top_k_pred, y_true[top_k_indices]
+
+    def _get_initial_state(self) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        # scores and class labels of the top max(k) samples and the number of samples of interest
+        return None, None, 0
+
+    def _update_state(self, state: Tuple[torch.Tensor, torch.Tensor, int],
+                      inference_result_batch: InferenceResultBatch) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        y_true = inference_result_batch.get_targets(self.target_subscription_key).flatten()
+        y_pred = inference_result_batch.get_predictions(self.prediction_subscription_key).detach().flatten()
+        # the top k samples of the batch are selected on its device before moving them to the host
+        top_k_pred, top_k_true = self._select_top_k(y_pred, y_true)
+        batch_state = top_k_pred.cpu(), top_k_true.cpu(), int(torch.sum(y_true == self.class_label))
+        return self._merge_states(state, batch_state)
+
+    def _merge_states(self, state: Tuple[torch.Tensor, torch.Tensor, int],
+                      other_state: Tuple[torch.Tensor, torch.Tensor, int]) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        if other_state[0] is None:
+            return state[0], state[1], state[2] + other_state[2]
+        if state[0] is None:
+            return other_state[0], other_state[1], state[2] + other_state[2]
+        top_k_pred, top_k_true = self._select_top_k(torch.cat([state[0], other_state[0]]), torch.cat([state[1], other_state[1]]))
+        return top_k_pred, top_k_true, state[2] + other_state[2]
+
+    def _compute_state(self, state: Tuple[torch.Tensor, torch.Tensor, int]) -> List[float]:
+        y_pred, y_true, num_samples_of_interest = state
+        if y_pred is None:
+            y_pred, y_true = torch.empty(0), torch.empty(0)
         y_pred_arg_sorted = torch.argsort(y_pred, descending=self.sort_descending)
         recall_at_k_scores = [self._get_recalled_at_k_count(k=k,
                                                             y_pred_arg_sorted=y_pred_arg_sorted,
@@ -213,7 +392,7 @@ class RecallAtKMetric(Metric):
         return recall_at_k_scores
 
 
-class AreaUnderRecallAtKMetric(Metric):
+class AreaUnderRecallAtKMetric(StreamingMetric):
     """
     Class to calculate Area Under Recall at K Metric
     """
@@ -235,8 +414,19 @@ class AreaUnderRecallAtKMetric(Metric):
         self.k_vals = k_vals
         self.normalize = normalize
 
-    def __call__(self, inference_result_batch: InferenceResultBatch) -> List[float]:
-        recall_at_k_scores = self.recall_at_k_metric_fun(inference_result_batch)
+    def _get_initial_state(self) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        return self.recall_at_k_metric_fun._get_initial_state()
+
+    def _update_state(self, state: Tuple[torch.Tensor, torch.Tensor, int],
+                      inference_result_batch: InferenceResultBatch) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        return self.recall_at_k_metric_fun._update_state(state, inference_result_batch)
+
+    def _merge_states(self, state: Tuple[torch.Tensor, torch.Tensor, int],
+                      other_state: Tuple[torch.Tensor, torch.Tensor, int]) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        return self.recall_at_k_metric_fun._merge_states(state, other_state)
+
+    def _compute_state(self, state: Tuple[torch.Tensor, torch.Tensor, int]) -> float:
+        recall_at_k_scores = self.recall_at_k_metric_fun._compute_state(state)
         au_recall_at_k = auc(x=self.k_vals, y=recall_at_k_scores)
         if self.normalize:
             au_recall_at_k = au_recall_at_k / max(self.k_vals)
@@ -0,0 +1,114 @@
+from types import MethodType
+from typing import Any, Callable, Dict
+import hashlib
+import json
+import warnings
+import torch
+from ml_gym.error_handling.exception import ModelCompilationError
+from ml_gym.models.nn.net import NNModel
+
+
+class ModelCompiler:
+    """
+    Compiles the forward pass of a model, either via `torch.compile` or, as a fallback, via TorchScript tracing.
+
+    Only the `forward` method of the model instance is replaced, i.e., the model remains the original module. Hence,
+    `state_dict` and `load_state_dict` (checkpointing, warm starts), the registration of the parameters with the optimizer
+    and the device placement work as for eager models.
+
+    The compiled forward functions are cached per model config hash (see `get_model_hash`), such that the identical
+    architectures of a grid search are compiled once per process. The models of a config share the compiled function, as
+    it takes the model instance as argument.
+    """
+
+    class Compilers:
+        TORCH_COMPILE = "torch_compile"
+        TORCHSCRIPT = "torchscript"
+
+    # maps the model config hash and the compiler settings to the compiled (unbound) forward function
+    _compiled_forwards: Dict[str, Callable] = {}
+
+    def __init__(self, compiler: str = Compilers.TORCH_COMPILE, backend: str = "inductor", mode: str = None,
+                 dynamic: bool = None, fullgraph: bool = False):
+        """
+        :params:
+               compiler (str): Either torch_compile or torchscript.
+               backend (str): Backend of `torch.compile`.
+               mode (str): Mode of `torch.compile`, e.g., reduce-overhead or max-autotune.
+               dynamic (bool): Whether `torch.compile` generates shape-dynamic code (None for automatic detection).
+               fullgraph (bool): Whether `torch.compile` fails on graph breaks.
+        """
+        if compiler not in [ModelCompiler.Compilers.TORCH_COMPILE, ModelCompiler.Compilers.TORCHSCRIPT]:
+            raise ModelCompilationError(f"Compiler {compiler} is not supported.")
+        self.compiler = compiler
+        self.backend = backend
+        self.mode = mode
+        self.dynamic = dynamic
+        self.fullgraph = fullgraph
+
+    @staticmethod
+    def get_model_hash(model_type: str, model_definition: Dict[str, Any], prediction_publication_keys: Dict[str, str] = None) -> str:
+        """
+        Calculates the hash of a model config. The seed is not part of the hash, as it does not change the architecture.
+
+        :params:
+               model_type (str): Key of the model within the model registry.
+               model_definition (Dict[str, Any]): Parameters of the model.
+               prediction_publication_keys (Dict[str, str]): Keys of the predictions.
+
+        :returns:
+            str: Hex digest of the model config.
+        """
+        canonical_representation = {"model_type": model_type,
+                                    "model_definition": model_definition,
+                                    "prediction_publication_keys": prediction_publication_keys}
+        return hashlib.sha256(json.dumps(canonical_representation, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _get_cache_key(self, model_hash: str) -> str:
+        return f"{model_hash}_{self.compiler}_{self.backend}_{self.mode}_{self.dynamic}_{self.fullgraph}"
+
+    @staticmethod
+    def _traced_forward(model: NNModel, inputs: Any) -> Any:
+        # the model is traced lazily, as tracing requires example inputs, and once per mode, as the trace bakes in the
+        # training specific behaviour (e.g., dropout). The traces share the parameters and buffers of the model, i.e., the
+        # model has to be placed on its device before the first forward pass (as done by the gym jobs).
+        traces = model.__dict__.setdefault("_traced_forwards", {})
+        if model.training not in traces:
+            compiled_forward = model.forward
+            # the eager forward of the class is traced
+            del model.forward
+            try:
+                traces[model.training] = torch.jit.trace_module(model, {"forward": inputs}, strict=False)
+            except Exception as e:
+                raise ModelCompilationError(f"Model {type(model).__name__} could not be traced.") from e
+            finally:
+                model.forward = compiled_forward
+        return traces[model.training](inputs)
+
+    def _compile_forward(self, model: NNModel) -> Callable:
+        if self.compiler == ModelCompiler.Compilers.TORCH_COMPILE:
+            try:
+                return torch.compile(type(model).forward, backend=self.backend, mode=self.mode, dynamic=self.dynamic,
+                                     fullgraph=self.fullgraph)
+            except RuntimeError as e:
+                # torch.compile is not supported on all platforms and python versions
+                warnings.warn(f"torch.compile is not available ({e}), falling back to TorchScript tracing.")
+        return ModelCompiler._traced_forward
+
+    def compile(self, model: NNModel, model_hash: str) -> NNModel:
+        """
+        Replaces the forward method of the model by the compiled one. The compiled forward function is reused for all
+        models with the same config hash.
+
+        :params:
+               model (NNModel): Torch Neural Network module.
+               model_hash (str): Hash of the model config (see `get_model_hash`).
+
+        :returns:
+            model (NNModel): The model itself with the compiled forward method.
+        """
+        cache_key = self._get_cache_key(model_hash)
+        if cache_key not in ModelCompiler._compiled_forwards:
+            ModelCompiler._compiled_forwards[cache_key] = self._compile_forward(model)
+        model.forward = MethodType(ModelCompiler._compiled_forwards[cache_key], model)
+        return model
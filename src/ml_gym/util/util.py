@@ -12,7 +12,7 @@ from ml_gym.gym.inference_component import InferenceComponent
 from ml_gym.util.grid_search import GridSearch
 from ml_gym.validation.validator_factory import ValidatorFactory
 from ml_gym.io.config_parser import YAMLConfigLoader
-from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch
+from ml_gym.batching.batch import InferenceResultBatch, DatasetBatch, TorchDeviceMixin
 from ml_gym.gym.predict_postprocessing_component import PredictPostprocessingComponent
 from ml_gym.gym.post_processing import PredictPostProcessingIF
 import tqdm
@@ -418,12 +418,14 @@ class ExportedModel:
             result_batch, post_processors=self.post_processors)
         return result_batch
 
-    def predict_dataset_batch(self, batch: DatasetBatch, no_grad: bool = True) -> InferenceResultBatch:
+    def predict_dataset_batch(self, batch: DatasetBatch, no_grad: bool = True, share_batch_tensors: bool = False) -> InferenceResultBatch:
         """
         Get predictions perfomed on the batch of dataset.
         :params:
                 batch (DatasetBatch): A batch of samples and its targets and tags.
                 no_grad (bool): Whether to return predictions in inference mode.
+                share_batch_tensors (bool): If True, the targets and tags of the result are views on the batch's tensors
+                    (if these are on the CPU already), i.e., the batch must not be modified in place afterwards.
 
         :returns:
             result_batch (InferenceResultBatch): Prediction performed on the batch of dataset.
@@ -435,12 +437,13 @@ class ExportedModel:
         else:
             forward_result = self.model.forward(batch.samples)
 
-        result_batch = InferenceResultBatch(targets=deepcopy(
-            batch.targets), tags=deepcopy(batch.tags), predictions=forward_result)
+        result_batch = InferenceResultBatch(targets=TorchDeviceMixin._detach_dict_tensor(batch.targets), tags=batch.tags.detach(),
+                                            predictions=forward_result)
         result_batch = PredictPostprocessingComponent.post_process(
             result_batch, post_processors=self.post_processors)
         result_batch.to_cpu()
-        return result_batch
+        # moving the result to the CPU already copied the tensors of batches on other devices
+        return result_batch if share_batch_tensors else result_batch.own_tensors(batch)
 
     def predict_dataset_iterator(self, dataset_iterator: InformedDatasetIteratorIF,
                                  batch_size: int, collate_fn: Callable, no_grad: bool = True) -> InferenceResultBatch:
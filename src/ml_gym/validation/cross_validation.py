@@ -1,11 +1,14 @@
 from typing import Dict, Any, List, Type
 from data_stack.dataset.iterator import DatasetIteratorIF
 from ml_gym.blueprints.blue_prints import BluePrint
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.data_handling.split_index_store import SplitIndexStore
 from data_stack.dataset.splitter import SplitterFactory
 from ml_gym.modes import RunMode
 from ml_gym.validation.validator import ValidatorIF
 from ml_gym.blueprints.component_factory import Injector
 from ml_gym.util.grid_search import GridSearch
+import numpy as np
 
 
 class CrossValidation(ValidatorIF):
@@ -13,7 +16,8 @@ class CrossValidation(ValidatorIF):
     Class containing functions to perform Cross Validation.
     """
     def __init__(self, dataset_iterator: DatasetIteratorIF, num_folds: int, stratification: bool,
-                 target_pos: int, shuffle: bool, seed: int, run_mode: RunMode):
+                 target_pos: int, shuffle: bool, seed: int, run_mode: RunMode, label_index_path: str = None,
+                 split_index_store_path: str = None):
         self.num_folds = num_folds
         self.stratification = stratification
         self.dataset_iterator = dataset_iterator
@@ -21,6 +25,9 @@ class CrossValidation(ValidatorIF):
         self.target_pos = target_pos
         self.shuffle = shuffle
         self.run_mode = run_mode
+        self.label_index_path = label_index_path
+        # if given, the blueprint configs only reference the split indices stored in this directory
+        self.split_index_store_path = split_index_store_path
 
     def _get_fold_indices(self) -> List[List[int]]:
         splitter = SplitterFactory.get_cv_splitter(num_folds=self.num_folds,
@@ -28,27 +35,25 @@ class CrossValidation(ValidatorIF):
                                                    target_pos=self.target_pos,
                                                    shuffle=self.shuffle,
                                                    seed=self.seed)
-        indices = splitter.get_indices(dataset_iterator=self.dataset_iterator)
+        # the splitter only needs the targets, so we pass the label column instead of the full samples
+        label_iterator = LabelIndex.get_label_iterator(self.dataset_iterator, self.target_pos, self.label_index_path)
+        indices = splitter.get_indices(dataset_iterator=label_iterator)
         return indices
 
     @staticmethod
-    def _create_folds_splits(folds_indices: List[List[int]]) -> List[Dict[str, Any]]:
+    def _create_folds_splits(folds_indices: List[List[int]], split_index_store: SplitIndexStore = None) -> List[Dict[str, Any]]:
         # folds
         # [fold_1_indices, fold_2_indices ...]
         splits = []
         for val_fold_id, val_fold_indices in enumerate(folds_indices):
             # create train fold
-            train_fold_indices = []
-            for i, fold in enumerate(folds_indices):
-                if i != val_fold_id:
-                    train_fold_indices = train_fold_indices + fold
+            train_fold_indices = np.concatenate([np.asarray(fold, dtype=np.int64)
+                                                 for i, fold in enumerate(folds_indices) if i != val_fold_id])
 
             split = {
                 "id_val_fold_id": val_fold_id,
-                "id_split_indices": {
-                    "train": train_fold_indices,
-                    "val": val_fold_indices
-                }
+                "id_split_indices": SplitIndexStore.get_split_indices_config({"train": train_fold_indices,
+                                                                               "val": val_fold_indices}, split_index_store)
             }
             splits.append(split)
         return splits
@@ -68,7 +73,8 @@ class CrossValidation(ValidatorIF):
 
         fold_indices = self._get_fold_indices()
 
-        splits: List[Dict[str, Any]] = CrossValidation._create_folds_splits(fold_indices)
+        split_index_store = SplitIndexStore(self.split_index_store_path) if self.split_index_store_path is not None else None
+        splits: List[Dict[str, Any]] = CrossValidation._create_folds_splits(fold_indices, split_index_store)
 
         blueprints = []
         experiment_id = 0
@@ -1,11 +1,14 @@
 from typing import Dict, Any, Tuple, List, Type
 from data_stack.dataset.iterator import DatasetIteratorIF
 from ml_gym.blueprints.blue_prints import BluePrint
+from ml_gym.data_handling.label_index import LabelIndex
+from ml_gym.data_handling.split_index_store import SplitIndexStore
 from data_stack.dataset.splitter import SplitterFactory
 from ml_gym.modes import RunMode
 from ml_gym.validation.validator import ValidatorIF
 from ml_gym.blueprints.component_factory import Injector
 from ml_gym.util.grid_search import GridSearch
+import numpy as np
 
 
 class NestedCV(ValidatorIF):
@@ -14,7 +17,8 @@ class NestedCV(ValidatorIF):
     """
     def __init__(self, dataset_iterator: DatasetIteratorIF, num_outer_loop_folds: int,
                  num_inner_loop_folds: int, inner_stratification: bool, outer_stratification: bool,
-                 target_pos: int, shuffle: bool, seed: int, run_mode: RunMode):
+                 target_pos: int, shuffle: bool, seed: int, run_mode: RunMode, label_index_path: str = None,
+                 split_index_store_path: str = None):
         self.num_outer_loop_folds = num_outer_loop_folds
         self.num_inner_loop_folds = num_inner_loop_folds
         self.inner_stratification = inner_stratification
@@ -24,6 +28,9 @@ class NestedCV(ValidatorIF):
         self.target_pos = target_pos
         self.shuffle = shuffle
         self.run_mode = run_mode
+        self.label_index_path = label_index_path
+        # if given, the blueprint configs only reference the split indices stored in this directory
+        self.split_index_store_path = split_index_store_path
 
     def _get_fold_indices(self) -> Tuple[List[int]]:
         splitter = SplitterFactory.get_nested_cv_splitter(num_inner_loop_folds=self.num_inner_loop_folds,
@@ -33,15 +40,23 @@ class NestedCV(ValidatorIF):
                                                           target_pos=self.target_pos,
                                                           shuffle=self.shuffle,
                                                           seed=self.seed)
-        indices = splitter.get_indices(dataset_iterator=self.dataset_iterator)
+        # the splitter only needs the targets, so we pass the label column instead of the full samples
+        label_iterator = LabelIndex.get_label_iterator(self.dataset_iterator, self.target_pos, self.label_index_path)
+        indices = splitter.get_indices(dataset_iterator=label_iterator)
         return indices
 
     @staticmethod
-    def _create_outer_folds_splits(outer_folds_indices: Tuple[List[int]]) -> List[Dict[str, Any]]:
+    def _get_train_fold_indices(folds_indices: List[List[int]], test_fold_id: int) -> np.ndarray:
+        return np.concatenate([np.asarray(fold, dtype=np.int64) for i, fold in enumerate(folds_indices) if i != test_fold_id])
+
+    @staticmethod
+    def _create_outer_folds_splits(outer_folds_indices: Tuple[List[int]],
+                                   split_index_store: SplitIndexStore = None) -> List[Dict[str, Any]]:
         """
         Create Outer Fold Splits of nested CV.
         :params:
             outer_folds_indices (Tuple[List[int]]): List of Outer folds indicies.
+            split_index_store (SplitIndexStore): Store the split indices are referenced from. Inline indices, if not given.
         :returns:
             splits (List[Dict[str, Any]]): Outer fold Splits.
         """
@@ -50,28 +65,25 @@ class NestedCV(ValidatorIF):
         splits = []
         for outer_fold_id, test_fold_indices in enumerate(outer_folds_indices):
             # create train fold
-            train_fold_indices = []
-            for i, fold in enumerate(outer_folds_indices):
-                if i != outer_fold_id:
-                    train_fold_indices = train_fold_indices + fold
+            train_fold_indices = NestedCV._get_train_fold_indices(outer_folds_indices, outer_fold_id)
 
             split = {
                 "id_outer_test_fold_id": outer_fold_id,
                 "id_inner_test_fold_id": -1,
-                "id_split_indices": {
-                    "train": train_fold_indices,
-                    "test": test_fold_indices
-                }
+                "id_split_indices": SplitIndexStore.get_split_indices_config({"train": train_fold_indices,
+                                                                               "test": test_fold_indices}, split_index_store)
             }
             splits.append(split)
         return splits
 
     @staticmethod
-    def _create_inner_folds_splits(inner_folds_indices: Tuple[List[int]]) -> List[Dict[str, Any]]:
+    def _create_inner_folds_splits(inner_folds_indices: Tuple[List[int]],
+                                   split_index_store: SplitIndexStore = None) -> List[Dict[str, Any]]:
         """
         Create Inner Fold Splits of nested CV.
         :params:
             inner_folds_indices (Tuple[List[int]]): List of Inner folds indicies.
+            split_index_store (SplitIndexStore): Store the split indices are referenced from. Inline indices, if not given.
         :returns:
             splits (List[Dict[str, Any]]): Inner fold Splits.
         """
@@ -81,17 +93,12 @@ class NestedCV(ValidatorIF):
         for outer_fold_id, inner_folds in enumerate(inner_folds_indices):
             for inner_fold_id, test_fold_indices in enumerate(inner_folds):
                 # calc train fold indices
-                train_fold_indices = []
-                for i, fold in enumerate(inner_folds):
-                    if i != inner_fold_id:
-                        train_fold_indices = train_fold_indices + fold
+                train_fold_indices = NestedCV._get_train_fold_indices(inner_folds, inner_fold_id)
                 split = {
                     "id_outer_test_fold_id": outer_fold_id,
                     "id_inner_test_fold_id": inner_fold_id,
-                    "id_split_indices": {
-                        "train": train_fold_indices,
-                        "test": test_fold_indices
-                    }
+                    "id_split_indices": SplitIndexStore.get_split_indices_config({"train": train_fold_indices,
+                                                                                   "test": test_fold_indices}, split_index_store)
                 }
                 splits.append(split)
         return splits
@@ -111,8 +118,9 @@ class NestedCV(ValidatorIF):
 
         outer_fold_indices, inner_folds_indices = self._get_fold_indices()
 
-        outer_splits = NestedCV._create_outer_folds_splits(outer_fold_indices)
-        inner_splits = NestedCV._create_inner_folds_splits(inner_folds_indices)
+        split_index_store = SplitIndexStore(self.split_index_store_path) if self.split_index_store_path is not None else None
+        outer_splits = NestedCV._create_outer_folds_splits(outer_fold_indices, split_index_store)
+        inner_splits = NestedCV._create_inner_folds_splits(inner_folds_indices, split_index_store)
         splits = outer_splits + inner_splits
 
         blueprints = []